@@ -149,9 +149,9 @@ if [ "$MODE" = "uninstall" ]; then
     
     echo ""
     echo "Stopping service..."
-    sudo systemctl stop pmg-portal.service 2>/dev/null || true
-    sudo systemctl disable pmg-portal.service 2>/dev/null || true
-    sudo rm -f /etc/systemd/system/pmg-portal.service
+    sudo systemctl stop pmg-portal.service pmg-portal-worker.service 2>/dev/null || true
+    sudo systemctl disable pmg-portal.service pmg-portal-worker.service 2>/dev/null || true
+    sudo rm -f /etc/systemd/system/pmg-portal.service /etc/systemd/system/pmg-portal-worker.service
     sudo systemctl daemon-reload
     
     echo "Removing application files..."
@@ -552,8 +552,10 @@ PY
 echo ""
 echo "Installing systemd service..."
 sudo cp "$APP_DIR/deploy/systemd/pmg-portal.service" /etc/systemd/system/pmg-portal.service
+sudo cp "$APP_DIR/deploy/systemd/pmg-portal-worker.service" /etc/systemd/system/pmg-portal-worker.service
 sudo systemctl daemon-reload
 sudo systemctl enable --now pmg-portal.service
+sudo systemctl enable --now pmg-portal-worker.service
 
 echo ""
 echo "Updating nginx configuration (if nginx is installed)..."
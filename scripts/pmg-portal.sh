@@ -3,6 +3,7 @@ set -euo pipefail
 
 APP_DIR="/opt/pmg-portal"
 SERVICE="pmg-portal.service"
+WORKER_SERVICE="pmg-portal-worker.service"
 
 cmd="${1:-help}"
 
@@ -22,11 +23,11 @@ case "$cmd" in
     sudo bash "$APP_DIR/scripts/uninstall.sh"
     ;;
   restart)
-    sudo systemctl restart "$SERVICE"
-    sudo systemctl status "$SERVICE" --no-pager -l || true
+    sudo systemctl restart "$SERVICE" "$WORKER_SERVICE"
+    sudo systemctl status "$SERVICE" "$WORKER_SERVICE" --no-pager -l || true
     ;;
   status)
-    sudo systemctl status "$SERVICE" --no-pager -l || true
+    sudo systemctl status "$SERVICE" "$WORKER_SERVICE" --no-pager -l || true
     ;;
   logs)
     sudo journalctl -u "$SERVICE" -f --no-pager
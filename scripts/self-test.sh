@@ -25,6 +25,8 @@ print("Users:", User.objects.count())
 print("Customers:", Customer.objects.count())
 
 host, port = os.getenv("APP_BIND","127.0.0.1:8000").split(":")
+if host in ("0.0.0.0", ""):
+    host = "127.0.0.1"
 s = socket.socket()
 try:
     s.settimeout(1.0)
@@ -34,6 +36,20 @@ except Exception as e:
     print(f"WARNING: Could not reach {host}:{port} -> {e}")
 finally:
     s.close()
+
+# Readiness probe: database, cache and media storage as seen by a running worker
+import json, urllib.request, urllib.error  # noqa: E402
+url = f"http://{host}:{port}/readyz/"
+try:
+    with urllib.request.urlopen(url, timeout=3) as resp:
+        body = json.loads(resp.read().decode())
+        print(f"OK: {url} -> {body['status']}")
+except urllib.error.HTTPError as e:
+    body = json.loads(e.read().decode() or "{}")
+    failed = [name for name, c in body.get("checks", {}).items() if not c.get("ok")]
+    print(f"WARNING: {url} -> {e.code}, failing checks: {', '.join(failed) or 'unknown'}")
+except Exception as e:
+    print(f"WARNING: Could not query {url} -> {e}")
 PY
 
 echo "Done."
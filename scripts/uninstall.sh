@@ -6,9 +6,9 @@ APP_DIR="/opt/pmg-portal"
 
 echo "=== Uninstalling pmg-portal ==="
 
-sudo systemctl stop pmg-portal.service || true
-sudo systemctl disable pmg-portal.service || true
-sudo rm -f /etc/systemd/system/pmg-portal.service
+sudo systemctl stop pmg-portal.service pmg-portal-worker.service || true
+sudo systemctl disable pmg-portal.service pmg-portal-worker.service || true
+sudo rm -f /etc/systemd/system/pmg-portal.service /etc/systemd/system/pmg-portal-worker.service
 sudo systemctl daemon-reload
 
 sudo rm -rf "$APP_DIR"
@@ -20,6 +20,7 @@ else
 fi
 
 SRC_DIR="$APP_DIR/src"
+WORKER_SERVICE_NAME="pmg-portal-worker.service"
 
 echo "=== Updating $ENV_TYPE environment (branch: $BRANCH) ==="
 
@@ -33,6 +34,7 @@ fi
 echo "Note: Code update is handled by install.sh. This script updates dependencies and applies migrations."
 
 sudo systemctl stop "$SERVICE_NAME" || true
+sudo systemctl stop "$WORKER_SERVICE_NAME" 2>/dev/null || true
 
 echo "Re-installing python deps..."
 cd "$SRC_DIR"
@@ -116,12 +118,20 @@ cleanup_branch_files "$BRANCH" "$APP_DIR"
 # Create migrations if needed
 sudo -E "$SRC_DIR/.venv/bin/python" manage.py makemigrations --noinput || true
 sudo -E "$SRC_DIR/.venv/bin/python" manage.py migrate --noinput
+# Inline switcher thumbnails for logos that have none yet (no-op once filled)
+sudo -E "$SRC_DIR/.venv/bin/python" manage.py logo_thumbnails || true
 sudo -E "$SRC_DIR/.venv/bin/python" manage.py collectstatic --noinput
 sudo -E "$SRC_DIR/.venv/bin/python" manage.py compilemessages --verbosity 0
 
 sudo systemctl start "$SERVICE_NAME"
 sudo systemctl status "$SERVICE_NAME" --no-pager -l || true
 
+# Background job worker (installed here on upgrades from versions without it)
+sudo cp "$APP_DIR/deploy/systemd/$WORKER_SERVICE_NAME" "/etc/systemd/system/$WORKER_SERVICE_NAME"
+sudo systemctl daemon-reload
+sudo systemctl enable "$WORKER_SERVICE_NAME" >/dev/null 2>&1 || true
+sudo systemctl restart "$WORKER_SERVICE_NAME"
+
 echo ""
 echo "Checking nginx configuration (if nginx is installed)..."
 if command -v nginx >/dev/null 2>&1; then
@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import login_view, logout_view, register_view, profile_view, password_change_view
+from .views import login_view, logout_view, register_view, profile_view, password_change_view, page_state
 
 urlpatterns = [
     path("login/", login_view, name="login"),
     path("logout/", logout_view, name="logout"),
     path("register/", register_view, name="register"),
+    path("page-state/", page_state, name="page_state"),
     path("profile/", profile_view, name="profile"),
     path("password/change/", password_change_view, name="password_change"),
 ]
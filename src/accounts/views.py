@@ -1,15 +1,65 @@
 """
 Accounts views (login, logout, register).
 """
+import hashlib
+import threading
+
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
 
 from .forms import LoginForm, RegisterForm, CustomPasswordChangeForm, AccountEditForm
 
+# Login and register pages as sent to anonymous visitors: (template, language, path) -> (body, etag).
+# They hold no per-visitor state (the CSRF token and messages come from page_state), so each is
+# rendered once per language and process and reused until the next deploy restarts the workers.
+_public_pages = {}
+_public_pages_lock = threading.Lock()
+
+
+def _public_page(request, template_name, context):
+    """
+    Cached render of an anonymous GET page, with an ETag and public Cache-Control (PUBLIC_PAGE_MAX_AGE)
+    so browsers and proxies can reuse or revalidate it. Vary covers the language (Accept-Language or
+    the language cookie) and the session cookie (signed-in users are redirected instead).
+    """
+    key = (template_name, translation.get_language(), request.path)
+    entry = _public_pages.get(key)
+    if entry is None:
+        body = render_to_string(template_name, context, request).encode()
+        entry = (body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"')
+        if not settings.DEBUG:
+            with _public_pages_lock:
+                _public_pages[key] = entry
+    body, etag = entry
+    response = HttpResponse(body)
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=getattr(settings, "PUBLIC_PAGE_MAX_AGE", 300))
+    patch_vary_headers(response, ("Accept-Language", "Cookie"))
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+@never_cache
+@require_safe
+def page_state(request):
+    """
+    Per-visitor state of the cached login and register pages (static/js/public_page.js): a CSRF
+    token (the csrftoken cookie is set with it) and pending flash messages. Never creates a session.
+    """
+    return JsonResponse({
+        "csrfToken": get_token(request),
+        "messages": [{"level": m.tags, "text": str(m)} for m in messages.get_messages(request)],
+    })
+
 
 def login_view(request):
     if request.user.is_authenticated:
@@ -34,6 +84,8 @@ def login_view(request):
         
         return redirect("/")
 
+    if request.method in ("GET", "HEAD"):
+        return _public_page(request, "accounts/login.html", {"form": form})
     return render(request, "accounts/login.html", {"form": form})
 
 
@@ -57,6 +109,8 @@ def register_view(request):
         login(request, user)
         return redirect("/")
 
+    if request.method in ("GET", "HEAD"):
+        return _public_page(request, "accounts/register.html", {"form": form})
     return render(request, "accounts/register.html", {"form": form})
 
 
@@ -5,3 +5,7 @@ class AdminAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "admin_app"
     verbose_name = "Admin (custom)"
+
+    def ready(self):
+        # Register background job tasks (portal.jobs)
+        from . import tasks  # noqa: F401
@@ -2,6 +2,8 @@
 Forms for custom admin (admin_app).
 """
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm as BaseUserCreationForm
 from django.contrib.auth.models import Group
@@ -46,6 +48,34 @@ class CustomerForm(forms.ModelForm):
         if "logo" in self.fields:
             self.fields["logo"].required = False
 
+    def _check_not_being_deleted(self, field):
+        # The model's unique check goes through Customer.objects, which hides customers pending purge;
+        # their name and slug stay taken until the purge job ran, so saving would fail with IntegrityError
+        value = self.cleaned_data.get(field)
+        if value and (
+            Customer.all_objects.filter(**{field: value}, deleting_at__isnull=False)
+            .exclude(pk=self.instance.pk)
+            .exists()
+        ):
+            raise forms.ValidationError(
+                f"A customer with this {field} is being deleted. "
+                f"Choose another {field} or try again once the deletion has finished."
+            )
+        return value
+
+    def clean_name(self):
+        return self._check_not_being_deleted("name")
+
+    def clean_slug(self):
+        return self._check_not_being_deleted("slug")
+
+    def clean_logo(self):
+        logo = self.cleaned_data.get("logo")
+        max_size = settings.LOGO_MAX_UPLOAD_SIZE
+        if logo and getattr(logo, "size", 0) > max_size:
+            raise forms.ValidationError(f"Logo is too large (max {filesizeformat(max_size)}).")
+        return logo
+
 
 class CustomerMembershipForm(forms.ModelForm):
     class Meta:
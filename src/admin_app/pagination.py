@@ -0,0 +1,59 @@
+"""
+Keyset pagination for the lazily loaded sections of the admin customer and user cards.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+SECTION_PAGE_SIZE = 25
+
+
+def encode_cursor(values):
+    """Opaque cursor for the sort key of the last row on a page."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Sort key from a cursor, or None if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _value(obj, field):
+    for part in field.split("__"):
+        obj = getattr(obj, part)
+    return obj
+
+
+def keyset_page(qs, order, after="", page_size=SECTION_PAGE_SIZE):
+    """
+    One page of qs in ascending `order` (field names, the last one unique, e.g. "pk"), continuing
+    after the cursor of the previous page. Each page is "WHERE (a, b) > (x, y) ORDER BY a, b LIMIT n",
+    so deep pages cost the same as the first. Returns (items, next_cursor); next_cursor is None on
+    the last page.
+    """
+    values = decode_cursor(after) if after else None
+    if values is not None and len(values) == len(order):
+        condition = Q()
+        for i, field in enumerate(order):
+            term = Q(**{f"{field}__gt": values[i]})
+            for prev_field, prev_value in zip(order[:i], values[:i]):
+                term &= Q(**{prev_field: prev_value})
+            condition |= term
+        try:
+            qs = qs.filter(condition)
+        except (ValueError, TypeError, ValidationError):
+            # Tampered or stale cursor (values that do not fit the fields): start from the first page
+            pass
+    items = list(qs.order_by(*order)[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor([_value(items[-1], field) for field in order])
+    return items, next_cursor
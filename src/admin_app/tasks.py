@@ -0,0 +1,78 @@
+"""
+Background job tasks of the custom admin (run by manage.py worker).
+"""
+import logging
+import os
+
+from django.core.exceptions import ValidationError
+
+from portal import activity, jobs
+from portal.models import ActivityEvent, Customer
+from portal.storage import hashed_name, logo_storage, release_logo
+
+from .uploads import LOGO_FORMATS, validate_logo_image
+
+logger = logging.getLogger(__name__)
+
+LOGO_UPLOAD_DIR = "customer_logos"
+
+
+def _discard(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _stored_name(sha256):
+    """Storage name of already imported content (a retry after the rename succeeded), or None."""
+    for ext in LOGO_FORMATS.values():
+        name = hashed_name(LOGO_UPLOAD_DIR, sha256, ext)
+        if logo_storage.exists(name):
+            return name
+    return None
+
+
+@jobs.task("admin_app.process_logo")
+def process_logo(customer_id, path, sha256, size):
+    """
+    Validate an uploaded logo (streamed to `path` by the upload view), move it into
+    content-addressed storage, point the customer at it and release the previous logo.
+    The temp file is kept for retries and removed once the last attempt fails.
+    """
+    try:
+        return _process_logo(customer_id, path, sha256, size)
+    except Exception:
+        if jobs.is_final_attempt():
+            _discard(path)
+        raise
+
+
+def _process_logo(customer_id, path, sha256, size):
+    customer = Customer.objects.filter(pk=customer_id).first()
+    if customer is None:
+        _discard(path)
+        raise jobs.PermanentFailure("Customer no longer exists")
+
+    if os.path.exists(path):
+        try:
+            ext = validate_logo_image(path)
+        except ValidationError as e:
+            _discard(path)
+            raise jobs.PermanentFailure(e.messages[0])
+        new_name = logo_storage.import_file(path, sha256, ext, upload_to=LOGO_UPLOAD_DIR)
+    else:
+        new_name = _stored_name(sha256)
+        if new_name is None:
+            raise jobs.PermanentFailure("Uploaded file is gone")
+
+    old_logo_name = customer.logo.name if customer.logo else None
+    customer.logo.name = new_name
+    customer.save(update_fields=["logo"])
+    logger.info(f"Logo saved for customer {customer.pk}: {new_name} ({size} bytes)")
+    activity.record(ActivityEvent.ACTION_LOGO_UPLOAD, customer, file=new_name, size=size)
+
+    # Release the old logo; the file is removed only if no other customer shares it
+    if old_logo_name and new_name != old_logo_name:
+        release_logo(old_logo_name)
+    return {"logo_url": customer.logo_url()}
@@ -0,0 +1,123 @@
+"""
+Streaming, size-capped upload handling for customer logos.
+
+The upload handler writes chunks straight to a temporary file next to the media storage while
+hashing them, so memory use per upload is one chunk regardless of file size, and the finished file
+can be moved into content-addressed storage with a single atomic rename.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+
+# Pillow format name -> stored extension (never trust the client's filename or content_type)
+LOGO_FORMATS = {
+    "PNG": ".png",
+    "JPEG": ".jpg",
+    "GIF": ".gif",
+    "WEBP": ".webp",
+}
+LOGO_FIELD_NAME = "logo"
+INCOMING_DIR = ".incoming"
+
+
+def incoming_dir():
+    """Temp directory on the same filesystem as MEDIA_ROOT, so finished uploads can be renamed into place."""
+    path = Path(settings.MEDIA_ROOT) / INCOMING_DIR
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class StreamedUpload(UploadedFile):
+    """Uploaded file kept on disk, with its SHA-256 computed while it was received."""
+
+    def __init__(self, file, name, content_type, size, charset, sha256):
+        super().__init__(file, name, content_type, size, charset)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class LogoUploadHandler(FileUploadHandler):
+    """
+    Stream the "logo" field to disk, hashing as it goes, and abort as soon as it exceeds max_size.
+    Other file fields are skipped.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.LOGO_MAX_UPLOAD_SIZE
+        self.too_large = False
+        self.file = None
+        self.hasher = None
+        self.received = 0
+
+    def new_file(self, field_name, *args, **kwargs):
+        if field_name != LOGO_FIELD_NAME:
+            raise SkipFile()
+        super().new_file(field_name, *args, **kwargs)
+        self.file = tempfile.NamedTemporaryFile(dir=incoming_dir(), prefix="logo-", suffix=".part", delete=False)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.too_large = True
+            # Stop reading the body at once; the view answers 413
+            raise StopUpload(connection_reset=True)
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self.file.flush()
+        self.file.seek(0)
+        return StreamedUpload(
+            file=self.file,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            sha256=self.hasher.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        self.cleanup()
+
+    def cleanup(self):
+        """Remove the temporary file if it was not moved into storage."""
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+        except OSError:
+            pass
+        try:
+            os.unlink(self.file.name)
+        except FileNotFoundError:
+            pass
+
+
+def validate_logo_image(path):
+    """
+    Check that a file is an image we accept and return its storage extension.
+    Only the header is parsed (lazy open + verify); pixel data is never decoded.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(path) as img:
+            fmt = img.format
+            img.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        raise ValidationError("File must be a PNG, JPEG, GIF or WebP image.")
+    if fmt not in LOGO_FORMATS:
+        raise ValidationError("File must be a PNG, JPEG, GIF or WebP image.")
+    return LOGO_FORMATS[fmt]
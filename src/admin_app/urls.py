@@ -10,6 +10,7 @@ urlpatterns = [
     path("users/", views.user_list, name="admin_user_list"),
     path("users/add/", views.user_add, name="admin_user_add"),
     path("users/<int:pk>/", views.user_detail, name="admin_user_detail"),
+    path("users/<int:pk>/sections/memberships/", views.user_memberships_section, name="admin_user_memberships_section"),
     path("users/<int:pk>/edit/", views.user_edit, name="admin_user_edit"),
     path("users/<int:pk>/delete/", views.user_delete, name="admin_user_delete"),
     path("roles/", views.role_list, name="admin_role_list"),
@@ -18,6 +19,10 @@ urlpatterns = [
     path("customers/", views.customer_list, name="admin_customer_list"),
     path("customers/add/", views.customer_add, name="admin_customer_add"),
     path("customers/<int:pk>/", views.customer_detail, name="admin_customer_detail"),
+    path("customers/<int:pk>/sections/logo/", views.customer_logo_section, name="admin_customer_logo_section"),
+    path("customers/<int:pk>/sections/members/", views.customer_members_section, name="admin_customer_members_section"),
+    path("customers/<int:pk>/sections/links/", views.customer_links_section, name="admin_customer_links_section"),
+    path("customers/<int:pk>/links/reorder/", views.customer_links_reorder, name="admin_customer_links_reorder"),
     path("customers/<int:pk>/edit/", views.customer_edit, name="admin_customer_edit"),
     path("customers/<int:pk>/delete/", views.customer_delete, name="admin_customer_delete"),
     path("customers/<int:pk>/logo/", views.customer_logo_upload, name="admin_customer_logo_upload"),
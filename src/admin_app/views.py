@@ -8,11 +8,22 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.db.models import Q
 from django.core.paginator import Paginator
 from django.contrib import messages
-from django.views.decorators.http import require_POST
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST, require_safe
 from django.http import JsonResponse
-import os
+from django.utils.http import urlencode
+import json
+import logging
 
-from portal.models import Customer, CustomerMembership, PortalLink
+from django.urls import reverse
+from portal import deletion, jobs, link_order
+from portal.models import Customer, CustomerMembership, Job, PortalLink
+from portal.storage import release_logo
+
+from .pagination import SECTION_PAGE_SIZE, keyset_page
+from .uploads import LogoUploadHandler
 
 User = get_user_model()
 
@@ -36,7 +47,8 @@ def admin_home(request):
 # ----- Users (superuser only) -----
 @superuser_required
 def user_list(request):
-    qs = User.objects.all().order_by("username")
+    # Users being deleted (purge job pending) are already gone as far as the admin is concerned
+    qs = User.objects.exclude(pk__in=deletion.pending_deletion_ids(deletion.PURGE_USER_TASK)).order_by("username")
     search = request.GET.get("q", "").strip()
     if search:
         qs = qs.filter(
@@ -81,20 +93,51 @@ def user_add(request):
 
 @superuser_required
 def user_detail(request, pk):
-    """Modern user card view showing all user information."""
+    """
+    Modern user card view. Only the user row is loaded here; the memberships section is fetched
+    by htmx (user_memberships_section), a page at a time.
+    """
     user_obj = get_object_or_404(User, pk=pk)
-    memberships = CustomerMembership.objects.filter(user=user_obj).select_related("customer").order_by("customer__name")
-    
-    return render(
-        request,
-        "admin_app/user_card.html",
-        {
-            "user_obj": user_obj,
-            "memberships": memberships,
-        },
+    return render(request, "admin_app/user_card.html", {"user_obj": user_obj})
+
+
+@superuser_required
+@require_safe
+def user_memberships_section(request, pk):
+    """htmx: one page of the user's customer memberships (user card), searchable by customer name."""
+    user_obj = get_object_or_404(User.objects.only("pk"), pk=pk)
+    qs = CustomerMembership.objects.filter(user=user_obj, customer__deleting_at__isnull=True).select_related("customer")
+    search = request.GET.get("q", "").strip()
+    if search:
+        qs = qs.filter(customer__name__icontains=search)
+    return _card_section(
+        request, "admin_app/fragments/user_membership_rows.html", "memberships", qs, ("customer__name", "pk"),
+        {"user_obj": user_obj},
     )
 
 
+def _card_section(request, template, section, qs, order, context):
+    """
+    Render one keyset-paginated page of a card section (rows plus a "Load more" row). The first
+    page also reports the section's row count in an HX-Trigger "sectionCount" event for the tab label.
+    """
+    search = request.GET.get("q", "").strip()
+    after = request.GET.get("after", "")
+    items, next_cursor = keyset_page(qs, order, after)
+    next_url = f"{request.path}?{urlencode({'q': search, 'after': next_cursor})}" if next_cursor else None
+    response = render(request, template, {
+        **context,
+        "items": items,
+        "next_url": next_url,
+        "search": search,
+        "first_page": not after,
+    })
+    if not after:
+        count = len(items) if len(items) < SECTION_PAGE_SIZE else qs.count()
+        response["HX-Trigger"] = json.dumps({"sectionCount": {"section": section, "count": count}})
+    return response
+
+
 @superuser_required
 def user_edit(request, pk):
     from .forms import UserEditForm
@@ -123,10 +166,10 @@ def user_delete(request, pk):
     
     username = user_obj.username
     
-    # Delete user (this will cascade delete CustomerMembership)
-    user_obj.delete()
+    # Deactivate and hide the user now; memberships and the account are purged in batches by a job
+    deletion.delete_user(user_obj, user=request.user)
     
-    messages.success(request, f"User '{username}' has been deleted.")
+    messages.success(request, f"User '{username}' is being deleted.")
     return redirect("admin_app:admin_user_list")
 
 
@@ -208,168 +251,134 @@ def customer_add(request):
 
 @staff_required
 def customer_detail(request, pk):
-    """Modern customer card view showing all customer information."""
-    customer = get_object_or_404(Customer, pk=pk)
-    memberships = CustomerMembership.objects.filter(customer=customer).select_related("user").order_by("user__username")
-    portal_links = PortalLink.objects.filter(customer=customer).order_by("sort_order", "title")
-    
-    return render(
-        request,
-        "admin_app/customer_card.html",
-        {
-            "customer": customer,
-            "memberships": memberships,
-            "portal_links": portal_links,
-        },
+    """
+    Modern customer card view. The shell renders from the customer row alone; the logo, members
+    and portal links sections are fetched independently by htmx (keyset-paginated, searchable).
+    """
+    customer = get_object_or_404(Customer.objects.select_related("primary_contact"), pk=pk)
+    return render(request, "admin_app/customer_card.html", {"customer": customer})
+
+
+@staff_required
+@require_safe
+def customer_logo_section(request, pk):
+    """htmx: the customer card's logo preview (resolving logo_url may hash the file on a cache miss)."""
+    customer = get_object_or_404(Customer.objects.only("pk", "name", "logo"), pk=pk)
+    return render(request, "admin_app/fragments/customer_logo.html", {"customer": customer})
+
+
+@staff_required
+@require_safe
+def customer_members_section(request, pk):
+    """htmx: one page of the customer's members, searchable by username, name or email."""
+    customer = get_object_or_404(Customer.objects.only("pk"), pk=pk)
+    qs = CustomerMembership.objects.filter(customer=customer).select_related("user")
+    search = request.GET.get("q", "").strip()
+    if search:
+        qs = qs.filter(
+            Q(user__username__icontains=search)
+            | Q(user__email__icontains=search)
+            | Q(user__first_name__icontains=search)
+            | Q(user__last_name__icontains=search)
+        )
+    return _card_section(
+        request, "admin_app/fragments/customer_member_rows.html", "members", qs, ("user__username", "pk"),
+        {"customer": customer},
+    )
+
+
+@staff_required
+@require_safe
+def customer_links_section(request, pk):
+    """htmx: one page of the customer's portal links (admin order), searchable by title or URL."""
+    customer = get_object_or_404(Customer.objects.only("pk"), pk=pk)
+    qs = PortalLink.objects.filter(customer=customer)
+    search = request.GET.get("q", "").strip()
+    if search:
+        qs = qs.filter(Q(title__icontains=search) | Q(url__icontains=search))
+    return _card_section(
+        request, "admin_app/fragments/customer_link_rows.html", "links", qs, ("sort_order", "title", "pk"),
+        {"customer": customer},
     )
 
 
 @staff_required
 @require_POST
+def customer_links_reorder(request, pk):
+    """
+    Drag-and-drop on the customer card: JSON {"order": [link ids]} with every link of the customer
+    in its new order, applied in one statement with sparse sort keys (see portal.link_order).
+    """
+    customer = get_object_or_404(Customer.objects.only("pk", "name"), pk=pk)
+    try:
+        order = [int(link_id) for link_id in json.loads(request.body)["order"]]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "Expected {\"order\": [link ids]}"}, status=400)
+    try:
+        changed = link_order.reorder_links(customer, order)
+    except link_order.LinkSetChanged:
+        return JsonResponse({"error": "The links of this customer changed meanwhile. Reload and try again."}, status=409)
+    return JsonResponse({"success": True, "changed": changed})
+
+
+@staff_required
+@require_POST
+@csrf_exempt
 def customer_logo_upload(request, pk):
-    """Handle logo upload via AJAX."""
+    """
+    Handle logo upload via AJAX.
+    The body is streamed to a temp file with a hard size cap (LOGO_MAX_UPLOAD_SIZE), so memory use
+    stays constant. CSRF is checked in _store_logo_upload, after the upload handler is installed.
+    Processing is queued as a background job; the response (202) carries its status URL.
+    """
     customer = get_object_or_404(Customer, pk=pk)
+    max_size = settings.LOGO_MAX_UPLOAD_SIZE
     
-    if "logo" not in request.FILES:
-        return JsonResponse({"error": "No file provided"}, status=400)
-    
-    logo_file = request.FILES["logo"]
-    
-    # Validate file type
-    if not logo_file.content_type.startswith("image/"):
-        return JsonResponse({"error": "File must be an image"}, status=400)
-    
-    # Store old logo info before saving new one
-    old_logo_name = None
-    old_logo_path = None
-    if customer.logo:
-        try:
-            old_logo_name = customer.logo.name
-            old_logo_path = customer.logo.path
-        except Exception:
-            pass
-    
-    # Save new logo
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    # Ensure media directory exists before saving
-    from django.conf import settings
-    media_root = settings.MEDIA_ROOT
-    customer_logos_dir = media_root / "customer_logos"
+    # Reject obviously oversized bodies before reading any of them (allow for multipart overhead)
     try:
-        customer_logos_dir.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Ensured customer_logos directory exists: {customer_logos_dir}")
-    except Exception as e:
-        logger.error(f"Failed to create customer_logos directory: {e}")
-    
-    # Save the logo
-    logger.info(f"About to save logo file: {logo_file.name}, size: {logo_file.size}")
-    
-    # Explicitly save the file to storage before assigning to model
-    # This ensures the file is actually written to disk
-    from django.core.files.storage import default_storage
-    from django.core.files.base import ContentFile
-    
-    # Read file content
-    logo_file.seek(0)  # Reset file pointer
-    file_content = logo_file.read()
-    logo_file.seek(0)  # Reset again for Django
-    
-    # Generate filename
-    import uuid
-    file_ext = os.path.splitext(logo_file.name)[1]
-    unique_filename = f"{os.path.splitext(logo_file.name)[0]}_{uuid.uuid4().hex[:8]}{file_ext}"
-    storage_path = f"customer_logos/{unique_filename}"
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > max_size + 64 * 1024:
+        return _logo_too_large(max_size)
     
-    # Save file to storage
+    handler = LogoUploadHandler(request, max_size=max_size)
+    request.upload_handlers = [handler]
     try:
-        saved_name = default_storage.save(storage_path, ContentFile(file_content))
-        logger.info(f"File saved to storage: {saved_name}")
-        
-        # Now assign to model
-        customer.logo = saved_name
-        customer.save()
-        
-        # Verify the file exists
-        if default_storage.exists(saved_name):
-            logger.info(f"Verified file exists in storage: {saved_name}")
-        else:
-            logger.error(f"File does not exist in storage after save: {saved_name}")
-    except Exception as e:
-        logger.error(f"Error saving file to storage: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        # Fallback to original method
-        customer.logo = logo_file
-        customer.save()
-    
-    # Refresh from database to get updated logo info
-    customer.refresh_from_db()
-    
-    # Verify file was saved
-    if customer.logo:
-        try:
-            saved_path = customer.logo.path
-            file_exists = os.path.exists(saved_path)
-            logger.info(f"Logo saved: {customer.logo.name}, path: {saved_path}, exists: {file_exists}")
-            if not file_exists:
-                logger.warning(f"Logo file not found at expected path: {saved_path}")
-                # List directory contents to debug
-                try:
-                    if os.path.exists(customer_logos_dir):
-                        files_in_dir = os.listdir(customer_logos_dir)
-                        logger.info(f"Files in customer_logos directory: {files_in_dir}")
-                    else:
-                        logger.warning(f"customer_logos directory does not exist: {customer_logos_dir}")
-                except Exception as e:
-                    logger.error(f"Error listing directory: {e}")
-                logger.info(f"MEDIA_ROOT: {media_root}, exists: {media_root.exists()}")
-                # Check permissions
-                try:
-                    import stat
-                    if os.path.exists(media_root):
-                        st = os.stat(media_root)
-                        logger.info(f"MEDIA_ROOT permissions: {oct(stat.S_IMODE(st.st_mode))}, owner: {st.st_uid}, group: {st.st_gid}")
-                except Exception as e:
-                    logger.error(f"Error checking permissions: {e}")
-        except Exception as e:
-            logger.error(f"Error checking logo path: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-    
-    # Delete old logo file if it exists and is different from new one
-    if old_logo_path and old_logo_name:
-        try:
-            # Check if old file is different from new file
-            if customer.logo and customer.logo.name != old_logo_name:
-                if os.path.exists(old_logo_path):
-                    os.remove(old_logo_path)
-                    logger.info(f"Deleted old logo: {old_logo_path}")
-                    # Also try to remove directory if empty
-                    try:
-                        old_dir = os.path.dirname(old_logo_path)
-                        if os.path.exists(old_dir) and not os.listdir(old_dir):
-                            os.rmdir(old_dir)
-                    except Exception:
-                        pass
-        except Exception as e:
-            logger.warning(f"Failed to delete old logo: {e}")
-    
-    # Get logo URL - always return URL even if file check fails
-    logo_url = None
-    if customer.logo and customer.logo.name:
-        try:
-            logo_url = customer.logo_url()
-        except Exception as e:
-            logger.error(f"Error getting logo_url: {e}")
-        
-        # Fallback: construct URL manually
-        if not logo_url:
-            from django.conf import settings
-            logo_url = settings.MEDIA_URL + customer.logo.name
+        return _store_logo_upload(request, customer, handler)
+    finally:
+        handler.cleanup()
+
+
+def _logo_too_large(max_size):
+    return JsonResponse({"error": f"File is too large (max {filesizeformat(max_size)})"}, status=413)
+
+
+@csrf_protect
+def _store_logo_upload(request, customer, handler):
+    logo_file = request.FILES.get("logo")
+    if handler.too_large:
+        return _logo_too_large(handler.max_size)
+    if logo_file is None:
+        return JsonResponse({"error": "No file provided"}, status=400)
     
-    return JsonResponse({"success": True, "logo_url": logo_url})
+    # Validation, the move into content-addressed storage and releasing the old logo run in the
+    # worker (admin_app.process_logo); the streamed temp file now belongs to the job.
+    logo_file.close()
+    job = jobs.enqueue(
+        "admin_app.process_logo",
+        priority=Job.PRIORITY_HIGH,
+        user=request.user,
+        customer_id=customer.pk,
+        path=logo_file.temporary_file_path(),
+        sha256=logo_file.sha256,
+        size=logo_file.size,
+    )
+    handler.file = None
+    return JsonResponse(
+        {"job_id": job.pk, "status_url": reverse("job_status", args=[job.pk])},
+        status=202,
+    )
 
 
 @staff_required
@@ -382,34 +391,12 @@ def customer_logo_delete(request, pk):
         return JsonResponse({"error": "No logo to delete"}, status=400)
     
     try:
-        logo_path = None
         logo_name = customer.logo.name
-        
-        # Get path before deletion
-        try:
-            logo_path = customer.logo.path
-        except Exception:
-            pass
-        
-        # Delete the logo field (this should delete the file via Django's storage)
-        customer.logo.delete(save=False)  # Don't save yet
-        customer.save()  # Save the model
-        
-        # Also try to remove file manually if still exists
-        if logo_path and os.path.exists(logo_path):
-            try:
-                os.remove(logo_path)
-                # Try to remove empty directory
-                try:
-                    logo_dir = os.path.dirname(logo_path)
-                    if os.path.exists(logo_dir) and not os.listdir(logo_dir):
-                        os.rmdir(logo_dir)
-                except Exception:
-                    pass
-            except Exception:
-                pass
+        # Clear the field, then release the file (shared files stay until their last reference goes)
+        customer.logo = None
+        customer.save(update_fields=["logo"])
+        release_logo(logo_name)
     except Exception as e:
-        import logging
         logger = logging.getLogger(__name__)
         logger.error(f"Error deleting logo: {e}")
         return JsonResponse({"error": str(e)}, status=500)
@@ -422,42 +409,18 @@ def customer_edit(request, pk):
     from .forms import CustomerForm
     customer = get_object_or_404(Customer, pk=pk)
     if request.method == "POST":
-        # Store old logo info before form processing
-        old_logo_name = None
-        old_logo_path = None
-        if customer.logo:
-            try:
-                old_logo_name = customer.logo.name
-                old_logo_path = customer.logo.path
-            except Exception:
-                pass
+        # Store old logo name before form processing
+        old_logo_name = customer.logo.name if customer.logo else None
         
         form = CustomerForm(request.POST, request.FILES, instance=customer)
         if form.is_valid():
-            # Check if a new logo file was actually uploaded
-            new_logo_uploaded = 'logo' in request.FILES and request.FILES['logo']
-            
             # Save the form (this will save the new logo if uploaded)
             saved_customer = form.save()
             
-            # If a new logo was uploaded and we had an old one, delete the old file
-            if new_logo_uploaded and old_logo_path and old_logo_name:
-                try:
-                    # Refresh to get new logo name
-                    saved_customer.refresh_from_db()
-                    # Only delete if the new logo is different from the old one
-                    if not saved_customer.logo or saved_customer.logo.name != old_logo_name:
-                        if os.path.exists(old_logo_path):
-                            os.remove(old_logo_path)
-                            # Try to remove empty directory
-                            try:
-                                old_dir = os.path.dirname(old_logo_path)
-                                if os.path.exists(old_dir) and not os.listdir(old_dir):
-                                    os.rmdir(old_dir)
-                            except Exception:
-                                pass
-                except Exception:
-                    pass  # Silently fail if file deletion fails
+            # If the logo changed, release the old one (removed only when no other customer uses it)
+            new_logo_name = saved_customer.logo.name if saved_customer.logo else None
+            if old_logo_name and new_logo_name != old_logo_name:
+                release_logo(old_logo_name)
             
             messages.success(request, "Customer updated.")
             return redirect("admin_app:admin_customer_detail", pk=customer.pk)
@@ -473,18 +436,22 @@ def customer_delete(request, pk):
     customer = get_object_or_404(Customer, pk=pk)
     customer_name = customer.name
     
-    # Delete customer (this will cascade delete CustomerMembership and PortalLink)
-    # The model's delete() method will also handle logo file deletion
-    customer.delete()
+    # The customer disappears from all pages now; links, memberships, the row and its logo are
+    # purged in batches by a background job (portal.deletion), so large customers cannot time out
+    deletion.delete_customer(customer, user=request.user)
     
-    messages.success(request, f"Customer '{customer_name}' has been deleted.")
+    messages.success(request, f"Customer '{customer_name}' is being deleted.")
     return redirect("admin_app:admin_customer_list")
 
 
 # ----- Customer access (CustomerMembership, staff) -----
 @staff_required
 def customer_access_list(request):
-    qs = CustomerMembership.objects.select_related("user", "customer").all().order_by("customer__name", "user__username")
+    qs = (
+        CustomerMembership.objects.select_related("user", "customer")
+        .filter(customer__deleting_at__isnull=True)
+        .order_by("customer__name", "user__username")
+    )
     search = request.GET.get("q", "").strip()
     if search:
         qs = qs.filter(
@@ -565,7 +532,11 @@ def customer_access_edit(request, pk):
 # ----- Portal links (staff) -----
 @staff_required
 def portal_link_list(request):
-    qs = PortalLink.objects.select_related("customer").all().order_by("customer__name", "sort_order", "title")
+    qs = (
+        PortalLink.objects.select_related("customer", "health")
+        .filter(customer__deleting_at__isnull=True)
+        .order_by("customer__name", "sort_order", "title")
+    )
     search = request.GET.get("q", "").strip()
     if search:
         qs = qs.filter(
@@ -574,6 +545,12 @@ def portal_link_list(request):
     customer_filter = request.GET.get("customer", "")
     if customer_filter:
         qs = qs.filter(customer_id=customer_filter)
+    # Link health from portal.link_health: broken = last check failed, unchecked = never checked
+    health_filter = request.GET.get("health", "")
+    if health_filter == "broken":
+        qs = qs.filter(health__ok=False)
+    elif health_filter == "unchecked":
+        qs = qs.filter(health__isnull=True)
     paginator = Paginator(qs, 20)
     page = request.GET.get("page", 1)
     page_obj = paginator.get_page(page)
@@ -586,6 +563,7 @@ def portal_link_list(request):
             "total_count": paginator.count,
             "search": search,
             "customers": customers,
+            "health_filter": health_filter,
         },
     )
 
@@ -612,6 +590,8 @@ def portal_link_add(request):
             try:
                 customer = Customer.objects.get(pk=customer_id)
                 form.fields["customer"].initial = customer
+                # Append after the existing links, leaving room for drag-and-drop reordering
+                form.initial["sort_order"] = link_order.next_sort_order(customer.pk)
             except Customer.DoesNotExist:
                 pass
     return render(request, "admin_app/portal_link_form.html", {"form": form, "link": None})
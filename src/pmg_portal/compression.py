@@ -0,0 +1,234 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: In-app response compression (Brotli/gzip negotiation, streaming, reuse of compressed bytes)
+Path: src/pmg_portal/compression.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import hashlib
+import logging
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # Brotli is in requirements.txt; without it only gzip is offered
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT_TYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# Same BREACH mitigation as django.middleware.gzip: random bytes in the gzip header
+GZIP_MAX_RANDOM_BYTES = 100
+
+_token = re.compile(r"\s*([a-z0-9*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*")
+
+
+def negotiate(accept_encoding):
+    """
+    Pick "br", "gzip" or None from an Accept-Encoding header, honouring q-values (q=0 refuses).
+    Brotli wins ties because it compresses text better at the same CPU cost.
+    """
+    offered = {}
+    for part in (accept_encoding or "").lower().split(","):
+        match = _token.fullmatch(part)
+        if not match:
+            continue
+        try:
+            offered[match[1]] = float(match[2]) if match[2] is not None else 1.0
+        except ValueError:
+            continue
+    wildcard = offered.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = offered.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressedBodyCache:
+    """
+    Per-process LRU of compressed bodies keyed by (encoding, digest of the uncompressed body),
+    bounded by total bytes. Identical responses (picker pages, fragments, the changelog modal,
+    JSON dumps) are compressed once; a BLAKE2 digest costs a fraction of a Brotli pass.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(encoding, content):
+        return encoding, hashlib.blake2b(content, digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes // 8:
+            return  # one large body would evict everything else
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _key, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+body_cache = CompressedBodyCache(getattr(settings, "COMPRESSION_CACHE_BYTES", 4 * 1024 * 1024))
+
+
+def compress_bytes(encoding, content):
+    if encoding == "br":
+        quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 4)
+        return brotli.compress(content, mode=brotli.MODE_TEXT, quality=quality)
+    return compress_string(content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+def _brotli_sequence(sequence, quality):
+    # Flush after every chunk so each part of a streamed page reaches the client as soon as it is produced
+    compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _brotli_sequence_async(sequence, quality):
+    compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _gzip_sequence_async(sequence):
+    # Async counterpart of django.utils.text.compress_sequence (sync flush per chunk)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in sequence:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses for clients that reach gunicorn directly (APP_BIND, internal tools, probes).
+    Behind nginx a response that already has Content-Encoding is passed through, not compressed again.
+
+    - Brotli or gzip, negotiated from Accept-Encoding;
+    - only COMPRESSION_CONTENT_TYPES, and non-streaming bodies of at least COMPRESSION_MIN_SIZE bytes;
+    - streaming responses are compressed chunk by chunk (flushed per chunk), sync or async;
+    - compressed bodies are reused from a per-process cache when the same body is sent again.
+    Placed after WhiteNoise, which serves its own precompressed static files.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "COMPRESSION_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.content_types = tuple(getattr(settings, "COMPRESSION_CONTENT_TYPES", DEFAULT_CONTENT_TYPES))
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        try:
+            self.compress(request, response)
+        except Exception:
+            # Sending the body uncompressed is always correct
+            logger.exception("Response compression failed")
+        return response
+
+    def _compressible(self, response):
+        if response.has_header("Content-Encoding") or response.has_header("Content-Range"):
+            return False
+        if getattr(response, "file_to_stream", None) is not None:
+            return False  # FileResponse: keep the sendfile path (wsgi.file_wrapper)
+        content_type = response.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        return content_type in self.content_types
+
+    def compress(self, request, response):
+        if request.method == "HEAD" or not self._compressible(response):
+            return
+        # Whatever the outcome, the body depends on Accept-Encoding from here on
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return
+
+        if response.streaming:
+            quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 4)
+            if response.is_async:
+                if encoding == "br":
+                    response.streaming_content = _brotli_sequence_async(response.streaming_content, quality)
+                else:
+                    response.streaming_content = _gzip_sequence_async(response.streaming_content)
+            elif encoding == "br":
+                response.streaming_content = _brotli_sequence(response.streaming_content, quality)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=GZIP_MAX_RANDOM_BYTES
+                )
+            # Length is no longer known in advance
+            del response.headers["Content-Length"]
+        else:
+            content = response.content
+            if len(content) < self.min_size:
+                return
+            key = body_cache.key(encoding, content)
+            compressed = body_cache.get(key)
+            if compressed is None:
+                compressed = compress_bytes(encoding, content)
+                body_cache.put(key, compressed)
+            if len(compressed) >= len(content):
+                return
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # A strong ETag names the uncompressed representation; weaken it (as django.middleware.gzip does)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
@@ -0,0 +1,4 @@
+"""
+PostgreSQL backend with connection metrics and optional per-worker psycopg pooling.
+Used as DATABASES["default"]["ENGINE"] = "pmg_portal.db_backend".
+"""
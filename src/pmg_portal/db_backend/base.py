@@ -0,0 +1,174 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: PostgreSQL backend with connection-acquire metrics and optional psycopg_pool pooling
+Path: src/pmg_portal/db_backend/base.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import os
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base as postgresql
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionMetrics:
+    """
+    Per-process counters. An "acquire" is the first query of a request (or other unit of work
+    bounded by close_old_connections) on a connection: either the persistent connection is reused,
+    or a new one is opened / taken from the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.acquires = 0
+            self.reused = 0
+            self.acquire_ms_total = 0.0
+            self.acquire_ms_max = 0.0
+            self.connects = 0
+            self.connect_ms_total = 0.0
+            self.connect_ms_max = 0.0
+
+    def record_acquire(self, reused, ms):
+        with self._lock:
+            self.acquires += 1
+            self.reused += 1 if reused else 0
+            self.acquire_ms_total += ms
+            self.acquire_ms_max = max(self.acquire_ms_max, ms)
+
+    def record_connect(self, ms):
+        with self._lock:
+            self.connects += 1
+            self.connect_ms_total += ms
+            self.connect_ms_max = max(self.connect_ms_max, ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "acquires": self.acquires,
+                "reused": self.reused,
+                "reuse_ratio": round(self.reused / self.acquires, 3) if self.acquires else None,
+                "acquire_ms_avg": round(self.acquire_ms_total / self.acquires, 3) if self.acquires else None,
+                "acquire_ms_max": round(self.acquire_ms_max, 3),
+                "connects": self.connects,
+                "connect_ms_avg": round(self.connect_ms_total / self.connects, 3) if self.connects else None,
+                "connect_ms_max": round(self.connect_ms_max, 3),
+            }
+
+
+metrics = ConnectionMetrics()
+
+
+def connection_metrics():
+    """Metrics for this worker, plus psycopg pool statistics when pooling is enabled."""
+    data = metrics.snapshot()
+    pools = {alias: pool.get_stats() for (pid, alias), pool in list(_pools.items()) if pid == os.getpid()}
+    if pools:
+        data["pools"] = pools
+    return data
+
+
+class DatabaseWrapper(postgresql.DatabaseWrapper):
+    """
+    Stock PostgreSQL backend plus:
+
+    - metrics for every connection acquire (reuse vs new, latency including the CONN_HEALTH_CHECKS
+      ping) and every physical connect, see connection_metrics();
+    - OPTIONS["pool"] = {"min_size": .., "max_size": .., "timeout": ..}: connections come from a
+      per-worker psycopg_pool.ConnectionPool and are returned to it on close (use CONN_MAX_AGE = 0).
+      Django 5.0 has no built-in pool support; this mirrors what 5.1 does.
+    """
+
+    _acquired = False
+
+    @property
+    def pool(self):
+        pool_options = self.settings_dict["OPTIONS"].get("pool")
+        if not pool_options:
+            return None
+        key = (os.getpid(), self.alias)
+        pool = _pools.get(key)
+        if pool is not None:
+            return pool
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                try:
+                    from psycopg_pool import ConnectionPool
+                except ImportError:
+                    raise ImproperlyConfigured("DB_POOL requires the psycopg-pool package (pip install psycopg-pool).")
+                if self.settings_dict["CONN_MAX_AGE"] != 0:
+                    raise ImproperlyConfigured("Pooled connections require CONN_MAX_AGE = 0.")
+                options = {} if pool_options is True else dict(pool_options)
+                pool = ConnectionPool(
+                    kwargs=self.get_connection_params(),
+                    name=f"pmg-portal-{self.alias}",
+                    open=True,
+                    check=ConnectionPool.check_connection,
+                    **options,
+                )
+                _pools[key] = pool
+        return pool
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Our option, not a libpq/psycopg connect parameter
+        params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        pool = self.pool
+        if pool is None:
+            connection = super().get_new_connection(conn_params)
+        else:
+            # Same isolation level handling as the parent, but the connection comes from the pool
+            isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+            try:
+                self.isolation_level = postgresql.IsolationLevel(
+                    postgresql.IsolationLevel.READ_COMMITTED if isolation_level is None else isolation_level
+                )
+            except ValueError:
+                raise ImproperlyConfigured(
+                    f"Invalid transaction isolation level {isolation_level} specified. "
+                    f"Use one of the psycopg.IsolationLevel values."
+                )
+            connection = pool.getconn()
+            if isolation_level is not None:
+                connection.isolation_level = self.isolation_level
+        metrics.record_connect((time.perf_counter() - start) * 1000)
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is not None and self.connection is not None:
+            with self.wrap_database_errors:
+                pool.putconn(self.connection)
+            return
+        super()._close()
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs at the start and end of each request (close_old_connections): the next query acquires
+        self._acquired = False
+        super().close_if_unusable_or_obsolete()
+
+    def _cursor(self, name=None):
+        if not self._acquired:
+            self._acquired = True
+            before = self.connection
+            start = time.perf_counter()
+            self.close_if_health_check_failed()
+            self.ensure_connection()
+            reused = before is not None and self.connection is before
+            metrics.record_acquire(reused, (time.perf_counter() - start) * 1000)
+        return super()._cursor(name)
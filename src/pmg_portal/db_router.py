@@ -0,0 +1,108 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Read-replica routing with read-your-writes stickiness
+Path: src/pmg_portal/db_router.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import contextvars
+import random
+import time
+
+from django.conf import settings
+
+PRIMARY = "default"
+
+# Routing state of the request being handled; None outside requests (management commands,
+# background flushers), which always use the primary.
+_request_state = contextvars.ContextVar("replica_routing", default=None)
+
+# Apps whose reads must never lag behind their writes (the session row written at login is read on
+# the very next request) and whose writes do not count as user writes (sessions are saved often).
+PRIMARY_ONLY_APPS = {"sessions"}
+
+PIN_COOKIE_SALT = "pmg_portal.db_router.pin"
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+class RoutingState:
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary. Reads inside a request go to a random replica unless the request is
+    pinned to the primary: unsafe methods (POST etc.), requests after this user's last write within
+    REPLICA_PIN_SECONDS (pin cookie), and any read after a write in the same request.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.pinned or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY
+        replicas = replica_aliases()
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            # Read-your-writes: the rest of this request and the pin window read from the primary
+            state.wrote = True
+            state.pinned = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas are physical copies of the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaPinningMiddleware:
+    """
+    Set up routing state per request and maintain the pin cookie. The cookie holds the time until
+    which this browser reads from the primary; it is (re)set whenever the request wrote through the
+    ORM or was a successful POST/PUT/PATCH/DELETE. It is signed with a timestamp and only honoured
+    for REPLICA_PIN_SECONDS, so a forged or replayed cookie cannot pin a browser to the primary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, "REPLICA_PIN_COOKIE", "pmg_primary_until")
+        self.window = getattr(settings, "REPLICA_PIN_SECONDS", 10)
+
+    def __call__(self, request):
+        unsafe = request.method not in ("GET", "HEAD", "OPTIONS")
+        pinned = unsafe
+        try:
+            until = float(request.get_signed_cookie(self.cookie_name, 0, salt=PIN_COOKIE_SALT, max_age=self.window))
+            pinned = pinned or until > time.time()
+        except ValueError:
+            pass
+        state = RoutingState(pinned)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        # Writes made outside the ORM's models still count: e.g. a view that only updates the session
+        if state.wrote or (unsafe and response.status_code < 400):
+            response.set_signed_cookie(
+                self.cookie_name,
+                str(int(time.time() + self.window)),
+                salt=PIN_COOKIE_SALT,
+                max_age=self.window,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,117 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Liveness and readiness probes answered before the rest of the middleware stack
+Path: src/pmg_portal/health.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+_readiness_lock = threading.Lock()
+_readiness_result = None  # (monotonic timestamp, status code, payload)
+
+
+def _timed(check):
+    start = time.perf_counter()
+    try:
+        check()
+        result = {"ok": True}
+    except Exception as e:
+        logger.warning(f"Readiness check {check.__name__} failed: {e}")
+        result = {"ok": False, "error": e.__class__.__name__}
+    result["ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def check_database():
+    """SELECT 1 on every configured database (primary and replicas), bounded by a statement timeout on PostgreSQL."""
+    timeout_ms = int(getattr(settings, "HEALTH_DB_TIMEOUT", 1.0) * 1000)
+    for alias in settings.DATABASES:
+        connection = connections[alias]
+        with transaction.atomic(using=alias):
+            with connection.cursor() as cursor:
+                if connection.vendor == "postgresql":
+                    cursor.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+
+
+def check_cache():
+    """Write and read back a unique value."""
+    token = uuid.uuid4().hex
+    cache.set("health_probe", token, 5)
+    if cache.get("health_probe") != token:
+        raise RuntimeError("cache round-trip returned a different value")
+
+
+def check_media():
+    """Create and remove a file in MEDIA_ROOT (logo uploads need it writable)."""
+    with tempfile.NamedTemporaryFile(dir=settings.MEDIA_ROOT, prefix=".health-"):
+        pass
+
+
+READINESS_CHECKS = {
+    "database": check_database,
+    "cache": check_cache,
+    "media": check_media,
+}
+
+
+def readiness():
+    """
+    Run the readiness checks and return (status, payload). The result is reused for
+    HEALTH_CHECK_CACHE_SECONDS, and concurrent probes wait for one run instead of each hitting the DB.
+    """
+    global _readiness_result
+    ttl = getattr(settings, "HEALTH_CHECK_CACHE_SECONDS", 1.0)
+    result = _readiness_result
+    if result is not None and time.monotonic() - result[0] < ttl:
+        return result[1], result[2]
+    with _readiness_lock:
+        result = _readiness_result
+        if result is not None and time.monotonic() - result[0] < ttl:
+            return result[1], result[2]
+        checks = {name: _timed(check) for name, check in READINESS_CHECKS.items()}
+        ok = all(c["ok"] for c in checks.values())
+        status = 200 if ok else 503
+        payload = {"status": "ok" if ok else "unavailable", "pid": os.getpid(), "checks": checks}
+        _readiness_result = (time.monotonic(), status, payload)
+        return status, payload
+
+
+class HealthCheckMiddleware:
+    """
+    Answer liveness (HEALTH_LIVENESS_PATH) and readiness (HEALTH_READINESS_PATH) probes directly.
+    Place first in MIDDLEWARE: probes skip sessions, auth, locale, CSRF and context processors, and
+    since request.get_host() is never called they also work against the bare IP (no ALLOWED_HOSTS).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.liveness_path = getattr(settings, "HEALTH_LIVENESS_PATH", "/healthz/")
+        self.readiness_path = getattr(settings, "HEALTH_READINESS_PATH", "/readyz/")
+
+    def __call__(self, request):
+        path = request.path_info
+        if request.method in ("GET", "HEAD") and path in (self.liveness_path, self.readiness_path):
+            if path == self.liveness_path:
+                response = JsonResponse({"status": "ok"})
+            else:
+                status, payload = readiness()
+                response = JsonResponse(payload, status=status)
+            response["Cache-Control"] = "no-store"
+            return response
+        return self.get_response(request)
@@ -0,0 +1,198 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Non-blocking logging pipeline (queue + listener thread, JSON records, per-call-site rate limits)
+Path: src/pmg_portal/log_pipeline.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_valid_request_id = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+_current_request = contextvars.ContextVar("log_request", default=None)
+
+
+class RequestLogContextMiddleware:
+    """
+    Give each request an id (X-Request-ID from nginx when present and sane, else a new one), make
+    the request available to RequestContextFilter and return the id in the response header, so a
+    log line can be matched to the request that produced it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")
+        if not _valid_request_id.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = _current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Add request_id, view and customer_id of the current request to each record. Runs on the
+    logging thread (before the queue), where the request context is still known. Records of
+    django.request carry their request themselves (they are logged after the middleware returned).
+    """
+
+    def filter(self, record):
+        request = getattr(record, "request", None) or _current_request.get()
+        if request is None:
+            return True
+        record.request_id = getattr(request, "request_id", None)
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            record.view = match.view_name
+        customer = getattr(request, "active_customer", None)
+        customer_id = customer.pk if customer is not None else (match.kwargs.get("customer_id") if match else None)
+        if customer_id is not None:
+            record.customer_id = customer_id
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    At most `rate` records per call site (logger, file and line) every `per` seconds; the rest are
+    dropped. The first record of a site after a dropped burst carries `suppressed` (the number
+    dropped). Records at `level` and above (ERROR by default) are never limited.
+    """
+
+    def __init__(self, rate=20, per=10.0, level=logging.ERROR):
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self.level = logging._checkLevel(level)
+        self._sites = {}  # (name, pathname, lineno) -> [window start, count, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.level or self.rate <= 0:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.per:
+                suppressed = site[2] if site is not None else 0
+                self._sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if site[1] < self.rate:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request fields and any exception."""
+
+    FIELDS = ("request_id", "view", "customer_id", "suppressed")
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class QueueingHandler(QueueHandler):
+    """
+    Console handler that never blocks the caller: records go to a bounded in-memory queue and a
+    QueueListener thread formats and writes them to stderr (journald under systemd). When the queue
+    is full the record is dropped and counted; the count is logged once there is room again.
+    Use as the "class" of a handler in settings.LOGGING; its formatter applies on the listener thread.
+    """
+
+    def __init__(self, queue_size=10000, stream=None):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self._listener = None
+        self._start()
+        atexit.register(self.stop)
+        if hasattr(os, "register_at_fork"):
+            # A forked child has the queue but not the listener thread
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._listener = QueueListener(self.queue, self.target)
+        self._listener.start()
+
+    def stop(self):
+        """Write out everything still queued (called at exit)."""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Only what cannot cross threads is resolved here: the message and the traceback text.
+        # Formatting (JSON or text) happens on the listener thread.
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args, record.message = message, None, message
+        record.exc_info, record.exc_text = None, exc_text
+        record.__dict__.pop("request", None)  # django.request records: the fields were taken already
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            notice = logging.makeLogRecord({
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"Log queue was full: dropped {dropped} record(s)",
+            })
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                self.dropped += dropped
@@ -12,17 +12,18 @@ import logging
 from django.utils.deprecation import MiddlewareMixin
 from django.db import connection
 
+from portal import query_profiler
+from . import trace_store
+
 logger = logging.getLogger('pmg_portal.debug')
 
 
 class DebugLoggingMiddleware(MiddlewareMixin):
     """
     Middleware to log all requests, responses, database queries, and processing times.
-    Stores logs in memory for debug view access.
+    Finished requests go to the shared trace store (pmg_portal.trace_store), so /debug/ sees the
+    requests of every worker and they survive restarts.
     """
-    # In-memory log storage (last 100 requests)
-    _request_logs = []
-    _max_logs = 100
     
     def process_request(self, request):
         """Log incoming request details."""
@@ -112,9 +113,11 @@ class DebugLoggingMiddleware(MiddlewareMixin):
                     q_time = float(query.get('time', 0)) * 1000
                     db_time_ms += q_time
                     if q_time >= 200:
+                        # Query shape without values; aggregates per shape are on /debug/queries/
                         slow_queries.append({
                             'time_ms': round(q_time, 2),
-                            'sql': query.get('sql', '')[:500],
+                            'fingerprint': query_profiler.fingerprint(query.get('sql', '')),
+                            'sql': query_profiler.normalize(query.get('sql', ''))[:500],
                         })
                 except Exception:
                     continue
@@ -126,15 +129,16 @@ class DebugLoggingMiddleware(MiddlewareMixin):
                 'db_queries': db_queries,
                 'db_time_ms': round(db_time_ms, 2),
                 'slow_queries': slow_queries,
+                'context_processor_ms': {
+                    name: round(ms, 2) for name, ms in getattr(request, 'context_processor_timings', {}).items()
+                },
                 'processing_time': round(processing_time * 1000, 2),  # milliseconds
                 'response_size': len(response.content) if hasattr(response, 'content') else 0,
                 'response_content_type': getattr(response, 'get', lambda x, d=None: None)('Content-Type', None),
             })
             
-            # Add to logs (keep only last N)
-            self._request_logs.append(request._log_entry)
-            if len(self._request_logs) > self._max_logs:
-                self._request_logs.pop(0)
+            # Queued in memory; written to the shared store by a background thread
+            trace_store.append(request._log_entry)
             
             logger.info(
                 f"Response: {request.method} {request.path} - "
@@ -166,11 +170,12 @@ class DebugLoggingMiddleware(MiddlewareMixin):
         return ip
     
     @classmethod
-    def get_logs(cls, limit=50):
-        """Get recent logs for debug view."""
-        return cls._request_logs[-limit:]
+    def get_logs(cls, limit=50, **filters):
+        """Get recent logs for debug view (newest first), see trace_store.query for filters."""
+        traces, _next_before = trace_store.query(limit=limit, **filters)
+        return traces
     
     @classmethod
     def clear_logs(cls):
         """Clear all logs."""
-        cls._request_logs = []
+        trace_store.clear()
@@ -0,0 +1,183 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: On-demand and sampled cProfile runs of single requests (.pstats files listed on /debug/profiles/)
+Path: src/pmg_portal/request_profiler.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_FLAG = "_profile"
+_name_re = re.compile(r"[0-9]{8}-[0-9]{6}-[0-9a-f]{8}")
+
+# One profiled request per process at a time: the profiler hooks are process-wide on newer Pythons,
+# and it bounds the overhead when several sampled requests coincide
+_busy = threading.Lock()
+_last_sample = {}  # url_name -> time.monotonic() of its last sampled profile
+
+
+def profile_dir():
+    return Path(getattr(settings, "REQUEST_PROFILER_DIR", settings.BASE_DIR.parent / "var" / "profiles"))
+
+
+def _requested(request):
+    if request.headers.get(PROFILE_HEADER) != "1" and request.GET.get(PROFILE_QUERY_FLAG) != "1":
+        return False
+    user = getattr(request, "user", None)
+    return user is not None and user.is_superuser
+
+
+def _sampled(url_name):
+    rate = getattr(settings, "REQUEST_PROFILER_SAMPLE_RATE", 0.01)
+    if rate <= 0 or random.random() >= rate:
+        return False
+    now = time.monotonic()
+    last = _last_sample.get(url_name)
+    if last is not None and now - last < getattr(settings, "REQUEST_PROFILER_SAMPLE_INTERVAL", 600):
+        return False
+    _last_sample[url_name] = now
+    return True
+
+
+def save(profiler, meta):
+    """Write the profile as <name>.pstats plus <name>.json (metadata); returns the name."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{os.urandom(4).hex()}"
+    profiler.dump_stats(directory / f"{name}.pstats.tmp")
+    os.replace(directory / f"{name}.pstats.tmp", directory / f"{name}.pstats")
+    (directory / f"{name}.json").write_text(json.dumps(meta))
+    _prune(directory)
+    return name
+
+
+def _prune(directory):
+    keep = getattr(settings, "REQUEST_PROFILER_MAX_FILES", 200)
+    files = sorted(directory.glob("*.json"))
+    for old in files[:max(len(files) - keep, 0)]:
+        for path in (old, old.with_suffix(".pstats")):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Metadata of stored profiles, newest first."""
+    profiles = []
+    directory = profile_dir()
+    if not directory.is_dir():
+        return profiles
+    for path in sorted(directory.glob("*.json"), reverse=True):
+        try:
+            meta = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        meta["name"] = path.stem
+        profiles.append(meta)
+    return profiles
+
+
+def profile_path(name):
+    """Path of a stored .pstats file, or None for unknown or malformed names."""
+    if not _name_re.fullmatch(name or ""):
+        return None
+    path = profile_dir() / f"{name}.pstats"
+    return path if path.is_file() else None
+
+
+def report(name, sort="cumulative", limit=60):
+    """Text table of the top functions of a stored profile (pstats print_stats), or None."""
+    path = profile_path(name)
+    if path is None:
+        return None
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+class RequestProfilerMiddleware:
+    """
+    Run cProfile around the view and template render of one request and store the result as .pstats
+    (listed on /debug/profiles/, readable with `python -m pstats` or snakeviz). Two triggers:
+    - a superuser sends X-Profile: 1 or ?_profile=1; the response names the stored profile in X-Profile;
+    - automatic sampling of REQUEST_PROFILER_SAMPLE_RATE of requests, at most one per url_name every
+      REQUEST_PROFILER_SAMPLE_INTERVAL seconds, so continuous profiling has a bounded cost.
+    Must be placed after AuthenticationMiddleware. Disabled with REQUEST_PROFILER_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILER_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._profiler = None
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler = request._profiler
+            if profiler is not None:
+                profiler.disable()
+                _busy.release()
+        if profiler is None:
+            return response
+        duration_ms = round((time.perf_counter() - request._profiler_start) * 1000, 1)
+        match = request.resolver_match
+        meta = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "method": request.method,
+            "path": request.path[:300],
+            "view": match.view_name if match else "",
+            "status": response.status_code,
+            "duration_ms": duration_ms,
+            "trigger": request._profiler_trigger,
+            "request_id": getattr(request, "request_id", ""),
+        }
+        try:
+            name = save(profiler, meta)
+        except OSError as e:
+            logger.warning(f"Could not store request profile: {e}")
+            return response
+        if request._profiler_trigger == "manual":
+            response[PROFILE_HEADER] = name
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if _requested(request):
+            trigger = "manual"
+        elif _sampled(request.resolver_match.view_name):
+            trigger = "sampled"
+        else:
+            return None
+        if not _busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is active in this process
+            _busy.release()
+            return None
+        request._profiler = profiler
+        request._profiler_trigger = trigger
+        request._profiler_start = time.perf_counter()
+        return None
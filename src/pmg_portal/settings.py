@@ -39,22 +39,46 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "pmg_portal.health.HealthCheckMiddleware",  # /healthz/ and /readyz/ answered before everything else
+    "pmg_portal.log_pipeline.RequestLogContextMiddleware",  # Request id (X-Request-ID) and context for log records
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "pmg_portal.compression.CompressionMiddleware",  # Brotli/gzip for everything WhiteNoise does not serve
+    "portal.middleware.QueryProfilerMiddleware",  # SQL fingerprints and timings per view (portal.query_profiler)
+    "portal.middleware.ContextProcessorTimingMiddleware",  # Per-request context processor timings (Server-Timing)
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "portal.middleware.LanguagePreferenceMiddleware",  # Custom language preference (after AuthenticationMiddleware)
+    "portal.middleware.ActivityContextMiddleware",  # Actor/IP/path for the activity log (after AuthenticationMiddleware)
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "pmg_portal.request_profiler.RequestProfilerMiddleware",  # cProfile of single requests (after AuthenticationMiddleware)
 ]
 
 # Only enable debug logging middleware in DEBUG mode (performance optimization)
 if DEBUG:
     MIDDLEWARE.append("pmg_portal.logging_middleware.DebugLoggingMiddleware")
 
+# Request traces of DebugLoggingMiddleware, shared by all workers (pmg_portal.trace_store): a SQLite
+# ring buffer in WAL mode keeping the last DEBUG_TRACE_CAPACITY requests
+DEBUG_TRACE_PATH = Path(env("DEBUG_TRACE_PATH", str(BASE_DIR.parent / "var" / "request-traces.sqlite3")))
+DEBUG_TRACE_CAPACITY = int(env("DEBUG_TRACE_CAPACITY", "5000"))
+DEBUG_TRACE_SLOW_MS = 500  # "slow only" filter on /debug/
+DEBUG_TRACE_FLUSH_INTERVAL = 1.0  # seconds between batched writes per worker
+
+# Request profiler (pmg_portal.request_profiler): cProfile around view and template render, stored as
+# .pstats in REQUEST_PROFILER_DIR and listed on /debug/profiles/. Superusers trigger it per request
+# (X-Profile: 1 header or ?_profile=1); REQUEST_PROFILER_SAMPLE_RATE of all requests are profiled
+# automatically, at most one per view every REQUEST_PROFILER_SAMPLE_INTERVAL seconds per worker.
+REQUEST_PROFILER_ENABLED = env("REQUEST_PROFILER_ENABLED", "true").lower() == "true"
+REQUEST_PROFILER_DIR = Path(env("REQUEST_PROFILER_DIR", str(BASE_DIR.parent / "var" / "profiles")))
+REQUEST_PROFILER_SAMPLE_RATE = float(env("REQUEST_PROFILER_SAMPLE_RATE", "0.01"))
+REQUEST_PROFILER_SAMPLE_INTERVAL = int(env("REQUEST_PROFILER_SAMPLE_INTERVAL", "600"))
+REQUEST_PROFILER_MAX_FILES = 200  # oldest profiles are deleted beyond this
+
 ROOT_URLCONF = "pmg_portal.urls"
 
 TEMPLATES = [
@@ -81,16 +105,59 @@ TEMPLATES = [
 WSGI_APPLICATION = "pmg_portal.wsgi.application"
 ASGI_APPLICATION = "pmg_portal.asgi.application"
 
+# Database connections
+# - DB_CONN_MAX_AGE: seconds a worker keeps its connection open (persistent connections, checked
+#   with a cheap ping at the start of each request via CONN_HEALTH_CHECKS). 0 = new connection per request.
+# - DB_POOL: take connections from a per-worker psycopg_pool.ConnectionPool instead (needs
+#   psycopg-pool; CONN_MAX_AGE is forced to 0 so connections go back to the pool after each request).
+# - DB_PGBOUNCER: behind PgBouncer in transaction mode: no server-side cursors; prepared statements
+#   stay disabled (prepare_threshold=None, Django's default). Set the role's timezone to UTC
+#   (ALTER ROLE ... SET timezone TO 'UTC') so Django never issues a session-level SET.
+# The pmg_portal.db_backend engine reports acquire latency and reuse ratio on /debug/.
+DB_POOL = env("DB_POOL", "false").lower() == "true"
+DB_PGBOUNCER = env("DB_PGBOUNCER", "false").lower() == "true"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "pmg_portal.db_backend",
         "NAME": env("POSTGRES_DB"),
         "USER": env("POSTGRES_USER"),
         "PASSWORD": env("POSTGRES_PASSWORD"),
         "HOST": env("POSTGRES_HOST", "127.0.0.1"),
         "PORT": env("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": 0 if DB_POOL else int(env("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": DB_PGBOUNCER,
+        "OPTIONS": {
+            "connect_timeout": int(env("DB_CONNECT_TIMEOUT", "5")),
+            "prepare_threshold": None,
+        },
     }
 }
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(env("DB_POOL_MIN_SIZE", "1")),
+        "max_size": int(env("DB_POOL_MAX_SIZE", "4")),
+        "timeout": float(env("DB_POOL_TIMEOUT", "10")),
+    }
+
+# Read replicas (streaming replicas of the primary, same credentials): POSTGRES_REPLICA_HOSTS is a
+# comma-separated list of host[:port]. Reads inside requests go to a replica unless the user wrote
+# within REPLICA_PIN_SECONDS (pin cookie) or the request is a POST; see pmg_portal.db_router.
+REPLICA_PIN_SECONDS = int(env("REPLICA_PIN_SECONDS", "10"))
+for _i, _replica in enumerate(h.strip() for h in env("POSTGRES_REPLICA_HOSTS", "").split(",") if h.strip()):
+    _host, _, _port = _replica.partition(":")
+    DATABASES[f"replica{_i + 1}"] = {
+        **DATABASES["default"],
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+        "HOST": _host,
+        "PORT": _port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+if len(DATABASES) > 1:
+    DATABASE_ROUTERS = ["pmg_portal.db_router.PrimaryReplicaRouter"]
+    # Right after the health probes, so the pin cookie is honoured by every later middleware
+    MIDDLEWARE.insert(1, "pmg_portal.db_router.ReplicaPinningMiddleware")
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -99,14 +166,6 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
-# Enable database query logging for debug view (only in DEBUG mode)
-if DEBUG:
-    LOGGING["loggers"]["django.db.backends"] = {
-        "handlers": ["console"],
-        "level": "DEBUG",
-        "propagate": False,
-    }
-
 LANGUAGE_CODE = "en"
 LANGUAGES = [
     ("en", "English"),
@@ -124,8 +183,79 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 # Media files (user uploads)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR.parent / "media"
+# nginx internal location for media (X-Accel-Redirect), e.g. "/protected-media/". Empty = serve via sendfile fallback.
+MEDIA_ACCEL_REDIRECT = env("MEDIA_ACCEL_REDIRECT", "")
+
+# Uploads: hard cap for customer logos (bytes), streamed to disk in chunks
+LOGO_MAX_UPLOAD_SIZE = int(env("LOGO_MAX_UPLOAD_SIZE", str(5 * 1024 * 1024)))
+# Form uploads larger than this go to a temp file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+# Response compression (pmg_portal.compression) for clients reaching gunicorn without nginx:
+# Brotli or gzip by Accept-Encoding, for the text types in COMPRESSION_CONTENT_TYPES (default in the
+# module) and bodies of at least COMPRESSION_MIN_SIZE bytes; streaming responses are compressed per
+# chunk. Compressed bodies are reused per worker (up to COMPRESSION_CACHE_BYTES) when sent again.
+COMPRESSION_ENABLED = env("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(env("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_BROTLI_QUALITY = 4  # 0-11; 4 is about as fast as gzip -6 and smaller
+COMPRESSION_CACHE_BYTES = 4 * 1024 * 1024
+
+# Health probes (pmg_portal.health): liveness never touches backends; readiness checks DB, cache
+# and media storage and reuses its result for HEALTH_CHECK_CACHE_SECONDS per worker.
+HEALTH_LIVENESS_PATH = "/healthz/"
+HEALTH_READINESS_PATH = "/readyz/"
+HEALTH_CHECK_CACHE_SECONDS = 1.0
+HEALTH_DB_TIMEOUT = 1.0  # seconds, statement timeout for the readiness SELECT 1
+
+# Activity/audit log (portal.activity): events are buffered per process and written in batches
+# by a background thread, so requests never wait on the insert.
+ACTIVITY_LOG_ENABLED = env("ACTIVITY_LOG_ENABLED", "true").lower() == "true"
+ACTIVITY_LOG_FLUSH_INTERVAL = float(env("ACTIVITY_LOG_FLUSH_INTERVAL", "2"))  # seconds between flushes
+ACTIVITY_LOG_BATCH_SIZE = 500  # rows per INSERT; a full batch also triggers an early flush
+ACTIVITY_LOG_MAX_BUFFER = 10000  # events kept in memory while the database is unreachable
+ACTIVITY_LOG_RETENTION_MONTHS = int(env("ACTIVITY_LOG_RETENTION_MONTHS", "24"))  # 0 = keep forever
+
+# Portal link clicks are counted in memory per worker and written in bulk every N seconds
+LINK_CLICK_FLUSH_INTERVAL = float(env("LINK_CLICK_FLUSH_INTERVAL", "10"))
+
+# Background jobs (portal.jobs): queued in the database and run by `manage.py worker`
+# (deploy/systemd/pmg-portal-worker.service). Failed jobs retry with exponential backoff.
+JOB_POLL_INTERVAL = float(env("JOB_POLL_INTERVAL", "1"))  # seconds a worker sleeps when the queue is empty
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 10  # seconds before the first retry, doubled per attempt
+JOB_RETRY_BACKOFF_MAX = 3600
+JOB_TIMEOUT = int(env("JOB_TIMEOUT", "900"))  # a job running longer is assumed lost (worker died) and requeued
+JOB_RETENTION_DAYS = int(env("JOB_RETENTION_DAYS", "7"))  # finished jobs are pruned after this
+
+# Portal link health checks (portal.link_health): the worker queues a check job whenever links were
+# last checked more than LINK_CHECK_INTERVAL seconds ago; `manage.py check_links` runs one by hand.
+# Results are shown in the admin link list.
+LINK_CHECK_ENABLED = env("LINK_CHECK_ENABLED", "true").lower() == "true"
+LINK_CHECK_INTERVAL = int(env("LINK_CHECK_INTERVAL", "86400"))
+LINK_CHECK_CONCURRENCY = int(env("LINK_CHECK_CONCURRENCY", "100"))  # requests in flight
+LINK_CHECK_PER_HOST = int(env("LINK_CHECK_PER_HOST", "4"))  # requests in flight per host
+LINK_CHECK_TIMEOUT = float(env("LINK_CHECK_TIMEOUT", "10"))  # seconds per link, redirects and GET fallback included
+LINK_CHECK_TIME_BUDGET = 600  # seconds one check job runs (stays below JOB_TIMEOUT)
+
+# Query profiler (portal.query_profiler): statements inside requests are timed and aggregated per SQL
+# fingerprint and view (calls, total, p95 from a fixed histogram), merged into QueryStat by a background
+# thread. SELECTs slower than QUERY_PROFILER_SLOW_MS get a sampled EXPLAIN (ANALYZE, BUFFERS), at most
+# one per query shape per QUERY_PROFILER_EXPLAIN_INTERVAL seconds and worker. Report: /debug/queries/
+QUERY_PROFILER_ENABLED = env("QUERY_PROFILER_ENABLED", "true").lower() == "true"
+QUERY_PROFILER_SLOW_MS = float(env("QUERY_PROFILER_SLOW_MS", "200"))
+QUERY_PROFILER_EXPLAIN_SAMPLE_RATE = float(env("QUERY_PROFILER_EXPLAIN_SAMPLE_RATE", "0.1"))
+QUERY_PROFILER_EXPLAIN_INTERVAL = 300
+QUERY_PROFILER_EXPLAIN_TIMEOUT = 5.0  # seconds, statement timeout for the EXPLAIN ANALYZE run
+QUERY_PROFILER_FLUSH_INTERVAL = float(env("QUERY_PROFILER_FLUSH_INTERVAL", "10"))
+
+# Customer/user deletion (portal.deletion): hidden at once, dependents purged by a job in batches
+# of this many rows, one short transaction each
+DELETION_BATCH_SIZE = 1000
 
 # WhiteNoise configuration for serving static files in production
+# collectstatic fingerprints every file (app.<hash>.css) and writes .gz and, with the Brotli package
+# installed, .br copies next to it. WhiteNoise serves fingerprinted files with a one-year immutable
+# Cache-Control and picks the precompressed variant from Accept-Encoding.
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # Caching configuration
@@ -150,19 +280,52 @@ LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/account/login/"
 
 ENABLE_REGISTRATION = env("ENABLE_REGISTRATION", "true").lower() == "true"
+# Login and register pages hold no per-visitor state (accounts.views.page_state supplies the CSRF
+# token and messages), so they are rendered once per language and worker, and browsers and proxies
+# may reuse them for this many seconds (then revalidate with the ETag)
+PUBLIC_PAGE_MAX_AGE = int(env("PUBLIC_PAGE_MAX_AGE", "300"))
 
 # Production-friendly defaults (keep simple)
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
 
-# Logging configuration for debugging
+# Logging (pmg_portal.log_pipeline): records are queued and written to stderr by a listener thread,
+# so a slow stdout/journald never blocks a request. LOG_FORMAT "json" gives one object per line with
+# request_id, view and customer_id; "text" is the classic line. Each call site may log at most
+# LOG_RATE_LIMIT records (below ERROR) per LOG_RATE_WINDOW seconds; a full queue drops records.
+LOG_FORMAT = env("LOG_FORMAT", "text" if DEBUG else "json")
+LOG_QUEUE_SIZE = int(env("LOG_QUEUE_SIZE", "10000"))
+LOG_RATE_LIMIT = int(env("LOG_RATE_LIMIT", "20"))
+LOG_RATE_WINDOW = float(env("LOG_RATE_WINDOW", "10"))
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "rate_limit": {
+            "()": "pmg_portal.log_pipeline.RateLimitFilter",
+            "rate": LOG_RATE_LIMIT,
+            "per": LOG_RATE_WINDOW,
+        },
+        "request_context": {
+            "()": "pmg_portal.log_pipeline.RequestContextFilter",
+        },
+    },
+    "formatters": {
+        "json": {
+            "()": "pmg_portal.log_pipeline.JsonFormatter",
+        },
+        "text": {
+            "format": "[%(asctime)s] %(levelname)s %(name)s: %(message)s",
+        },
+    },
     "handlers": {
         "console": {
-            "class": "logging.StreamHandler",
+            "class": "pmg_portal.log_pipeline.QueueingHandler",
+            "queue_size": LOG_QUEUE_SIZE,
+            "formatter": LOG_FORMAT if LOG_FORMAT in ("json", "text") else "json",
+            "filters": ["rate_limit", "request_context"],
         },
     },
     "root": {
@@ -192,3 +355,11 @@ LOGGING = {
         },
     },
 }
+
+# Enable database query logging for debug view (only in DEBUG mode)
+if DEBUG:
+    LOGGING["loggers"]["django.db.backends"] = {
+        "handlers": ["console"],
+        "level": "DEBUG",
+        "propagate": False,
+    }
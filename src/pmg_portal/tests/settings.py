@@ -0,0 +1,39 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Test settings: SQLite primary plus a "replica" alias mirroring it, with replica routing on
+Path: src/pmg_portal/tests/settings.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+
+Run from src/: python manage.py test --settings=pmg_portal.tests.settings
+"""
+import os
+
+for _name in ("POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD"):
+    os.environ.setdefault(_name, "unused")
+
+from pmg_portal.settings import *  # noqa: E402,F401,F403
+from pmg_portal.settings import BASE_DIR, MIDDLEWARE  # noqa: E402
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(BASE_DIR.parent / "var" / "test.sqlite3"),
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(BASE_DIR.parent / "var" / "test.sqlite3"),
+        "TEST": {"MIRROR": "default"},
+    },
+}
+DATABASE_ROUTERS = ["pmg_portal.db_router.PrimaryReplicaRouter"]
+if "pmg_portal.db_router.ReplicaPinningMiddleware" not in MIDDLEWARE:
+    MIDDLEWARE.insert(1, "pmg_portal.db_router.ReplicaPinningMiddleware")
+REPLICA_PIN_SECONDS = 10
+
+STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+QUERY_PROFILER_ENABLED = False
+REQUEST_PROFILER_ENABLED = False
+ACTIVITY_LOG_ENABLED = False
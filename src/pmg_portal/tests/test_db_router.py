@@ -0,0 +1,175 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Tests for read-replica routing and the primary pin cookie (pmg_portal.db_router)
+Path: src/pmg_portal/tests/test_db_router.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import json
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from pmg_portal.db_router import PIN_COOKIE_SALT, PRIMARY, PrimaryReplicaRouter, ReplicaPinningMiddleware
+from portal.models import Customer, PortalLink
+
+PIN_COOKIE = "pmg_primary_until"
+
+
+class ReadRecorder:
+    """Records the alias the router picks for every read while active."""
+
+    def __init__(self):
+        self.aliases = []
+        self._original = PrimaryReplicaRouter.db_for_read
+
+    def __enter__(self):
+        original = self._original
+        recorder = self
+
+        def db_for_read(router, model, **hints):
+            alias = original(router, model, **hints)
+            if model._meta.app_label != "sessions":
+                recorder.aliases.append(alias)
+            return alias
+
+        self._patch = mock.patch.object(PrimaryReplicaRouter, "db_for_read", db_for_read)
+        self._patch.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._patch.stop()
+
+
+def signed_pin(until):
+    return signing.get_cookie_signer(salt=PIN_COOKIE + PIN_COOKIE_SALT).sign(str(int(until)))
+
+
+@override_settings(REPLICA_PIN_SECONDS=10)
+class PinningMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+
+    def run_request(self, request, write=False):
+        seen = {}
+
+        def view(request):
+            seen["before"] = self.router.db_for_read(Customer)
+            if write:
+                self.router.db_for_write(Customer)
+                seen["after"] = self.router.db_for_read(Customer)
+            return HttpResponse("ok")
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return seen, response
+
+    def test_reads_go_to_replica(self):
+        seen, response = self.run_request(self.factory.get("/"))
+        self.assertEqual(seen["before"], "replica")
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_outside_requests_read_primary(self):
+        self.assertEqual(self.router.db_for_read(Customer), PRIMARY)
+
+    def test_write_pins_rest_of_request_and_sets_cookie(self):
+        seen, response = self.run_request(self.factory.get("/"), write=True)
+        self.assertEqual(seen["before"], "replica")
+        self.assertEqual(seen["after"], PRIMARY)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_post_reads_primary_and_sets_cookie(self):
+        seen, response = self.run_request(self.factory.post("/"))
+        self.assertEqual(seen["before"], PRIMARY)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_pin_cookie_pins_following_reads(self):
+        _seen, response = self.run_request(self.factory.post("/"))
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        seen, _response = self.run_request(request)
+        self.assertEqual(seen["before"], PRIMARY)
+
+    def test_pin_expires_after_window(self):
+        _seen, response = self.run_request(self.factory.post("/"))
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        with mock.patch("time.time", return_value=time.time() + 11):
+            seen, _response = self.run_request(request)
+        self.assertEqual(seen["before"], "replica")
+
+    def test_unsigned_cookie_is_ignored(self):
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = str(int(time.time() + 3600))
+        seen, _response = self.run_request(request)
+        self.assertEqual(seen["before"], "replica")
+
+    def test_tampered_cookie_is_ignored(self):
+        value = signed_pin(time.time() + 5)
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = str(int(time.time() + 3600)) + value[value.index(":"):]
+        seen, _response = self.run_request(request)
+        self.assertEqual(seen["before"], "replica")
+
+    def test_replayed_cookie_past_window_is_ignored(self):
+        # Correctly signed, but signed long ago with a far-future time inside
+        with mock.patch("time.time", return_value=time.time() - 3600):
+            value = signed_pin(time.time() + 7200)
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = value
+        seen, _response = self.run_request(request)
+        self.assertEqual(seen["before"], "replica")
+
+
+@override_settings(REPLICA_PIN_SECONDS=10)
+class PinningViewTests(TransactionTestCase):
+    # Committed rows: the replica alias is a second connection to the test database (TEST MIRROR),
+    # which would not see rows of a TestCase transaction
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.customer = Customer.objects.create(name="Acme", slug="acme")
+        self.other = Customer.objects.create(name="Beta", slug="beta")
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def dashboard_reads(self, client):
+        with ReadRecorder() as reads:
+            response = client.get(reverse("customer_home", args=[self.customer.slug]), HTTP_X_PREFETCH="true")
+        self.assertEqual(response.status_code, 200)
+        return set(reads.aliases)
+
+    def test_dashboard_reads_from_replica_without_pin(self):
+        self.assertEqual(self.dashboard_reads(self.client), {"replica"})
+
+    def test_switch_customer_pins_next_reads(self):
+        response = self.client.post(reverse("switch_customer", args=[self.other.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.dashboard_reads(self.client), {PRIMARY})
+
+    def test_admin_edit_pins_next_reads(self):
+        link = PortalLink.objects.create(customer=self.customer, title="A", url="https://example.com/a")
+        response = self.client.post(
+            reverse("admin_app:admin_customer_links_reorder", args=[self.customer.pk]),
+            json.dumps({"order": [link.pk]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.dashboard_reads(self.client), {PRIMARY})
+
+    def test_pin_expires(self):
+        self.client.post(reverse("switch_customer", args=[self.other.pk]))
+        with mock.patch("time.time", return_value=time.time() + 11):
+            reads = self.dashboard_reads(self.client)
+        self.assertEqual(reads, {"replica"})
@@ -0,0 +1,197 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Tests for the database job queue (portal.jobs): claiming, dedupe keys, retries and stale jobs
+Path: src/pmg_portal/tests/test_jobs.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from portal import jobs
+from portal.models import Job
+
+calls = []
+
+
+def record_task(**kwargs):
+    calls.append({"kwargs": kwargs, "final": jobs.is_final_attempt()})
+    if kwargs.get("fail") == "permanent":
+        raise jobs.PermanentFailure("Bad input")
+    if kwargs.get("fail"):
+        raise RuntimeError("Temporary failure")
+    return {"echo": kwargs}
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=3600, JOB_TIMEOUT=900)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        patcher = mock.patch.dict(jobs._registry, {"test_record": record_task})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enqueue(self, **kwargs):
+        return jobs.enqueue("test_record", **kwargs)
+
+    def claim_and_run(self):
+        job = jobs.claim("test-worker")
+        self.assertIsNotNone(job)
+        jobs.run(job)
+        job.refresh_from_db()
+        return job
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    # ----- claim -----
+
+    def test_claim_order_priority_then_run_at(self):
+        now = timezone.now()
+        old = self.enqueue()
+        Job.objects.filter(pk=old.pk).update(run_at=now - timedelta(minutes=5))
+        newer = self.enqueue()
+        high = self.enqueue(priority=Job.PRIORITY_HIGH)
+        self.enqueue(delay=3600)  # not due yet
+        claimed = [jobs.claim("test-worker").pk for _ in range(3)]
+        self.assertEqual(claimed, [high.pk, old.pk, newer.pk])
+        self.assertIsNone(jobs.claim("test-worker"))
+
+    def test_claim_marks_running(self):
+        job = self.enqueue()
+        claimed = jobs.claim("host:123")
+        self.assertEqual(claimed.pk, job.pk)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Job.STATUS_RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(claimed.worker, "host:123")
+        self.assertIsNotNone(claimed.started_at)
+        # A running job is never handed to a second worker
+        self.assertIsNone(jobs.claim("other"))
+
+    def test_claim_skips_locked_rows(self):
+        self.enqueue()
+        calls_seen = []
+        original = QuerySet.select_for_update
+
+        def spy(qs, *args, **kwargs):
+            calls_seen.append(kwargs)
+            return original(qs, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "select_for_update", spy):
+            jobs.claim("test-worker")
+        self.assertEqual(calls_seen, [{"skip_locked": True}])
+
+    # ----- enqueue -----
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue("no_such_task")
+
+    def test_dedupe_key_returns_active_job(self):
+        first = self.enqueue(key="customer:1")
+        self.assertEqual(self.enqueue(key="customer:1").pk, first.pk)
+        jobs.claim("test-worker")
+        self.assertEqual(self.enqueue(key="customer:1").pk, first.pk)  # running counts too
+        self.assertNotEqual(self.enqueue(key="customer:2").pk, first.pk)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_dedupe_key_allows_new_job_after_finish(self):
+        first = self.enqueue(key="customer:1")
+        self.claim_and_run()
+        second = self.enqueue(key="customer:1")
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(second.status, Job.STATUS_QUEUED)
+
+    def test_jobs_without_key_are_not_deduplicated(self):
+        self.enqueue()
+        self.enqueue()
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_schedule_periodic_once_per_interval(self):
+        jobs.schedule_periodic("test_record", 3600)
+        self.claim_and_run()
+        self.assertIsNone(jobs.schedule_periodic("test_record", 3600))
+        Job.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertIsNotNone(jobs.schedule_periodic("test_record", 3600))
+
+    # ----- run -----
+
+    def test_success_stores_result(self):
+        self.enqueue(n=1)
+        job = self.claim_and_run()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {"echo": {"n": 1}})
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.error, "")
+
+    def test_failure_retries_with_backoff(self):
+        self.enqueue(fail=True)
+        with mock.patch("random.uniform", return_value=1.0):
+            job = self.claim_and_run()
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertTrue(job.error.startswith("Temporary failure\n"))
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertIsNone(jobs.claim("test-worker"))  # waits for its backoff
+
+    def test_retry_delay_doubles_and_is_capped(self):
+        with mock.patch("random.uniform", return_value=1.0):
+            self.assertEqual([jobs.retry_delay(n) for n in (1, 2, 3)], [10, 20, 40])
+            self.assertEqual(jobs.retry_delay(20), 3600)
+
+    def test_final_attempt_fails_job(self):
+        self.enqueue(fail=True)
+        for _ in range(2):
+            job = self.claim_and_run()
+            self.assertEqual(job.status, Job.STATUS_QUEUED)
+            self.make_due(job)
+        job = self.claim_and_run()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual([c["final"] for c in calls], [False, False, True])
+        self.assertIsNone(jobs.claim("test-worker"))
+
+    def test_permanent_failure_is_not_retried(self):
+        self.enqueue(fail="permanent")
+        job = self.claim_and_run()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(jobs.job_status(job)["error"], "Bad input")
+
+    def test_unknown_task_in_queue_fails(self):
+        job = self.enqueue()
+        Job.objects.filter(pk=job.pk).update(task="removed_task")
+        job = self.claim_and_run()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+
+    def test_is_final_attempt_outside_job(self):
+        self.assertFalse(jobs.is_final_attempt())
+
+    # ----- stale jobs -----
+
+    def test_requeue_stale(self):
+        long_ago = timezone.now() - timedelta(seconds=901)
+        retry = self.enqueue()
+        out_of_attempts = self.enqueue()
+        fresh = self.enqueue()
+        for job in (retry, out_of_attempts, fresh):
+            jobs.claim("test-worker")
+        Job.objects.filter(pk__in=[retry.pk, out_of_attempts.pk]).update(started_at=long_ago)
+        Job.objects.filter(pk=out_of_attempts.pk).update(attempts=3)
+
+        self.assertEqual(jobs.requeue_stale(), 2)
+        statuses = dict(Job.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[retry.pk], Job.STATUS_QUEUED)
+        self.assertEqual(statuses[out_of_attempts.pk], Job.STATUS_FAILED)
+        self.assertEqual(statuses[fresh.pk], Job.STATUS_RUNNING)
+        # The released job runs again as its next attempt
+        self.assertEqual(jobs.claim("test-worker").attempts, 2)
+        self.assertEqual(jobs.requeue_stale(), 0)
@@ -0,0 +1,272 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Tests for the portal link health checker (portal.link_health) against a local stub HTTP server
+Path: src/pmg_portal/tests/test_link_health.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.test import SimpleTestCase, TransactionTestCase
+from django.utils import timezone
+
+from portal import link_health
+from portal.models import Customer, PortalLink, PortalLinkHealth
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+      /ok        200 with an ETag
+      /no-head   405 for HEAD, 200 for GET
+      /r/<n>     redirect chain of n hops ending at /ok
+      /loop      redirects to itself
+      /etag      304 when If-None-Match matches "v1" (without sending an ETag), else 200 with "v1"
+      /slow?s=   sleeps s seconds, then 200; tracks requests in flight
+    """
+
+    def do_HEAD(self):
+        self.route("HEAD")
+
+    def do_GET(self):
+        self.route("GET")
+
+    def route(self, method):
+        parts = urlsplit(self.path)
+        path = parts.path
+        self.server.record(method, path, self.headers)
+        if path == "/ok":
+            self.reply(200, ETag='"v2"')
+        elif path == "/no-head":
+            self.reply(405 if method == "HEAD" else 200)
+        elif path.startswith("/r/"):
+            hops = int(path[3:])
+            self.reply(302, Location=f"/r/{hops - 1}" if hops > 1 else "/ok")
+        elif path == "/loop":
+            self.reply(301, Location="/loop")
+        elif path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.reply(304)
+            else:
+                self.reply(200, ETag='"v1"')
+        elif path == "/slow":
+            with self.server.lock:
+                self.server.in_flight += 1
+                self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+            try:
+                time.sleep(float(parse_qs(parts.query).get("s", ["0.2"])[0]))
+            finally:
+                with self.server.lock:
+                    self.server.in_flight -= 1
+            self.reply(200)
+        else:
+            self.reply(404)
+
+    def reply(self, status, **headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def record(self, method, path, headers):
+        with self.lock:
+            self.requests.append((method, path, dict(headers)))
+
+    def reset(self):
+        with self.lock:
+            self.requests = []
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+    def handle_error(self, request, client_address):
+        # The checker closes connections it stopped waiting for (timeouts); nothing to report
+        pass
+
+
+class StubServerMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.reset()
+
+    def url(self, path):
+        return self.base + path
+
+
+def check(url, etag="", timeout=5.0, limits=None):
+    link = (1, url, etag, "", None, 0)
+    return asyncio.run(link_health._check(link, limits or link_health._Limits(10, 4), timeout))
+
+
+class LinkCheckTests(StubServerMixin, SimpleTestCase):
+
+    def test_ok(self):
+        result = check(self.url("/ok"))
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["status"], 200)
+        self.assertEqual(result["etag"], '"v2"')
+        self.assertEqual([r[0] for r in self.server.requests], ["HEAD"])
+
+    def test_head_rejected_falls_back_to_get(self):
+        result = check(self.url("/no-head"))
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["status"], 200)
+        self.assertEqual([r[:2] for r in self.server.requests], [("HEAD", "/no-head"), ("GET", "/no-head")])
+
+    def test_follows_redirects(self):
+        result = check(self.url("/r/3"))
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["status"], 200)
+        self.assertEqual([r[1] for r in self.server.requests], ["/r/3", "/r/2", "/r/1", "/ok"])
+
+    def test_redirect_limit(self):
+        result = check(self.url("/loop"))
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["error"], "Too many redirects")
+        self.assertEqual(len(self.server.requests), link_health.MAX_REDIRECTS + 1)
+
+    def test_redirect_chain_at_limit_is_followed(self):
+        result = check(self.url(f"/r/{link_health.MAX_REDIRECTS}"))
+        self.assertTrue(result["ok"])
+
+    def test_not_modified_keeps_stored_etag(self):
+        result = check(self.url("/etag"), etag='"v1"')
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["status"], 304)
+        self.assertEqual(result["etag"], '"v1"')
+        self.assertEqual(self.server.requests[0][2].get("If-None-Match"), '"v1"')
+
+    def test_changed_resource_stores_new_etag(self):
+        result = check(self.url("/etag"), etag='"v0"')
+        self.assertEqual(result["status"], 200)
+        self.assertEqual(result["etag"], '"v1"')
+
+    def test_conditional_headers_not_sent_after_redirect(self):
+        check(self.url("/r/1"), etag='"v1"')
+        self.assertEqual(self.server.requests[0][2].get("If-None-Match"), '"v1"')
+        self.assertNotIn("If-None-Match", self.server.requests[1][2])
+
+    def test_timeout(self):
+        result = check(self.url("/slow?s=1"), timeout=0.2)
+        self.assertFalse(result["ok"])
+        self.assertIsNone(result["status"])
+        self.assertTrue(result["error"].startswith("Timed out"))
+        self.assertEqual(result["failures"], 1)
+
+    def test_unreachable_host_is_an_error(self):
+        server = StubServer()
+        port = server.server_address[1]
+        server.server_close()  # nothing listens on this port any more
+        result = check(f"http://127.0.0.1:{port}/")
+        self.assertFalse(result["ok"])
+        self.assertTrue(result["error"])
+
+    def run_concurrently(self, limits, count=6):
+        async def run():
+            links = [(i, self.url("/slow?s=0.2"), "", "", None, 0) for i in range(count)]
+            return await asyncio.gather(*(link_health._check(link, limits, 5.0) for link in links))
+
+        return asyncio.run(run())
+
+    def test_per_host_limit(self):
+        results = self.run_concurrently(link_health._Limits(concurrency=10, per_host=2))
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_global_limit(self):
+        results = self.run_concurrently(link_health._Limits(concurrency=1, per_host=4), count=3)
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertEqual(self.server.max_in_flight, 1)
+
+
+def result(link_id, ok=True, etag=""):
+    now = timezone.now()
+    return {
+        "link_id": link_id,
+        "ok": ok,
+        "status": 200 if ok else 500,
+        "error": "",
+        "latency_ms": 12,
+        "checked_at": now,
+        "last_ok_at": now if ok else None,
+        "failures": 0 if ok else 1,
+        "etag": etag,
+        "last_modified": "",
+    }
+
+
+class SaveResultsTests(StubServerMixin, TransactionTestCase):
+    # check_links() saves on its own thread (another connection), so rows must be committed
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(name="Acme", slug="acme")
+
+    def link(self, path, title="Link"):
+        return PortalLink.objects.create(customer=self.customer, title=title, url=self.url(path))
+
+    def test_upserts_results(self):
+        checked = self.link("/ok")
+        PortalLinkHealth.objects.create(
+            link=checked, ok=False, status=500, checked_at=timezone.now(), failures=3, etag='"old"'
+        )
+        new = self.link("/ok")
+        self.assertEqual(link_health.save_results([result(checked.pk, etag='"new"'), result(new.pk)]), 2)
+        health = PortalLinkHealth.objects.get(link=checked)
+        self.assertTrue(health.ok)
+        self.assertEqual((health.status, health.failures, health.etag), (200, 0, '"new"'))
+        self.assertTrue(PortalLinkHealth.objects.filter(link=new, ok=True).exists())
+
+    def test_skips_deleted_links(self):
+        kept = self.link("/ok")
+        deleted = self.link("/ok")
+        deleted_pk = deleted.pk
+        deleted.delete()
+        self.assertEqual(link_health.save_results([result(kept.pk), result(deleted_pk)]), 1)
+        self.assertEqual(list(PortalLinkHealth.objects.values_list("link_id", flat=True)), [kept.pk])
+
+    def test_check_links_stores_results(self):
+        good = self.link("/no-head")
+        bad = self.link("/missing")
+        stats = link_health.check_links(force=True, timeout=5.0)
+        self.assertEqual((stats["checked"], stats["ok"], stats["failed"], stats["remaining"]), (2, 1, 1, 0))
+        self.assertTrue(PortalLinkHealth.objects.get(link=good).ok)
+        health = PortalLinkHealth.objects.get(link=bad)
+        self.assertFalse(health.ok)
+        self.assertEqual((health.status, health.failures), (404, 1))
+        # Checked just now: nothing is due until LINK_CHECK_INTERVAL has passed
+        self.assertFalse(link_health.due_links().exists())
@@ -0,0 +1,125 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Tests for sparse sort keys and set-based link reordering (portal.link_order)
+Path: src/pmg_portal/tests/test_link_order.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import random
+
+from django.test import SimpleTestCase, TestCase
+
+from portal.link_order import SORT_GAP, SORT_MAX, LinkSetChanged, reorder_links, sparse_keys
+from portal.models import Customer, PortalLink
+
+
+def numbered(count):
+    return [SORT_GAP * (n + 1) for n in range(count)]
+
+
+def changed(before, after):
+    return sum(1 for a, b in zip(before, after) if a != b)
+
+
+class SparseKeysTests(SimpleTestCase):
+
+    def assertValidKeys(self, keys, msg=None):
+        self.assertTrue(all(a < b for a, b in zip(keys, keys[1:])), msg or keys)
+        self.assertTrue(all(0 <= key <= SORT_MAX for key in keys), msg or keys)
+
+    def test_unchanged_order_keeps_keys(self):
+        self.assertEqual(sparse_keys(numbered(5)), numbered(5))
+        self.assertEqual(sparse_keys([]), [])
+
+    def test_move_one_item_changes_one_key(self):
+        rng = random.Random(1)
+        for _ in range(500):
+            count = rng.randint(2, 40)
+            keys = numbered(count)
+            item = keys.pop(rng.randrange(count))
+            keys.insert(rng.randrange(count), item)
+            new = sparse_keys(keys)
+            self.assertValidKeys(new)
+            self.assertLessEqual(changed(keys, new), 1, keys)
+
+    def test_move_to_front_and_end(self):
+        keys = numbered(4)
+        self.assertEqual(sparse_keys([keys[3]] + keys[:3]), [SORT_GAP // 2 - 1] + keys[:3])
+        self.assertEqual(sparse_keys(keys[1:] + [keys[0]]), keys[1:] + [keys[3] + SORT_GAP])
+
+    def test_several_items_spread_over_gap(self):
+        # 0, 30, 200 stay; the two moved items share the gap between 0 and 30
+        self.assertEqual(sparse_keys([0, 100, 40, 30, 200]), [0, 10, 20, 30, 200])
+
+    def test_renumbers_when_gap_runs_out(self):
+        # Nothing fits between -1 and 0 in front of the kept keys
+        self.assertEqual(sparse_keys([2, 0, 1]), numbered(3))
+        # Repeated moves into the same gap halve it each time until it is exhausted
+        keys = numbered(3)
+        renumbered_at = None
+        for step in range(20):
+            before = keys
+            keys = sparse_keys([before[0], before[2], before[1]])
+            self.assertValidKeys(keys)
+            if keys == numbered(3):
+                renumbered_at = step
+                break
+            self.assertEqual(changed([before[0], before[2], before[1]], keys), 1)
+        self.assertEqual(renumbered_at, 10)  # log2(SORT_GAP)
+
+    def test_renumbers_near_upper_bound(self):
+        self.assertValidKeys(sparse_keys([SORT_MAX, SORT_MAX - 1]))
+        # No room after the last kept key: appending SORT_GAP would pass SORT_MAX
+        self.assertEqual(sparse_keys([1, 2, SORT_MAX - 5, 0]), numbered(4))
+
+    def test_duplicate_current_keys(self):
+        # Links created before sort keys were maintained can all share 0
+        new = sparse_keys([0, 0, 0, 0])
+        self.assertValidKeys(new)
+
+    def test_random_orders_give_strictly_increasing_keys(self):
+        rng = random.Random(2)
+        for _ in range(2000):
+            count = rng.randint(0, 15)
+            shape = rng.random()
+            if shape < 0.3:
+                keys = [rng.randint(0, 5) for _ in range(count)]
+            elif shape < 0.6:
+                keys = rng.sample(range(40), count)
+            elif shape < 0.8:
+                keys = numbered(count)
+                rng.shuffle(keys)
+            else:
+                keys = [rng.randint(SORT_MAX - 50, SORT_MAX) for _ in range(count)]
+            self.assertValidKeys(sparse_keys(keys), keys)
+
+
+class ReorderLinksTests(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Acme", slug="acme")
+        self.links = [
+            PortalLink.objects.create(
+                customer=self.customer, title=f"L{n}", url=f"https://example.com/{n}", sort_order=key
+            )
+            for n, key in enumerate(numbered(4))
+        ]
+
+    def order(self):
+        links = PortalLink.objects.filter(customer=self.customer).order_by("sort_order")
+        return list(links.values_list("pk", flat=True))
+
+    def test_reorder_writes_only_moved_link(self):
+        ids = [link.pk for link in self.links]
+        new_order = [ids[2], ids[0], ids[1], ids[3]]
+        self.assertEqual(reorder_links(self.customer, new_order), 1)
+        self.assertEqual(self.order(), new_order)
+
+    def test_reorder_requires_exact_link_set(self):
+        ids = [link.pk for link in self.links]
+        with self.assertRaises(LinkSetChanged):
+            reorder_links(self.customer, ids[:3])
+        with self.assertRaises(LinkSetChanged):
+            reorder_links(self.customer, ids + [ids[0]])
+        self.assertEqual(self.order(), ids)
@@ -0,0 +1,49 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Tests for the request-trace store queries behind /debug/ (pmg_portal.trace_store)
+Path: src/pmg_portal/tests/test_trace_store.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from pmg_portal import trace_store
+
+
+class TraceQueryTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings = override_settings(DEBUG_TRACE_PATH=Path(directory) / "traces.sqlite3")
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # The store keeps one connection per thread: open a new one on the temporary file
+        trace_store._local.conn = None
+        self.addCleanup(setattr, trace_store._local, "conn", None)
+        for i in range(5):
+            trace_store.append({
+                "timestamp": time.time(), "method": "GET", "path": f"/page/{i}/", "status_code": 200,
+            })
+        trace_store.flush()
+
+    def paths(self, traces):
+        return [t["path"] for t in traces]
+
+    def test_keyset_pages(self):
+        traces, next_before = trace_store.query(limit=3)
+        self.assertEqual(self.paths(traces), ["/page/4/", "/page/3/", "/page/2/"])
+        traces, next_before = trace_store.query(before=str(next_before), limit=3)
+        self.assertEqual(self.paths(traces), ["/page/1/", "/page/0/"])
+        self.assertIsNone(next_before)
+
+    def test_malformed_before_is_ignored(self):
+        for before in ("x", "-1", "1.5", "1; DROP TABLE traces", " "):
+            traces, _next_before = trace_store.query(before=before, limit=10)
+            self.assertEqual(len(traces), 5, before)
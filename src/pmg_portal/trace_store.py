@@ -0,0 +1,213 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Request-trace store shared by all gunicorn workers (SQLite ring buffer in WAL mode)
+Path: src/pmg_portal/trace_store.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+
+from portal.flusher import BackgroundFlusher
+
+logger = logging.getLogger(__name__)
+
+# Bounded fields keep every record (and so the whole file) a fixed maximum size
+PATH_MAX = 300
+TEXT_MAX = 200
+DETAIL_MAX_BYTES = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+    slot INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    pid INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status INTEGER,
+    duration_ms REAL,
+    db_count INTEGER,
+    db_ms REAL,
+    user TEXT,
+    view TEXT,
+    exception TEXT,
+    detail TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS traces_seq ON traces (seq);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('seq', 0);
+"""
+
+SUMMARY_COLUMNS = "seq, ts, pid, method, path, status, duration_ms, db_count, db_ms, user, view, exception"
+
+_pending = deque()
+_pending_lock = threading.Lock()
+_local = threading.local()
+
+
+def store_path():
+    default = Path(settings.BASE_DIR).parent / "var" / "request-traces.sqlite3"
+    return Path(getattr(settings, "DEBUG_TRACE_PATH", default))
+
+
+def capacity():
+    return getattr(settings, "DEBUG_TRACE_CAPACITY", 5000)
+
+
+def _connection():
+    """One connection per thread and process (connections must not cross a fork)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+    path = store_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=2.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL: readers never block the writing workers; NORMAL sync is enough for diagnostics
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def _clip(value, limit):
+    if value is None:
+        return None
+    value = str(value)
+    return value if len(value) <= limit else value[: limit - 1] + "…"
+
+
+def _detail(entry):
+    """Everything beyond the summary columns, as JSON capped at DETAIL_MAX_BYTES (largest parts dropped first)."""
+    detail = {k: v for k, v in entry.items() if k not in (
+        "timestamp", "method", "path", "status_code", "processing_time", "db_queries_count",
+        "db_time_ms", "user", "exception", "exception_type", "db_queries",
+    )}
+    data = json.dumps(detail, default=str)
+    for key in ("slow_queries", "context_keys", "view", "user_agent"):
+        if len(data.encode()) <= DETAIL_MAX_BYTES:
+            break
+        detail.pop(key, None)
+        detail["truncated"] = True
+        data = json.dumps(detail, default=str)
+    return data[:DETAIL_MAX_BYTES]
+
+
+def append(entry):
+    """
+    Queue one finished request (a DebugLoggingMiddleware log entry). The request only appends to an
+    in-memory deque; the background flusher writes queued traces in one transaction.
+    """
+    view = entry.get("view") or {}
+    exception = entry.get("exception")
+    row = (
+        entry.get("timestamp"),
+        os.getpid(),
+        _clip(entry.get("method"), 10),
+        _clip(entry.get("path"), PATH_MAX),
+        entry.get("status_code"),
+        entry.get("processing_time"),
+        entry.get("db_queries_count"),
+        entry.get("db_time_ms"),
+        _clip(entry.get("user"), TEXT_MAX),
+        _clip(view.get("view_name") or view.get("view_func"), TEXT_MAX),
+        _clip(f"{entry.get('exception_type')}: {exception}", TEXT_MAX) if exception else None,
+        _detail(entry),
+    )
+    with _pending_lock:
+        if len(_pending) >= capacity():
+            _pending.popleft()
+        _pending.append(row)
+    _flusher.ensure_started()
+
+
+def flush():
+    """Write queued traces into the ring: sequence numbers are shared by all workers, slot = seq % capacity."""
+    with _pending_lock:
+        rows = list(_pending)
+        _pending.clear()
+    if not rows:
+        return 0
+    conn = _connection()
+    size = capacity()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        last = conn.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()[0]
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'seq'", (last + len(rows),))
+        conn.executemany(
+            "INSERT OR REPLACE INTO traces (slot, seq, ts, pid, method, path, status, duration_ms, db_count, "
+            "db_ms, user, view, exception, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [((last + i) % size, last + i) + row for i, row in enumerate(rows, start=1)],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return len(rows)
+
+
+_flusher = BackgroundFlusher(
+    "request-trace-flusher", flush, lambda: getattr(settings, "DEBUG_TRACE_FLUSH_INTERVAL", 1.0)
+)
+
+
+def query(path="", status="", slow=False, before=None, limit=50):
+    """
+    Newest traces first, filtered by path substring, status (e.g. "404" or "5xx") and slow-only
+    (duration >= DEBUG_TRACE_SLOW_MS). Keyset-paginated on seq: pass the returned next cursor as
+    `before` for the next page. Only summary columns are read. Returns (traces, next_before).
+    """
+    flush()  # include this worker's not yet written traces
+    clauses, params = [], []
+    if path:
+        clauses.append("instr(path, ?) > 0")
+        params.append(path)
+    status = (status or "").strip().lower()
+    if len(status) == 3 and status.endswith("xx") and status[0].isdigit():
+        clauses.append("status >= ? AND status < ?")
+        params += [int(status[0]) * 100, int(status[0]) * 100 + 100]
+    elif status.isdigit():
+        clauses.append("status = ?")
+        params.append(int(status))
+    if slow:
+        clauses.append("duration_ms >= ?")
+        params.append(getattr(settings, "DEBUG_TRACE_SLOW_MS", 500))
+    # Page cursor from the query string: anything but a sequence number is ignored (first page)
+    before = str(before or "").strip()
+    if before.isdigit():
+        clauses.append("seq < ?")
+        params.append(int(before))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = _connection().execute(
+        f"SELECT {SUMMARY_COLUMNS} FROM traces {where} ORDER BY seq DESC LIMIT ?", params + [limit + 1]
+    ).fetchall()
+    traces = [dict(row) for row in rows[:limit]]
+    next_before = traces[-1]["seq"] if len(rows) > limit else None
+    return traces, next_before
+
+
+def get(seq):
+    """One trace with its detail, or None if it has been overwritten."""
+    flush()
+    row = _connection().execute(f"SELECT {SUMMARY_COLUMNS}, detail FROM traces WHERE seq = ?", (seq,)).fetchone()
+    if row is None:
+        return None
+    trace = dict(row)
+    trace["detail"] = json.loads(trace["detail"] or "{}")
+    return trace
+
+
+def clear():
+    with _pending_lock:
+        _pending.clear()
+    _connection().execute("DELETE FROM traces")
@@ -10,7 +10,6 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.static import serve
 
 # Import admin config for whitelabel
 from . import admin_config  # noqa: F401
@@ -28,17 +27,13 @@ urlpatterns = [
 ]
 
 # Serve media files
-# In production, nginx should serve /media/ directly for better performance
-# But we provide Django fallback in case nginx is not configured or not working
+# In DEBUG, use the static() helper. In production, nginx should serve media through the internal
+# location named by MEDIA_ACCEL_REDIRECT; the Django view still checks access and then hands the
+# transfer off (X-Accel-Redirect, or sendfile via the WSGI file wrapper when nginx is absent).
 if settings.DEBUG:
-    # In DEBUG mode, use static() helper
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 else:
-    # In production, use serve view as fallback (nginx should handle this, but Django can serve if needed)
-    from django.views.decorators.cache import never_cache
+    from portal.media import media_serve
     urlpatterns += [
-        path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", never_cache(serve), {
-            "document_root": str(settings.MEDIA_ROOT),
-            "show_indexes": False,
-        }),
+        path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", media_serve, name="media_serve"),
     ]
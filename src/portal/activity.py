@@ -0,0 +1,291 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Activity/audit log (buffered events, batched writes, monthly partitions)
+Path: src/portal/activity.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import contextvars
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .flusher import BackgroundFlusher
+
+logger = logging.getLogger(__name__)
+
+TABLE = "portal_activityevent"
+# Catch-all partition (migration 0006) for rows whose month has no partition yet
+DEFAULT_PARTITION = f"{TABLE}_default"
+# Monthly partitions kept ready ahead of time, so a missed maintenance run never sends rows to DEFAULT
+MONTHS_AHEAD = 6
+PARTITIONS_TASK = "activity_partitions"
+PARTITIONS_INTERVAL = 86400  # seconds between maintenance jobs queued by the worker
+
+# Request being handled on this thread/task (set by ActivityContextMiddleware); supplies actor, IP and path
+_current_request = contextvars.ContextVar("activity_request", default=None)
+# User on whose behalf work outside a request runs (background jobs); used when there is no request
+_current_actor = contextvars.ContextVar("activity_actor", default=None)
+
+_buffer = deque()
+_buffer_lock = threading.Lock()
+_dropped = 0
+
+
+def set_current_request(request):
+    return _current_request.set(request)
+
+
+def reset_current_request(token):
+    _current_request.reset(token)
+
+
+def set_current_actor(user):
+    return _current_actor.set(user)
+
+
+def reset_current_actor(token):
+    _current_actor.reset(token)
+
+
+def _client_ip(request):
+    # nginx passes the client address in X-Real-IP (see deploy/nginx/pmg-portal.conf)
+    ip = request.META.get("HTTP_X_REAL_IP") or request.META.get("REMOTE_ADDR") or None
+    return ip.strip() if ip else None
+
+
+def record(action, obj=None, *, customer_id=None, actor=None, object_repr=None, **extra):
+    """
+    Queue one activity event. Never touches the database on the calling thread: the event is
+    buffered and written by the background flusher in a batch. Inside a transaction the event is
+    only queued once the transaction commits.
+    """
+    if not getattr(settings, "ACTIVITY_LOG_ENABLED", True):
+        return
+    from .models import ActivityEvent, Customer
+
+    request = _current_request.get()
+    if actor is None and request is not None:
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            actor = user
+    if actor is None:
+        actor = _current_actor.get()
+
+    if obj is not None and customer_id is None:
+        customer_id = obj.pk if isinstance(obj, Customer) else getattr(obj, "customer_id", None)
+
+    event = ActivityEvent(
+        created_at=timezone.now(),
+        actor_id=actor.pk if actor is not None else None,
+        actor_repr=(actor.get_username() if actor is not None else "")[:150],
+        action=action,
+        object_type=obj._meta.label_lower if obj is not None else "",
+        object_id=str(obj.pk) if obj is not None and obj.pk is not None else "",
+        object_repr=(object_repr if object_repr is not None else (str(obj) if obj is not None else ""))[:200],
+        customer_id=customer_id,
+        ip_address=_client_ip(request) if request is not None else None,
+        path=request.path[:300] if request is not None else "",
+        extra=extra,
+    )
+    transaction.on_commit(lambda: _enqueue(event))
+
+
+def _enqueue(event):
+    global _dropped
+    with _buffer_lock:
+        if len(_buffer) >= getattr(settings, "ACTIVITY_LOG_MAX_BUFFER", 10000):
+            # Database unreachable for a long time: keep memory bounded, count what we lose
+            _dropped += 1
+            return
+        _buffer.append(event)
+        pending = len(_buffer)
+    _flusher.ensure_started()
+    if pending >= getattr(settings, "ACTIVITY_LOG_BATCH_SIZE", 500):
+        _flusher.wake()
+
+
+def flush():
+    """Write all buffered events, one multi-row INSERT per batch. Returns the number written."""
+    global _dropped
+    from .models import ActivityEvent
+
+    batch_size = getattr(settings, "ACTIVITY_LOG_BATCH_SIZE", 500)
+    written = 0
+    close_old_connections()
+    while True:
+        with _buffer_lock:
+            batch = [_buffer.popleft() for _ in range(min(batch_size, len(_buffer)))]
+            dropped, _dropped = _dropped, 0
+        if dropped:
+            logger.warning(f"Activity log buffer full: dropped {dropped} event(s)")
+        if not batch:
+            break
+        try:
+            ActivityEvent.objects.bulk_create(batch, batch_size=batch_size)
+        except Exception:
+            # Put the batch back (oldest first) and retry on the next tick
+            with _buffer_lock:
+                _buffer.extendleft(reversed(batch))
+            raise
+        written += len(batch)
+    return written
+
+
+_flusher = BackgroundFlusher(
+    "activity-log-flusher", flush, lambda: getattr(settings, "ACTIVITY_LOG_FLUSH_INTERVAL", 2.0)
+)
+
+
+# ----- Model change capture -----
+
+def _on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Session bookkeeping on login is not an admin change
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    from .models import ActivityEvent
+    extra = {"fields": sorted(update_fields)} if update_fields else {}
+    record(ActivityEvent.ACTION_CREATE if created else ActivityEvent.ACTION_UPDATE, instance, **extra)
+
+
+def _on_delete(sender, instance, **kwargs):
+    from .models import ActivityEvent
+    record(ActivityEvent.ACTION_DELETE, instance)
+
+
+def _on_login(sender, request, user, **kwargs):
+    from .models import ActivityEvent
+    record(ActivityEvent.ACTION_LOGIN, user, actor=user)
+
+
+def connect_signals():
+    """Record create/update/delete of customers, memberships, links and users, plus logins."""
+    from django.contrib.auth import get_user_model, user_logged_in
+    from django.db.models.signals import post_delete, post_save
+    from .models import Customer, CustomerMembership, PortalLink
+
+    for model in (Customer, CustomerMembership, PortalLink, get_user_model()):
+        post_save.connect(_on_save, sender=model, dispatch_uid=f"activity_save_{model._meta.label_lower}")
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f"activity_delete_{model._meta.label_lower}")
+    user_logged_in.connect(_on_login, dispatch_uid="activity_login")
+
+
+# ----- Partition maintenance (PostgreSQL) -----
+
+def _month_start(year, month):
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(start):
+    return f"{TABLE}_p{start:%Y%m}"
+
+
+def _default_has_rows(cursor, start, end):
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s)",
+        [start, end],
+    )
+    return cursor.fetchone()[0]
+
+
+def _create_partition(connection, name, start, end, has_default):
+    """
+    Create one monthly partition. Rows the DEFAULT partition already holds for the month (written
+    while the partition was missing) would make CREATE ... PARTITION OF fail, so in that case the
+    default is detached, the partition created, the rows moved and the default re-attached, all in
+    one transaction.
+    """
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if not (has_default and _default_has_rows(cursor, start, end)):
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} {bounds}")
+            return
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {TABLE} {bounds}")
+        cursor.execute(
+            f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s",
+            [start, end],
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s", [start, end]
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    logger.info(f"Activity partition {name}: moved {moved} event(s) out of the default partition")
+
+
+def ensure_partitions(connection, months_ahead=MONTHS_AHEAD, retention_months=None):
+    """
+    Create monthly partitions from the current month up to months_ahead, and drop partitions that
+    end more than retention_months ago. Each partition is handled in its own transaction; one that
+    fails is logged and skipped. Returns (created, dropped, failed) partition names; no-op unless
+    the table is partitioned (PostgreSQL).
+    """
+    if connection.vendor != "postgresql":
+        return [], [], []
+    now = timezone.now().astimezone(dt_timezone.utc)
+    created, dropped, failed = [], [], []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+    has_default = DEFAULT_PARTITION in existing
+
+    for offset in range(months_ahead + 1):
+        start = _month_start(now.year, now.month + offset)
+        end = _month_start(start.year, start.month + 1)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        try:
+            _create_partition(connection, name, start, end, has_default)
+        except Exception:
+            logger.exception(f"Could not create activity partition {name}")
+            failed.append(name)
+            continue
+        created.append(name)
+
+    if retention_months:
+        cutoff = _month_start(now.year, now.month - retention_months)
+        for name in sorted(existing):
+            suffix = name.rsplit("_p", 1)[-1]
+            if not (name.startswith(f"{TABLE}_p") and suffix.isdigit() and len(suffix) == 6):
+                continue
+            start = _month_start(int(suffix[:4]), int(suffix[4:]))
+            if _month_start(start.year, start.month + 1) > cutoff:
+                continue
+            try:
+                with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                    cursor.execute(f"DROP TABLE IF EXISTS {name}")
+            except Exception:
+                logger.exception(f"Could not drop activity partition {name}")
+                failed.append(name)
+                continue
+            dropped.append(name)
+    return created, dropped, failed
+
+
+def schedule_partitions():
+    """
+    Queue partition maintenance about once a day (called by `manage.py worker` on its maintenance
+    tick), so partitions exist ahead of time and expired ones are dropped without a cron entry.
+    Returns the queued Job or None.
+    """
+    from django.db import connection
+    from . import jobs
+
+    if connection.vendor != "postgresql":
+        return None
+    return jobs.schedule_periodic(PARTITIONS_TASK, PARTITIONS_INTERVAL)
@@ -20,27 +20,24 @@ class PortalConfig(AppConfig):
         from .models import Customer, CustomerMembership
         
         def invalidate_user_customers_cache(sender, instance, **kwargs):
-            """Invalidate user_customers cache when Customer or CustomerMembership changes."""
-            # If it's a CustomerMembership, invalidate cache for that user
+            """Invalidate cached customer counts when Customer or CustomerMembership changes."""
+            # If it's a CustomerMembership, invalidate the count for that user
             if isinstance(instance, CustomerMembership):
-                cache_key = f"user_customers_{instance.user_id}"
-                cache.delete(cache_key)
-            # If it's a Customer, invalidate cache for all users with memberships
+                cache.delete(f"user_customer_count_{instance.user_id}")
+            # If it's a Customer, invalidate the superuser count (they see all customers).
+            # Deleting a customer cascades to its memberships, whose own signals clear member counts.
             elif isinstance(instance, Customer):
-                # Invalidate cache for all users with memberships for this customer
-                # This is a bit expensive, but ensures cache consistency
-                # In practice, we could be more selective, but for simplicity we clear all
-                # The cache will rebuild on next request
-                from .models import CustomerMembership
-                user_ids = CustomerMembership.objects.filter(customer=instance).values_list('user_id', flat=True)
-                for user_id in user_ids:
-                    cache.delete(f"user_customers_{user_id}")
-                # Also clear superuser cache (they see all customers)
-                # We use a pattern to clear all user_customers_* keys
-                # For simplicity, we'll let the cache expire naturally (5 min) or clear on next superuser request
+                cache.delete("customer_count_all")
         
         # Connect signals
         post_save.connect(invalidate_user_customers_cache, sender=Customer)
         post_save.connect(invalidate_user_customers_cache, sender=CustomerMembership)
         post_delete.connect(invalidate_user_customers_cache, sender=Customer)
         post_delete.connect(invalidate_user_customers_cache, sender=CustomerMembership)
+
+        # Activity/audit log: model changes and logins
+        from .activity import connect_signals
+        connect_signals()
+
+        # Register background job tasks (portal.jobs)
+        from . import tasks  # noqa: F401
@@ -7,19 +7,17 @@ Created: 2026-02-05
 Last Modified: 2026-02-05
 """
 from pathlib import Path
-from types import SimpleNamespace
 from django.conf import settings
-from django.utils import translation
+from django.utils import timezone, translation
+from django.utils.functional import SimpleLazyObject
 from django.core.cache import cache
-import re
-import urllib.request
-import urllib.error
-import json
-from .models import CustomerMembership, Customer
+import time
+from . import jobs, updates
+from .customers import accessible_customers, customer_count, last_used_customer, recent_customer_ids
 
 
-def language_menu(request):
-    """Add current language and other languages for the language switcher (avatar menu and login page)."""
+def _language_menu(request):
+    """Current language and other languages for the language switcher (avatar menu and login page)."""
     current = translation.get_language() or settings.LANGUAGE_CODE
     # Normalize to base code (e.g. en-us -> en)
     current_base = current.split("-")[0] if current else "en"
@@ -33,68 +31,48 @@ def language_menu(request):
     }
 
 
-def user_customers(request):
-    """Add user's customer list to all templates. Superusers get all customers."""
+def _user_customers(request):
+    """
+    Active customer and the number of customers the user can switch to. Superusers get all customers.
+    The customer list itself is not loaded here; the switcher fetches it page by page (customer_picker).
+    """
     if not request or not request.user or not request.user.is_authenticated:
         return {
-            "user_customers": [],
+            "user_customer_count": 0,
             "active_customer_id": None,
+            "active_customer_name": "",
+            "active_customer_slug": "",
         }
 
-    # Cache key based on user ID and authentication status
-    cache_key = f"user_customers_{request.user.id}"
-    cached_result = cache.get(cache_key)
-    
-    if cached_result is not None:
-        user_customers_list = cached_result
-    else:
-        # Superusers see and can switch to all customers (no membership required)
-        if request.user.is_superuser:
-            customers = Customer.objects.order_by("name")
-            # Wrap in objects with .customer so templates can use item.customer.id / item.customer.name
-            user_customers_list = [SimpleNamespace(customer=c) for c in customers]
-        else:
-            memberships = (
-                CustomerMembership.objects.filter(user=request.user)
-                .select_related("customer")
-                .order_by("customer__name")
-            )
-            user_customers_list = list(memberships)
-        
-        # Cache for 5 minutes (300 seconds) - invalidate on customer/membership changes
-        cache.set(cache_key, user_customers_list, 300)
+    # Cached per user for 5 minutes - invalidated on customer/membership changes (portal.apps)
+    count = customer_count(request.user)
 
-    # Resolve active_customer_id from session
-    active_customer_id = request.session.get("active_customer_id")
-    if active_customer_id is not None:
-        if request.user.is_superuser:
-            if not Customer.objects.filter(pk=active_customer_id).exists():
-                active_customer_id = None
-        else:
-            if not any(m.customer_id == active_customer_id for m in user_customers_list):
-                active_customer_id = None
+    # The customer of the dashboard being shown (portal.views.customer_home), else the last used
+    # one from the recent_customers cookie (one indexed lookup, also checks access). No session writes.
+    customer = getattr(request, "active_customer", None)
+    if customer is None:
+        customer = last_used_customer(request.user, recent_customer_ids(request))
 
-    # Auto-select first customer only if user has exactly one customer
+    # Fall back to the only customer if user has exactly one customer
     # If user has multiple customers, they must explicitly choose
-    if active_customer_id is None and len(user_customers_list) == 1:
-        first = user_customers_list[0]
-        active_customer_id = getattr(first, "customer_id", None) or first.customer.id
-        # Save to session so it persists
-        request.session["active_customer_id"] = active_customer_id
+    if customer is None and count == 1:
+        customer = accessible_customers(request.user).only("id", "name", "slug").first()
 
     # Facilities not available in v2.0.0 (main branch)
     # This will be available in v3.0.0-alpha.1 (dev branch)
     
     return {
-        "user_customers": user_customers_list,
-        "active_customer_id": active_customer_id,
+        "user_customer_count": count,
+        "active_customer_id": customer.id if customer else None,
+        "active_customer_name": customer.name if customer else "",
+        "active_customer_slug": customer.slug if customer else "",
         "user_facilities": [],  # Empty list for v2.0.0
         "has_dev_access": False,  # Dev features not available in v2.0.0
         "dev_features_enabled": False,  # Dev features not available in v2.0.0
     }
 
-def footer_info(request):
-    """Add footer information to all templates (portal and admin)."""
+def _footer_info(request):
+    """Footer information (portal and admin)."""
     # Always return safe defaults first
     defaults = {
         "app_version": "Unknown",
@@ -214,76 +192,113 @@ def footer_info(request):
     return result
 
 
-def about_info(request):
-    """Add About modal info: version check for admins, general info for all."""
+ABOUT_INFO_CACHE_KEY = "pmg_portal_latest_version"
+
+
+def _about_info(request):
+    """
+    About modal info: version check for admins, general info for all.
+    The check itself runs as a background job (portal.tasks.check_updates); pages only read the
+    last result and queue a new check when it is older than an hour, never waiting on GitHub.
+    """
     has_update = False
     latest_version = None
-    
+
     # Only check for updates if user is superuser/admin
     if request and request.user and request.user.is_authenticated and request.user.is_superuser:
-        # Cache the check for 1 hour to avoid hitting GitHub API too often
-        cache_key = "pmg_portal_latest_version"
-        cached = cache.get(cache_key)
-        
+        cached = cache.get(ABOUT_INFO_CACHE_KEY)
         if cached is not None:
             latest_version, has_update = cached
         else:
             try:
-                # Get current version
-                current_version = "Unknown"
-                version_paths = [
-                    Path(settings.BASE_DIR.parent) / "VERSION",
-                    Path(settings.BASE_DIR) / ".." / "VERSION",
-                    Path("/opt/pmg-portal/VERSION"),
-                ]
-                for vp in version_paths:
-                    try:
-                        if vp.exists() and vp.is_file():
-                            current_version = vp.read_text(encoding='utf-8').strip()
-                            break
-                    except (OSError, IOError, UnicodeDecodeError, PermissionError):
-                        continue
-                
-                # Fetch latest version from GitHub main branch
-                # GitHub API: GET /repos/{owner}/{repo}/contents/{path}?ref={branch}
-                github_repo = "5echo-io/pmg-portal"
-                github_branch = "main"
-                github_path = "VERSION"
-                api_url = f"https://api.github.com/repos/{github_repo}/contents/{github_path}?ref={github_branch}"
-                
-                req = urllib.request.Request(api_url, headers={"Accept": "application/vnd.github.v3+json"})
-                with urllib.request.urlopen(req, timeout=5) as response:
-                    data = json.loads(response.read().decode())
-                    if "content" in data:
-                        import base64
-                        latest_version = base64.b64decode(data["content"]).decode('utf-8').strip()
-                        
-                        # Compare versions (simple string comparison for now)
-                        # Extract version numbers (e.g., "1.17.39-beta.14" -> compare "1.17.39")
-                        def normalize_version(v):
-                            # Remove build suffix and extract MAJOR.MINOR.PATCH
-                            v_clean = re.sub(r'-[a-z]+\.\d+$', '', v.strip())
-                            parts = v_clean.split('.')
-                            if len(parts) >= 3:
-                                return tuple(int(p) for p in parts[:3])
-                            return (0, 0, 0)
-                        
-                        current_norm = normalize_version(current_version)
-                        latest_norm = normalize_version(latest_version)
-                        has_update = latest_norm > current_norm
-                
-                # Cache for 1 hour (3600 seconds)
-                cache.set(cache_key, (latest_version, has_update), 3600)
-            except (urllib.error.URLError, urllib.error.HTTPError, json.JSONDecodeError, Exception) as e:
+                check = updates.latest_check()
+                if check is not None and check.result:
+                    latest_version = check.result.get("latest_version")
+                    has_update = bool(check.result.get("has_update"))
+                age = (timezone.now() - check.finished_at).total_seconds() if check is not None else None
+                if age is None or age > updates.CHECK_INTERVAL_SECONDS:
+                    # Deduplicated by key: at most one check is queued at a time
+                    jobs.enqueue(updates.CHECK_UPDATES_TASK, key=updates.CHECK_UPDATES_TASK, max_attempts=1)
+                # Per-process cache, so the job table is read at most every few minutes
+                cache.set(ABOUT_INFO_CACHE_KEY, (latest_version, has_update), 300)
+            except Exception as e:
                 # Silently fail - no update info available
                 import logging
                 logger = logging.getLogger(__name__)
                 if settings.DEBUG:
-                    logger.debug(f"Could not check for updates: {e}")
-                latest_version = None
-                has_update = False
-    
+                    logger.debug(f"Could not read update check: {e}")
+
     return {
         "has_update_available": has_update,
         "latest_version": latest_version,
     }
+
+
+# ----- Lazy wrappers registered in settings.TEMPLATES -----
+# Each processor returns SimpleLazyObject values, so its work only runs if a template actually
+# touches one of its variables (the login page, admin_app pages and fragments skip most of them).
+# All keys of one processor share a single evaluation, which is timed into
+# request.context_processor_timings (reported by ContextProcessorTimingMiddleware).
+
+def _lazy_context(request, name, compute, defaults):
+    """Return {key: lazy value}; the first access to any key runs compute(request) once and records its time."""
+    state = {}
+
+    def evaluate():
+        if "result" not in state:
+            start = time.perf_counter()
+            try:
+                state["result"] = compute(request)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                timings = getattr(request, "context_processor_timings", None)
+                if timings is not None:
+                    timings[name] = timings.get(name, 0.0) + elapsed_ms
+        return state["result"]
+
+    return {
+        key: SimpleLazyObject(lambda key=key, default=default: evaluate().get(key, default))
+        for key, default in defaults.items()
+    }
+
+
+def language_menu(request):
+    """Add current language and other languages for the language switcher (avatar menu and login page)."""
+    return _lazy_context(request, "language_menu", _language_menu, {
+        "current_language_code": "en",
+        "current_language_name": "English",
+        "other_languages": [],
+    })
+
+
+def user_customers(request):
+    """Add the active customer and the user's customer count to all templates."""
+    return _lazy_context(request, "user_customers", _user_customers, {
+        "user_customer_count": 0,
+        "active_customer_id": None,
+        "active_customer_name": "",
+        "active_customer_slug": "",
+        "user_facilities": [],
+        "has_dev_access": False,
+        "dev_features_enabled": False,
+    })
+
+
+def footer_info(request):
+    """Add footer information to all templates (portal and admin)."""
+    return _lazy_context(request, "footer_info", _footer_info, {
+        "app_version": "Unknown",
+        "changelog_preview": "",
+        "changelog_section": "",
+        "changelog_full": "",
+        "copyright_year": "2026",
+        "show_changelog_button": False,
+    })
+
+
+def about_info(request):
+    """Add About modal info: version check for admins, general info for all."""
+    return _lazy_context(request, "about_info", _about_info, {
+        "has_update_available": False,
+        "latest_version": None,
+    })
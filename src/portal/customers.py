@@ -0,0 +1,116 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Customer access queries and the paginated customer picker
+Path: src/portal/customers.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Customer
+
+PICKER_PAGE_SIZE = 20
+# Recently used customer ids, most recent first ("12.5.7"). A cookie rather than the session, so
+# switching customers never writes the session; ids are only hints and are re-checked for access.
+RECENT_CUSTOMERS_COOKIE = "recent_customers"
+RECENT_CUSTOMERS_COOKIE_AGE = 365 * 24 * 3600
+RECENT_CUSTOMERS_MAX = 5
+# Show the search box once the list no longer fits at a glance
+PICKER_SEARCH_THRESHOLD = 4
+
+PICKER_FIELDS = ("id", "name", "slug", "org_number", "logo", "logo_thumbnail")
+
+
+def accessible_customers(user):
+    """Customers the user may switch to: superusers see all, others only their memberships."""
+    if user.is_superuser:
+        return Customer.objects.all()
+    return Customer.objects.filter(customermembership__user=user)
+
+
+def customer_count_cache_key(user):
+    return "customer_count_all" if user.is_superuser else f"user_customer_count_{user.pk}"
+
+
+def customer_count(user):
+    """Number of customers the user can access (cached, invalidated by the portal signals)."""
+    cache_key = customer_count_cache_key(user)
+    count = cache.get(cache_key)
+    if count is None:
+        count = accessible_customers(user).count()
+        cache.set(cache_key, count, 300)
+    return count
+
+
+def recent_customer_ids(request):
+    """Recently used customer ids from the request cookie, most recent first."""
+    ids = []
+    for part in request.COOKIES.get(RECENT_CUSTOMERS_COOKIE, "").split("."):
+        if part.isdigit() and int(part) not in ids:
+            ids.append(int(part))
+    return ids[:RECENT_CUSTOMERS_MAX]
+
+
+def remember_recent_customer(request, response, customer_id):
+    """
+    Move customer_id to the front of the recently used list (cookie set on response). Returns True
+    if it was not already the most recent one, i.e. the user switched customers.
+    """
+    recent = recent_customer_ids(request)
+    if recent[:1] == [customer_id]:
+        return False
+    recent = [customer_id] + [cid for cid in recent if cid != customer_id][:RECENT_CUSTOMERS_MAX - 1]
+    response.set_cookie(
+        RECENT_CUSTOMERS_COOKIE,
+        ".".join(str(cid) for cid in recent),
+        max_age=RECENT_CUSTOMERS_COOKIE_AGE,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )
+    return True
+
+
+def last_used_customer(user, recent_ids, fields=("id", "name", "slug")):
+    """The most recently used customer the user can still access, or None (one query)."""
+    if not recent_ids:
+        return None
+    by_id = {c.id: c for c in accessible_customers(user).filter(pk__in=recent_ids).only(*fields)}
+    return next((by_id[cid] for cid in recent_ids if cid in by_id), None)
+
+
+def picker_page(user, query="", after="", recent_ids=()):
+    """
+    One page of the customer picker.
+
+    Keyset pagination on the unique name column: each page is "name > after ORDER BY name LIMIT n",
+    so deep pages cost the same as the first. Search is a prefix match on name (served by the
+    upper(name) text_pattern_ops index on PostgreSQL) or on org number.
+
+    Without a search term the first page starts with the recently used customers; they are left
+    out of the alphabetical pages so nothing is listed twice.
+
+    Returns (recent, customers, next_after) where next_after is the cursor for the next page or None.
+    """
+    qs = accessible_customers(user).only(*PICKER_FIELDS)
+    query = (query or "").strip()
+    recent = []
+    if query:
+        qs = qs.filter(Q(name__istartswith=query) | Q(org_number__startswith=query))
+    elif recent_ids:
+        if not after:
+            by_id = {c.id: c for c in qs.filter(pk__in=recent_ids)}
+            recent = [by_id[cid] for cid in recent_ids if cid in by_id]
+        qs = qs.exclude(pk__in=recent_ids)
+    if after:
+        qs = qs.filter(name__gt=after)
+
+    customers = list(qs.order_by("name")[:PICKER_PAGE_SIZE + 1])
+    next_after = None
+    if len(customers) > PICKER_PAGE_SIZE:
+        customers = customers[:PICKER_PAGE_SIZE]
+        next_after = customers[-1].name
+    return recent, customers, next_after
@@ -0,0 +1,191 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Chunked, resumable deletion of customers and users (mark at once, purge in batches)
+Path: src/portal/deletion.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import jobs
+
+logger = logging.getLogger(__name__)
+
+PURGE_CUSTOMER_TASK = "portal.purge_customer"
+PURGE_USER_TASK = "portal.purge_user"
+
+
+def _batch_size():
+    return getattr(settings, "DELETION_BATCH_SIZE", 1000)
+
+
+def _purge_key(task, pk):
+    return f"{task}:{pk}"
+
+
+def pending_deletion_ids(task):
+    """Primary keys with a queued or running purge of this kind (e.g. users to hide from admin lists)."""
+    from .models import Job
+
+    prefix = _purge_key(task, "")
+    keys = Job.objects.filter(
+        key__startswith=prefix, status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]
+    ).values_list("key", flat=True)
+    return {int(key[len(prefix):]) for key in keys}
+
+
+def _invalidate_customer_counts(user_ids):
+    """Drop cached customer counts of these users in one cache call (see portal.customers.customer_count)."""
+    if user_ids:
+        cache.delete_many([f"user_customer_count_{user_id}" for user_id in user_ids])
+
+
+def purge_in_batches(queryset, stage, before_delete=None, after_commit=None):
+    """
+    Delete the rows of queryset DELETION_BATCH_SIZE at a time, each batch in its own short transaction.
+    Rows are deleted with a plain DELETE ... WHERE id IN (...): no objects are loaded and no per-row
+    signals fire, so callers must purge anything referencing these rows first. before_delete(batch)
+    runs inside the transaction and may return a value that is passed to after_commit() once the
+    batch has committed. Work that is done stays done, so a purge cut off by a crash just continues
+    with the remaining rows when the job runs again. Returns the number of rows deleted.
+    """
+    model = queryset.model
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:_batch_size()])
+            if not ids:
+                break
+            batch = model._base_manager.filter(pk__in=ids)
+            carry = before_delete(batch) if before_delete else None
+            # _raw_delete: the bulk DELETE the deletion collector uses for rows without signals/cascades
+            deleted = batch._raw_delete(batch.db)
+        if after_commit:
+            after_commit(carry)
+        total += deleted
+        jobs.report_progress(stage=stage, deleted=total)
+    if total:
+        logger.info(f"Purged {total} {model._meta.label} row(s) ({stage})")
+    return total
+
+
+# ----- Customers -----
+
+def delete_customer(customer, user=None):
+    """
+    Start deleting a customer: it is hidden from every query at once (deleting_at) and a purge job
+    removes its links, memberships and finally the row itself in the background. Returns the job.
+    """
+    from .models import Customer, CustomerMembership, Job
+
+    with transaction.atomic():
+        Customer.all_objects.filter(pk=customer.pk, deleting_at__isnull=True).update(deleting_at=timezone.now())
+        job = jobs.enqueue(
+            PURGE_CUSTOMER_TASK,
+            priority=Job.PRIORITY_LOW,
+            key=_purge_key(PURGE_CUSTOMER_TASK, customer.pk),
+            user=user,
+            customer_id=customer.pk,
+        )
+    # The customer is hidden from now on: members' cached counts must not wait for the purge job
+    cache.delete("customer_count_all")
+    _invalidate_customer_counts(
+        set(CustomerMembership.objects.filter(customer_id=customer.pk).values_list("user_id", flat=True))
+    )
+    return job
+
+
+@jobs.task(PURGE_CUSTOMER_TASK)
+def purge_customer(customer_id):
+    """Purge a customer marked by delete_customer(): dependents in batches, then the (now small) row delete."""
+    from .models import Customer, CustomerMembership, PortalLink, PortalLinkHealth, PortalLinkUsage
+
+    customer = Customer.all_objects.filter(pk=customer_id).first()
+    if customer is None:
+        return {"deleted": False}
+    if customer.deleting_at is None:
+        Customer.all_objects.filter(pk=customer_id).update(deleting_at=timezone.now())
+
+    def member_ids(batch):
+        return set(batch.values_list("user_id", flat=True))
+
+    # Every table referencing PortalLink must be purged here before the links: _raw_delete does not
+    # cascade, so a row left behind fails the link purge with a foreign key violation
+    rows = {
+        "portal.PortalLinkUsage": purge_in_batches(
+            PortalLinkUsage._base_manager.filter(link__customer_id=customer_id), "link usage"
+        ),
+        "portal.PortalLinkHealth": purge_in_batches(
+            PortalLinkHealth._base_manager.filter(link__customer_id=customer_id), "link health"
+        ),
+        "portal.PortalLink": purge_in_batches(PortalLink._base_manager.filter(customer_id=customer_id), "links"),
+        "portal.CustomerMembership": purge_in_batches(
+            CustomerMembership._base_manager.filter(customer_id=customer_id),
+            "memberships",
+            before_delete=member_ids,
+            after_commit=_invalidate_customer_counts,
+        ),
+    }
+    name = customer.name
+    jobs.report_progress(stage="customer", deleted=0)
+    # Nothing references the row any more: the regular delete (signals, activity log, logo release) is cheap
+    with transaction.atomic():
+        customer.delete()
+    rows["portal.Customer"] = 1
+    logger.info(f"Deleted customer {customer_id} ({name}): {rows}")
+    return {"deleted": True, "name": name, "rows": rows}
+
+
+# ----- Users -----
+
+def delete_user(user_obj, user=None):
+    """
+    Start deleting a user: the account is deactivated at once (existing sessions stop working) and
+    hidden from the admin user list while a purge job removes memberships and link usage in
+    batches, then the user row. Returns the job.
+    """
+    from .models import Job
+
+    with transaction.atomic():
+        get_user_model()._base_manager.filter(pk=user_obj.pk).update(is_active=False)
+        return jobs.enqueue(
+            PURGE_USER_TASK,
+            priority=Job.PRIORITY_LOW,
+            key=_purge_key(PURGE_USER_TASK, user_obj.pk),
+            user=user,
+            user_id=user_obj.pk,
+        )
+
+
+@jobs.task(PURGE_USER_TASK)
+def purge_user(user_id):
+    """Purge a user marked by delete_user(): memberships and link usage in batches, then the user row."""
+    from .models import CustomerMembership, PortalLinkUsage
+
+    user_obj = get_user_model()._base_manager.filter(pk=user_id).first()
+    if user_obj is None:
+        return {"deleted": False}
+
+    rows = {
+        "portal.PortalLinkUsage": purge_in_batches(PortalLinkUsage._base_manager.filter(user_id=user_id), "link usage"),
+        "portal.CustomerMembership": purge_in_batches(
+            CustomerMembership._base_manager.filter(user_id=user_id), "memberships"
+        ),
+    }
+    _invalidate_customer_counts([user_id])
+    username = user_obj.get_username()
+    jobs.report_progress(stage="user", deleted=0)
+    # Remaining relations (groups, permissions, admin log, job authorship) are small; the regular delete handles them
+    with transaction.atomic():
+        _total, per_model = user_obj.delete()
+    for label, count in per_model.items():
+        rows[label] = rows.get(label, 0) + count
+    logger.info(f"Deleted user {user_id} ({username}): {rows}")
+    return {"deleted": True, "name": username, "rows": rows}
@@ -0,0 +1,64 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Per-process background thread that periodically writes buffered data to the database
+Path: src/portal/flusher.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import atexit
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundFlusher:
+    """
+    Calls flush() every `interval` seconds (or as soon as wake() is called) on a daemon thread,
+    and once more at interpreter exit. The thread is started lazily per process, so gunicorn
+    workers forked from a preloaded master each get their own.
+    """
+
+    def __init__(self, name, flush, interval):
+        self.name = name
+        self.flush = flush
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        atexit.register(self._flush_at_exit)
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._wakeup = threading.Event()
+        threading.Thread(target=self._run, name=self.name, daemon=True).start()
+
+    def wake(self):
+        """Flush now instead of waiting for the next tick (e.g. a batch is full)."""
+        self._wakeup.set()
+
+    def _run(self):
+        interval = self.interval() if callable(self.interval) else self.interval
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception(f"{self.name}: flush failed")
+
+    def _flush_at_exit(self):
+        if self._pid != os.getpid():
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception(f"{self.name}: flush at exit failed")
@@ -0,0 +1,224 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Database-backed background job queue (enqueue, claim with SKIP LOCKED, retries with backoff)
+Path: src/portal/jobs.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import contextvars
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import activity
+
+logger = logging.getLogger(__name__)
+
+# Task name -> callable(**kwargs); filled by @task in portal.tasks (imported in PortalConfig.ready)
+_registry = {}
+
+# Job being executed on this thread (for report_progress)
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class PermanentFailure(Exception):
+    """Raise from a task to fail its job at once, without further retries."""
+
+
+def task(name):
+    """Register a function as the job task `name`. It is called with the job's kwargs; its return value (JSON) is stored as the result."""
+    def decorator(func):
+        _registry[name] = func
+        func.task_name = name
+        return func
+    return decorator
+
+
+def enqueue(name, *, priority=0, delay=0, max_attempts=None, key="", user=None, **kwargs):
+    """
+    Queue task `name` with JSON-serializable kwargs and return its Job. Inside a transaction the job
+    only becomes visible to workers when that transaction commits, together with the data it needs.
+    With a key, an already queued or running job with the same key is returned instead of a new one.
+    """
+    from .models import Job
+
+    if name not in _registry:
+        raise ValueError(f"Unknown job task {name!r}")
+    job = Job(
+        task=name,
+        kwargs=kwargs,
+        key=key,
+        priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or getattr(settings, "JOB_MAX_ATTEMPTS", 3),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    if not key:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        existing = Job.objects.filter(key=key, status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]).first()
+        if existing is None:
+            # The other job finished in the meantime
+            job.save()
+            return job
+        return existing
+    return job
+
+
+def schedule_periodic(name, interval, **kwargs):
+    """
+    Queue task `name` (keyed by its name, one attempt) unless a job of it was queued within the last
+    `interval` seconds. Called from the worker's maintenance tick, so the job runs about once per
+    interval however many workers there are. Returns the queued Job or None.
+    """
+    from .models import Job
+
+    if Job.objects.filter(key=name, created_at__gte=timezone.now() - timedelta(seconds=interval)).exists():
+        return None
+    return enqueue(name, key=name, max_attempts=1, **kwargs)
+
+
+def claim(worker_name):
+    """
+    Lock the next due job (highest priority, then oldest run_at), mark it running and return it.
+    Concurrent workers skip rows another worker has locked instead of waiting on them.
+    Returns None when nothing is due.
+    """
+    from .models import Job
+
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_QUEUED, run_at__lte=now)
+            .order_by("-priority", "run_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.STATUS_RUNNING
+        job.attempts += 1
+        job.started_at = now
+        job.finished_at = None
+        job.worker = worker_name[:100]
+        job.save(update_fields=["status", "attempts", "started_at", "finished_at", "worker"])
+    return job
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: JOB_RETRY_BACKOFF * 2^(attempts-1), capped at JOB_RETRY_BACKOFF_MAX."""
+    base = getattr(settings, "JOB_RETRY_BACKOFF", 10)
+    delay = min(base * 2 ** max(attempts - 1, 0), getattr(settings, "JOB_RETRY_BACKOFF_MAX", 3600))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run(job):
+    """Execute a claimed job and record the outcome: succeeded, queued again after a backoff, or failed. Returns True on success."""
+    from .models import Job
+
+    func = _registry.get(job.task)
+    job_token = _current_job.set(job)
+    actor_token = activity.set_current_actor(job.created_by)
+    try:
+        if func is None:
+            raise PermanentFailure(f"Unknown job task {job.task!r}")
+        result = func(**job.kwargs)
+    except Exception as e:
+        now = timezone.now()
+        # First line is the message shown by the status API, the traceback follows
+        error = f"{e}\n\n" + "".join(traceback.format_exception(e))[-4000:]
+        if isinstance(e, PermanentFailure) or job.attempts >= job.max_attempts:
+            logger.error(f"Job #{job.pk} {job.task} failed (attempt {job.attempts}/{job.max_attempts}): {e}")
+            Job.objects.filter(pk=job.pk).update(status=Job.STATUS_FAILED, finished_at=now, error=error)
+        else:
+            delay = retry_delay(job.attempts)
+            logger.warning(f"Job #{job.pk} {job.task} failed (attempt {job.attempts}/{job.max_attempts}), retrying in {delay:.0f}s: {e}")
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.STATUS_QUEUED, run_at=now + timedelta(seconds=delay), error=error
+            )
+        return False
+    finally:
+        activity.reset_current_actor(actor_token)
+        _current_job.reset(job_token)
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.STATUS_SUCCEEDED, finished_at=timezone.now(), result=result, error=""
+    )
+    logger.info(f"Job #{job.pk} {job.task} succeeded (attempt {job.attempts})")
+    return True
+
+
+def is_final_attempt():
+    """True inside a job that will not be retried if it fails now (e.g. to clean up its inputs)."""
+    job = _current_job.get()
+    return job is not None and job.attempts >= job.max_attempts
+
+
+def report_progress(**data):
+    """Store progress of the running job in its result (shown by the job status API until it finishes)."""
+    from .models import Job
+
+    job = _current_job.get()
+    if job is not None:
+        Job.objects.filter(pk=job.pk).update(result={"progress": data})
+
+
+def requeue_stale():
+    """
+    Release jobs left running by a worker that died (running longer than JOB_TIMEOUT): they count
+    as a failed attempt and are queued again, or failed once out of attempts. Returns the number released.
+    """
+    from django.db.models import F
+    from .models import Job
+
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.STATUS_RUNNING, started_at__lt=now - timedelta(seconds=getattr(settings, "JOB_TIMEOUT", 900))
+    )
+    error = "Worker stopped while the job was running"
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.STATUS_FAILED, finished_at=now, error=error
+    )
+    requeued = stale.update(status=Job.STATUS_QUEUED, run_at=now, error=error)
+    if failed or requeued:
+        logger.warning(f"Released stale jobs: {requeued} requeued, {failed} failed")
+    return failed + requeued
+
+
+def prune():
+    """Delete finished jobs older than JOB_RETENTION_DAYS. Returns the number deleted."""
+    from .models import Job
+
+    cutoff = timezone.now() - timedelta(days=getattr(settings, "JOB_RETENTION_DAYS", 7))
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.STATUS_SUCCEEDED, Job.STATUS_FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def job_status(job):
+    """JSON-serializable status of a job (job status API)."""
+    return {
+        "id": job.pk,
+        "task": job.task,
+        "status": job.status,
+        "done": job.status in (job.STATUS_SUCCEEDED, job.STATUS_FAILED),
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "created_at": job.created_at.isoformat(),
+        "run_at": job.run_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "result": job.result,
+        # Message only; the traceback stays in the table
+        "error": job.error.split("\n", 1)[0] if job.error else "",
+    }
@@ -0,0 +1,102 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Buffered portal link click counters, flushed to the database in bulk
+Path: src/portal/link_clicks.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .flusher import BackgroundFlusher
+
+logger = logging.getLogger(__name__)
+
+UPSERT_BATCH_SIZE = 200  # rows per INSERT ... ON CONFLICT statement
+
+# (link_id, user_id) -> clicks since the last flush; a click is one dict increment in memory
+_pending = Counter()
+_last_clicked = {}
+_lock = threading.Lock()
+
+
+def record_click(link_id, user_id):
+    with _lock:
+        _pending[(link_id, user_id)] += 1
+        _last_clicked[(link_id, user_id)] = timezone.now()
+    _flusher.ensure_started()
+
+
+def flush():
+    """
+    Write aggregated click deltas: one UPDATE for all link totals and one multi-row upsert for the
+    per-user counters, in a single transaction. Returns the number of clicks written.
+    """
+    from django.contrib.auth import get_user_model
+    from .models import PortalLink, PortalLinkUsage
+
+    with _lock:
+        if not _pending:
+            return 0
+        pending, last_clicked = dict(_pending), dict(_last_clicked)
+        _pending.clear()
+        _last_clicked.clear()
+
+    close_old_connections()
+    try:
+        # Links or users deleted since the click are dropped
+        link_ids = set(PortalLink.objects.filter(pk__in={l for l, _u in pending}).values_list("pk", flat=True))
+        user_ids = set(get_user_model().objects.filter(pk__in={u for _l, u in pending}).values_list("pk", flat=True))
+        pending = {key: n for key, n in pending.items() if key[0] in link_ids and key[1] in user_ids}
+        if not pending:
+            return 0
+
+        per_link = Counter()
+        for (link_id, _user_id), n in pending.items():
+            per_link[link_id] += n
+
+        usage_table = connection.ops.quote_name(PortalLinkUsage._meta.db_table)
+        rows = [
+            (link_id, user_id, n, connection.ops.adapt_datetimefield_value(last_clicked[(link_id, user_id)]))
+            for (link_id, user_id), n in pending.items()
+        ]
+
+        with transaction.atomic():
+            PortalLink.objects.filter(pk__in=per_link).update(
+                click_count=F("click_count") + Case(
+                    *[When(pk=link_id, then=Value(n)) for link_id, n in per_link.items()],
+                    default=Value(0),
+                )
+            )
+            with connection.cursor() as cursor:
+                for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                    chunk = rows[start:start + UPSERT_BATCH_SIZE]
+                    cursor.execute(
+                        f"INSERT INTO {usage_table} (link_id, user_id, clicks, last_clicked_at) "
+                        f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(chunk))} "
+                        f"ON CONFLICT (link_id, user_id) DO UPDATE SET "
+                        f"clicks = {usage_table}.clicks + EXCLUDED.clicks, last_clicked_at = EXCLUDED.last_clicked_at",
+                        [value for row in chunk for value in row],
+                    )
+    except Exception:
+        # Merge the deltas back so the next flush retries them
+        with _lock:
+            for key, n in pending.items():
+                _pending[key] += n
+                _last_clicked.setdefault(key, last_clicked[key])
+        raise
+    total = sum(pending.values())
+    logger.debug(f"Flushed {total} link click(s) for {len(per_link)} link(s)")
+    return total
+
+
+_flusher = BackgroundFlusher(
+    "link-click-flusher", flush, lambda: getattr(settings, "LINK_CLICK_FLUSH_INTERVAL", 10.0)
+)
@@ -0,0 +1,321 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Concurrent portal link health checker (asyncio, per-host limits, conditional HEAD/GET)
+Path: src/portal/link_health.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import socket
+import ssl
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import quote, urljoin, urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHECK_LINKS_TASK = "check_links"
+USER_AGENT = "PMG-Portal-LinkCheck/1.0"
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+MAX_HEADER_LINES = 100
+SAVE_BATCH_SIZE = 500  # results written per upsert
+
+_PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+_QUERY_SAFE = _PATH_SAFE + "?"
+
+
+class _Limits:
+    """Global and per-host concurrency, plus a DNS cache shared by all checks of one run."""
+
+    def __init__(self, concurrency, per_host):
+        self.total = asyncio.Semaphore(concurrency)
+        self.per_host = per_host
+        self.hosts = {}
+        self.addresses = {}
+        self.ssl_context = ssl.create_default_context()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host):
+        # Host first: links waiting on a busy host do not hold one of the global slots
+        semaphore = self.hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with semaphore:
+            async with self.total:
+                yield
+
+    async def resolve(self, host, port):
+        key = (host, port)
+        if key not in self.addresses:
+            loop = asyncio.get_running_loop()
+            self.addresses[key] = loop.create_task(loop.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        infos = await self.addresses[key]
+        return infos[0][4][0]
+
+
+async def _request(method, url, headers, limits):
+    """One HTTP/1.1 request; returns (status, lowercased response headers). The body is never read."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Unsupported URL {url[:100]!r}")
+    https = parts.scheme == "https"
+    host = parts.hostname.encode("idna").decode("ascii")
+    port = parts.port or (443 if https else 80)
+    address = await limits.resolve(host, port)
+    reader, writer = await asyncio.open_connection(
+        address, port, ssl=limits.ssl_context if https else None, server_hostname=host if https else None
+    )
+    try:
+        target = quote(parts.path or "/", safe=_PATH_SAFE)
+        if parts.query:
+            target += "?" + quote(parts.query, safe=_QUERY_SAFE)
+        lines = [
+            f"{method} {target} HTTP/1.1",
+            f"Host: {host if parts.port is None else f'{host}:{parts.port}'}",
+            f"User-Agent: {USER_AGENT}",
+            "Accept: */*",
+            "Connection: close",
+        ]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1", "replace"))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        try:
+            status = int(status_line.split(None, 2)[1])
+        except (IndexError, ValueError):
+            raise ConnectionError("No HTTP response") from None
+        response_headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        return status, response_headers
+    finally:
+        writer.close()
+
+
+async def _fetch(url, conditional, limits):
+    """
+    HEAD the URL, following redirects; if the server rejects HEAD (any 4xx/5xx), repeat with GET,
+    which only reads the status line and headers. Conditional headers go to the original URL only.
+    Returns (status, headers, error).
+    """
+    for method in ("HEAD", "GET"):
+        current, headers = url, conditional
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers = await _request(method, current, headers, limits)
+            location = response_headers.get("location")
+            if status not in REDIRECT_STATUSES or not location:
+                break
+            current, headers = urljoin(current, location), {}
+        else:
+            return status, response_headers, "Too many redirects"
+        if method == "HEAD" and status >= 400:
+            continue
+        return status, response_headers, ""
+    return status, response_headers, ""
+
+
+async def _check(link, limits, timeout):
+    link_id, url, etag, last_modified, last_ok_at, failures = link
+    conditional = {}
+    if etag:
+        conditional["If-None-Match"] = etag
+    if last_modified:
+        conditional["If-Modified-Since"] = last_modified
+    status, headers, error = None, {}, ""
+    latency_ms = None
+    try:
+        async with limits.slot(_host(url)):
+            start = time.perf_counter()
+            try:
+                status, headers, error = await asyncio.wait_for(_fetch(url, conditional, limits), timeout)
+            finally:
+                latency_ms = round((time.perf_counter() - start) * 1000)
+    except asyncio.TimeoutError:
+        error = f"Timed out after {timeout:g}s"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    now = timezone.now()
+    ok = status is not None and status < 400 and not error
+    if status == 304:
+        # Unchanged since the last check: keep its validators unless new ones were sent
+        etag, last_modified = headers.get("etag", etag), headers.get("last-modified", last_modified)
+    elif status is not None:
+        etag, last_modified = headers.get("etag", ""), headers.get("last-modified", "")
+    return {
+        "link_id": link_id,
+        "ok": ok,
+        "status": status,
+        "error": error[:200],
+        "latency_ms": latency_ms,
+        "checked_at": now,
+        "last_ok_at": now if ok else last_ok_at,
+        "failures": 0 if ok else min((failures or 0) + 1, 32767),
+        "etag": (etag or "")[:200],
+        "last_modified": (last_modified or "")[:64],
+    }
+
+
+def _host(url):
+    try:
+        return urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+
+
+def _interleave_by_host(links):
+    """Round-robin over hosts, so a run never has long stretches of links waiting on one busy host."""
+    by_host = OrderedDict()
+    for link in links:
+        by_host.setdefault(_host(link[1]), deque()).append(link)
+    queues = deque(by_host.values())
+    while queues:
+        queue = queues.popleft()
+        yield queue.popleft()
+        if queue:
+            queues.append(queue)
+
+
+def save_results(results):
+    """Upsert check results (one INSERT ... ON CONFLICT per batch); links deleted meanwhile are skipped."""
+    from .models import PortalLink, PortalLinkHealth
+
+    link_ids = set(PortalLink.objects.filter(pk__in=[r["link_id"] for r in results]).values_list("pk", flat=True))
+    rows = [PortalLinkHealth(**r) for r in results if r["link_id"] in link_ids]
+    PortalLinkHealth.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["link"],
+        update_fields=["ok", "status", "error", "latency_ms", "checked_at", "last_ok_at", "failures", "etag", "last_modified"],
+    )
+    return len(rows)
+
+
+async def _run(links, concurrency, per_host, timeout, deadline, on_saved):
+    limits = _Limits(concurrency, per_host)
+    # Checks in flight or waiting for a host slot; bounds memory for runs over many links
+    window = asyncio.Semaphore(concurrency * 4)
+    loop = asyncio.get_running_loop()
+    results = []
+    stats = {"checked": 0, "ok": 0, "failed": 0}
+    tasks = set()
+    # Database writes run on one thread outside the event loop (Django's ORM is synchronous)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="link-health-db")
+
+    def save_batch(batch):
+        save_results(batch)
+        on_saved(stats)
+
+    async def save(batch):
+        # The copied context carries the current job, so progress reports reach it
+        await loop.run_in_executor(executor, contextvars.copy_context().run, save_batch, batch)
+
+    async def check(link):
+        try:
+            result = await _check(link, limits, timeout)
+        finally:
+            window.release()
+        stats["checked"] += 1
+        stats["ok" if result["ok"] else "failed"] += 1
+        results.append(result)
+
+    try:
+        for link in _interleave_by_host(links):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            await window.acquire()
+            task = loop.create_task(check(link))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            if len(results) >= SAVE_BATCH_SIZE:
+                batch, results[:] = list(results), []
+                await save(batch)
+        if tasks:
+            await asyncio.gather(*tasks)
+        if results:
+            await save(list(results))
+    finally:
+        await loop.run_in_executor(executor, connections.close_all)
+        executor.shutdown(wait=False)
+    return stats
+
+
+def due_links(force=False, customer_id=None):
+    """
+    Links to check, least recently checked first (never checked before all others), as tuples of
+    (id, url, etag, last_modified, last_ok_at, failures). Without force only links whose last check
+    is older than LINK_CHECK_INTERVAL are due.
+    """
+    from .models import PortalLink
+
+    qs = PortalLink.objects.filter(customer__deleting_at__isnull=True)
+    if customer_id:
+        qs = qs.filter(customer_id=customer_id)
+    if not force:
+        cutoff = timezone.now() - timedelta(seconds=getattr(settings, "LINK_CHECK_INTERVAL", 86400))
+        qs = qs.filter(Q(health__isnull=True) | Q(health__checked_at__lt=cutoff))
+    return qs.order_by(F("health__checked_at").asc(nulls_first=True), "pk").values_list(
+        "pk", "url", "health__etag", "health__last_modified", "health__last_ok_at", "health__failures"
+    )
+
+
+def check_links(*, force=False, customer_id=None, limit=0, time_budget=None, concurrency=None,
+                per_host=None, timeout=None, progress=None):
+    """
+    Check due portal links concurrently and store the results in PortalLinkHealth as they come in.
+    At most LINK_CHECK_CONCURRENCY requests run at once and LINK_CHECK_PER_HOST per host; each link
+    gets LINK_CHECK_TIMEOUT seconds for all its requests. With a time budget no new checks start
+    once it is used up (the rest stay due for the next run). Returns counts of checked, ok, failed
+    and remaining links.
+    """
+    concurrency = concurrency or getattr(settings, "LINK_CHECK_CONCURRENCY", 100)
+    per_host = per_host or getattr(settings, "LINK_CHECK_PER_HOST", 4)
+    timeout = timeout or getattr(settings, "LINK_CHECK_TIMEOUT", 10.0)
+    qs = due_links(force, customer_id)
+    links = list(qs[:limit] if limit else qs)
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    def on_saved(stats):
+        if progress is not None:
+            progress(checked=stats["checked"], total=len(links))
+
+    start = time.monotonic()
+    stats = asyncio.run(_run(links, concurrency, per_host, timeout, deadline, on_saved))
+    stats["remaining"] = len(links) - stats["checked"]
+    logger.info(
+        f"Checked {stats['checked']} link(s) in {time.monotonic() - start:.1f}s: "
+        f"{stats['ok']} ok, {stats['failed']} failed, {stats['remaining']} left for the next run"
+    )
+    return stats
+
+
+def schedule():
+    """
+    Queue the link check job when links are due and no check is queued or running. Called by
+    `manage.py worker` on its maintenance tick, so checks run every LINK_CHECK_INTERVAL seconds
+    without a separate scheduler. Returns the queued Job or None.
+    """
+    from . import jobs
+    from .models import Job
+
+    if not getattr(settings, "LINK_CHECK_ENABLED", True):
+        return None
+    if Job.objects.filter(key=CHECK_LINKS_TASK, status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]).exists():
+        return None
+    if not due_links().exists():
+        return None
+    return jobs.enqueue(CHECK_LINKS_TASK, key=CHECK_LINKS_TASK, max_attempts=1)
@@ -0,0 +1,121 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Set-based reordering of a customer's portal links with sparse sort keys
+Path: src/portal/link_order.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import logging
+from bisect import bisect_left
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+logger = logging.getLogger(__name__)
+
+SORT_GAP = 1024  # distance between keys when links are numbered from scratch
+SORT_MAX = 2147483647  # upper bound of PositiveIntegerField on PostgreSQL
+
+
+class LinkSetChanged(ValueError):
+    """The submitted order does not list exactly the customer's current links."""
+
+
+def _increasing_run(keys):
+    """Indices of a longest strictly increasing subsequence of keys (patience sorting, O(n log n))."""
+    tails = []  # tails[k]: smallest key ending an increasing run of length k + 1
+    tail_index = []
+    previous = [-1] * len(keys)
+    for i, key in enumerate(keys):
+        k = bisect_left(tails, key)
+        if k == len(tails):
+            tails.append(key)
+            tail_index.append(i)
+        else:
+            tails[k] = key
+            tail_index[k] = i
+        previous[i] = tail_index[k - 1] if k else -1
+    run = set()
+    i = tail_index[-1] if tail_index else -1
+    while i != -1:
+        run.add(i)
+        i = previous[i]
+    return run
+
+
+def sparse_keys(keys, gap=SORT_GAP):
+    """
+    New sort keys for items given in their new order with their current keys. Items on the longest
+    strictly increasing run of current keys keep them; the others are spread evenly over the gap
+    between their kept neighbours (or placed `gap` apart after the last one). Moving one item
+    therefore changes one key. Only when a gap is too narrow is everything renumbered `gap` apart.
+    """
+    keep = _increasing_run(keys)
+    new = list(keys)
+    lo = -1  # keys are >= 0
+    i = 0
+    while i < len(keys):
+        if i in keep:
+            lo = keys[i]
+            i += 1
+            continue
+        j = i
+        while j < len(keys) and j not in keep:
+            j += 1
+        count = j - i
+        if j < len(keys):
+            hi = keys[j]
+            if hi - lo - 1 < count:
+                return [gap * (n + 1) for n in range(len(keys))]
+            for n in range(count):
+                new[i + n] = lo + (hi - lo) * (n + 1) // (count + 1)
+        else:
+            if lo + gap * count > SORT_MAX:
+                return [gap * (n + 1) for n in range(len(keys))]
+            for n in range(count):
+                new[i + n] = lo + gap * (n + 1)
+        i = j
+    return new
+
+
+def next_sort_order(customer_id):
+    """Key that places a new link after the customer's existing links."""
+    from .models import PortalLink
+
+    last = PortalLink.objects.filter(customer_id=customer_id).order_by("-sort_order").values_list("sort_order", flat=True).first()
+    return SORT_GAP if last is None else min(last + SORT_GAP, SORT_MAX)
+
+
+def reorder_links(customer, link_ids):
+    """
+    Apply a complete new order (list of link ids) for the customer's links. The links are locked,
+    new keys computed with sparse_keys and only the changed rows written, in one UPDATE ... CASE.
+    No per-row save() or signals: a single activity event records the reorder. Returns the number
+    of links whose key changed; raises LinkSetChanged when link_ids is not exactly the current set.
+    """
+    from . import activity
+    from .models import ActivityEvent, PortalLink
+
+    with transaction.atomic():
+        current = dict(
+            PortalLink.objects.select_for_update()
+            .filter(customer=customer)
+            .order_by("pk")
+            .values_list("pk", "sort_order")
+        )
+        if len(link_ids) != len(current) or set(link_ids) != set(current):
+            raise LinkSetChanged("The new order must list every link of the customer exactly once")
+        keys = sparse_keys([current[pk] for pk in link_ids])
+        changed = {pk: key for pk, key in zip(link_ids, keys) if key != current[pk]}
+        if changed:
+            PortalLink.objects.filter(pk__in=changed).update(
+                sort_order=Case(
+                    *[When(pk=pk, then=Value(key)) for pk, key in changed.items()],
+                    default=F("sort_order"),
+                    output_field=PortalLink._meta.get_field("sort_order"),
+                )
+            )
+            activity.record(ActivityEvent.ACTION_REORDER_LINKS, customer, links=len(link_ids), changed=len(changed))
+    logger.debug(f"Reordered {len(link_ids)} link(s) of customer {customer.pk}, {len(changed)} key(s) changed")
+    return len(changed)
@@ -0,0 +1,78 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Inline switcher thumbnails of customer logos and initials placeholders (data URIs)
+Path: src/portal/logo_thumbnails.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import base64
+import io
+import logging
+import zlib
+from functools import lru_cache
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+# Switcher and selection tiles show logos at 36-40 px; 64 px keeps them sharp on 2x screens
+THUMBNAIL_SIZE = 64
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_MAX_BYTES = 8 * 1024  # larger thumbnails are not inlined (the tile falls back to the logo URL)
+
+PLACEHOLDER_COLORS = ("#2563eb", "#7c3aed", "#db2777", "#dc2626", "#ea580c", "#ca8a04", "#16a34a", "#0891b2", "#4f46e5", "#475569")
+
+
+def build_thumbnail(name):
+    """
+    Data URI of a small WebP rendition of a stored logo, or "" if the file cannot be read or the
+    result is too large to inline. JPEGs are decoded at reduced size (draft mode), so even large
+    logos cost a few milliseconds.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    from .storage import logo_storage
+
+    if not name:
+        return ""
+    try:
+        with logo_storage.open(name, "rb") as fh, Image.open(fh) as img:
+            img.draft("RGB", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            img = img.convert("RGBA")
+            img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, "WEBP", quality=THUMBNAIL_QUALITY, method=6)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        logger.warning(f"Could not build logo thumbnail for {name}: {e}")
+        return ""
+    data = out.getvalue()
+    if len(data) > THUMBNAIL_MAX_BYTES:
+        return ""
+    return "data:image/webp;base64," + base64.b64encode(data).decode("ascii")
+
+
+def initials(name):
+    """Up to two initials from the customer name ("Acme Water Works" -> "AW")."""
+    words = [w for w in (name or "").split() if w[:1].isalnum()]
+    if not words:
+        return "?"
+    if len(words) == 1:
+        return words[0][:2].upper()
+    return (words[0][0] + words[1][0]).upper()
+
+
+@lru_cache(maxsize=4096)
+def placeholder(name):
+    """
+    Data URI of an SVG tile with the customer's initials on a colour derived from the name.
+    Deterministic, so it is computed once per name and process.
+    """
+    color = PLACEHOLDER_COLORS[zlib.crc32((name or "").encode()) % len(PLACEHOLDER_COLORS)]
+    text = initials(name).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    svg = (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 40 40">'
+        f'<rect width="40" height="40" rx="6" fill="{color}"/>'
+        '<text x="20" y="25.5" text-anchor="middle" font-family="system-ui,sans-serif" '
+        f'font-size="15" font-weight="600" fill="#fff">{text}</text></svg>'
+    )
+    return "data:image/svg+xml," + quote(svg, safe=" =:/\"',.-")
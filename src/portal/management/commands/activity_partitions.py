@@ -0,0 +1,63 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Create upcoming and drop expired monthly activity log partitions
+Path: src/portal/management/commands/activity_partitions.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from portal.activity import MONTHS_AHEAD, ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the monthly partitions of the activity log (PostgreSQL): create partitions for the "
+        "coming months and drop those past the retention period. `manage.py worker` queues the same "
+        "maintenance once a day; run this by hand or from cron where no worker runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=MONTHS_AHEAD,
+            help=f"Months ahead to create partitions for (default: {MONTHS_AHEAD}).",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=None,
+            help="Drop partitions older than this many months (default: ACTIVITY_LOG_RETENTION_MONTHS, 0 = keep all).",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write("Activity log is not partitioned on this database; nothing to do.")
+            return
+        retention = options["retention_months"]
+        if retention is None:
+            retention = getattr(settings, "ACTIVITY_LOG_RETENTION_MONTHS", 0)
+        try:
+            created, dropped, failed = ensure_partitions(
+                connection, months_ahead=options["ahead"], retention_months=retention
+            )
+        except Exception as e:
+            logger.exception("Activity partition maintenance failed")
+            raise CommandError(f"Activity partition maintenance failed: {e}") from e
+        for name in created:
+            self.stdout.write(f"  created {name}")
+        for name in dropped:
+            self.stdout.write(f"  dropped {name}")
+        summary = f"Activity partitions: {len(created)} created, {len(dropped)} dropped, {len(failed)} failed."
+        if failed:
+            # Non-zero exit so cron/systemd report it; the reasons are in the log
+            raise CommandError(f"{summary} Failed: {', '.join(failed)} (see log)")
+        self.stdout.write(summary)
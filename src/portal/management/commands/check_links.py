@@ -0,0 +1,45 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Check portal link URLs and store their health (status, latency, last OK)
+Path: src/portal/management/commands/check_links.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+from django.core.management.base import BaseCommand
+
+from portal import link_health
+
+
+class Command(BaseCommand):
+    help = (
+        "Check portal link URLs concurrently (HEAD, GET fallback, conditional requests) and store "
+        "status, latency and last OK time. By default only links not checked within LINK_CHECK_INTERVAL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Check every link, not only those due.")
+        parser.add_argument("--customer", type=int, default=None, help="Only links of this customer id.")
+        parser.add_argument("--limit", type=int, default=0, help="Check at most this many links (0 = no limit).")
+        parser.add_argument("--concurrency", type=int, default=None, help="Requests in flight (default: LINK_CHECK_CONCURRENCY).")
+        parser.add_argument("--per-host", type=int, default=None, help="Requests in flight per host (default: LINK_CHECK_PER_HOST).")
+        parser.add_argument("--timeout", type=float, default=None, help="Seconds per link (default: LINK_CHECK_TIMEOUT).")
+
+    def handle(self, *args, **options):
+        def progress(checked, total):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {checked}/{total}")
+
+        stats = link_health.check_links(
+            force=options["all"],
+            customer_id=options["customer"],
+            limit=options["limit"],
+            concurrency=options["concurrency"],
+            per_host=options["per_host"],
+            timeout=options["timeout"],
+            progress=progress,
+        )
+        self.stdout.write(
+            f"Checked {stats['checked']} link(s): {stats['ok']} ok, {stats['failed']} failed"
+            + (f", {stats['remaining']} not reached" if stats["remaining"] else "")
+        )
@@ -0,0 +1,157 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Incremental garbage collection of unreferenced customer logo files
+Path: src/portal/management/commands/gc_logos.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portal.models import Customer
+from portal.storage import logo_storage
+
+LOGO_DIR = "customer_logos"
+CURSOR_FILE = ".gc_logos_cursor"
+INCOMING_DIR = ".incoming"  # streamed uploads waiting for admin_app.process_logo (admin_app.uploads)
+INCOMING_MAX_AGE = 24 * 3600  # seconds; older temp files belong to uploads whose job is long gone
+
+
+def iter_stored_names(root, start_after=""):
+    """
+    Yield storage names under root/customer_logos in path order (compared component by component),
+    skipping everything up to and including start_after. Directories entirely before the cursor are
+    not listed at all.
+    """
+    cursor = tuple(start_after.split("/")) if start_after else ()
+
+    def walk(directory, parts):
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            return
+        for entry in entries:
+            key = parts + (entry.name,)
+            if entry.is_dir(follow_symlinks=False):
+                # Skip subtrees that sort wholly before the cursor
+                if cursor and key < cursor[:len(key)]:
+                    continue
+                yield from walk(entry.path, key)
+            elif key > cursor:
+                yield "/".join(key)
+
+    yield from walk(Path(root) / LOGO_DIR, (LOGO_DIR,))
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove customer logo files that no customer references. Scans storage in batches against "
+        "the database; use --limit to process a slice per run and resume where the last run stopped. "
+        "`manage.py worker` queues a limited run once a day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Files checked per database query.")
+        parser.add_argument("--limit", type=int, default=0, help="Stop after this many files (0 = full scan). Progress is saved for the next run.")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Report orphans without deleting.")
+
+    def handle(self, *args, **options):
+        media_root = Path(settings.MEDIA_ROOT)
+        cursor_path = media_root / LOGO_DIR / CURSOR_FILE
+        start_after = ""
+        if options["limit"]:
+            try:
+                start_after = cursor_path.read_text(encoding="utf-8").strip()
+            except OSError:
+                start_after = ""
+
+        scanned = deleted = kept_recent = 0
+        last_name = ""
+        batch = []
+        for name in iter_stored_names(media_root, start_after):
+            if name.endswith(CURSOR_FILE):
+                continue
+            batch.append(name)
+            if len(batch) >= options["batch_size"]:
+                d, k = self._collect(batch, options["dry_run"])
+                deleted, kept_recent, scanned = deleted + d, kept_recent + k, scanned + len(batch)
+                last_name = batch[-1]
+                batch = []
+                if options["limit"] and scanned >= options["limit"]:
+                    break
+                if options["sleep"]:
+                    time.sleep(options["sleep"])
+        else:
+            if batch:
+                d, k = self._collect(batch, options["dry_run"])
+                deleted, kept_recent, scanned = deleted + d, kept_recent + k, scanned + len(batch)
+            # Full pass finished: next incremental run starts from the beginning
+            last_name = ""
+
+        if options["limit"] and not options["dry_run"]:
+            try:
+                cursor_path.parent.mkdir(parents=True, exist_ok=True)
+                cursor_path.write_text(last_name, encoding="utf-8")
+            except OSError as e:
+                self.stderr.write(f"Could not save progress to {cursor_path}: {e}")
+
+        stale = self._collect_incoming(media_root / INCOMING_DIR, options["dry_run"])
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            f"Scanned {scanned} file(s). {verb} {deleted} orphan(s); kept {kept_recent} recently touched. "
+            f"{verb} {stale} stale upload temp file(s)."
+        )
+
+    def _collect_incoming(self, directory, dry_run):
+        """Delete upload temp files older than INCOMING_MAX_AGE (left by failed or lost logo jobs)."""
+        cutoff = time.time() - INCOMING_MAX_AGE
+        deleted = 0
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return 0
+        for entry in entries:
+            try:
+                if not entry.is_file(follow_symlinks=False) or entry.stat().st_mtime >= cutoff:
+                    continue
+                if not dry_run:
+                    os.unlink(entry.path)
+                deleted += 1
+            except OSError as e:
+                self.stderr.write(f"Failed to delete {entry.path}: {e}")
+        return deleted
+
+    def _collect(self, names, dry_run):
+        """Delete unreferenced files in one batch. Returns (deleted, kept_recent)."""
+        referenced = set(Customer.all_objects.filter(logo__in=names).values_list("logo", flat=True))
+        orphans = [n for n in names if n not in referenced]
+        if not orphans:
+            return 0, 0
+
+        now = time.time()
+        recent = [n for n in orphans if logo_storage.is_recent(n, now)]
+        candidates = [n for n in orphans if n not in recent]
+        # Re-check right before deleting so a reference created during the scan is respected
+        still_referenced = set(Customer.all_objects.filter(logo__in=candidates).values_list("logo", flat=True))
+
+        deleted = 0
+        for name in candidates:
+            if name in still_referenced:
+                continue
+            if dry_run:
+                self.stdout.write(f"  orphan: {name}")
+                deleted += 1
+                continue
+            try:
+                logo_storage.delete(name)
+                deleted += 1
+            except OSError as e:
+                self.stderr.write(f"Failed to delete {name}: {e}")
+        return deleted, len(recent)
@@ -0,0 +1,40 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Build the inline switcher thumbnails of customer logos
+Path: src/portal/management/commands/logo_thumbnails.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+from django.core.management.base import BaseCommand
+
+from portal.logo_thumbnails import build_thumbnail
+from portal.models import Customer
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the inline switcher thumbnails of customer logos. Thumbnails are rebuilt automatically "
+        "when a logo changes; this fills in customers that have a logo but no thumbnail yet (e.g. "
+        "after upgrading). Customers sharing a logo file reuse one rendition."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rebuild every thumbnail, not only missing ones.")
+
+    def handle(self, *args, **options):
+        qs = Customer.all_objects.exclude(logo="").exclude(logo__isnull=True)
+        if not options["all"]:
+            qs = qs.filter(logo_thumbnail="")
+        built = {}
+        updated = failed = 0
+        for pk, name in qs.order_by("pk").values_list("pk", "logo").iterator():
+            if name not in built:
+                built[name] = build_thumbnail(name)
+            thumbnail = built[name]
+            if not thumbnail:
+                failed += 1
+                continue
+            Customer.all_objects.filter(pk=pk).update(logo_thumbnail=thumbnail)
+            updated += 1
+        self.stdout.write(f"Built {updated} thumbnail(s); {failed} logo(s) could not be inlined.")
@@ -0,0 +1,82 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Background job worker (claims and runs jobs from the database queue)
+Path: src/portal/management/commands/worker.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from portal import activity, jobs, link_health, storage
+
+logger = logging.getLogger(__name__)
+
+# Housekeeping (stale job release, pruning, queueing due link checks and daily maintenance jobs)
+# runs at most this often
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the background job worker: claim queued jobs (FOR UPDATE SKIP LOCKED), run them and "
+        "record the outcome. Several workers can run side by side. Stops after the current job on SIGTERM/SIGINT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run all due jobs, then exit.")
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=None,
+            help="Seconds to wait when the queue is empty (default: JOB_POLL_INTERVAL).",
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options["poll_interval"] or getattr(settings, "JOB_POLL_INTERVAL", 1.0)
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write(f"Worker {name}: stopping after the current job")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(f"Worker {name} started (poll interval {poll_interval}s)")
+        next_maintenance = 0.0
+        processed = 0
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                if time.monotonic() >= next_maintenance:
+                    jobs.requeue_stale()
+                    jobs.prune()
+                    link_health.schedule()
+                    activity.schedule_partitions()
+                    storage.schedule_logo_gc()
+                    next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+                job = jobs.claim(name)
+            except DatabaseError as e:
+                # Database restarting or unreachable: back off instead of exiting
+                logger.warning(f"Worker {name}: cannot reach the job queue: {e}")
+                stop.wait(max(poll_interval, 5))
+                continue
+            if job is None:
+                if options["once"]:
+                    break
+                stop.wait(poll_interval)
+                continue
+            jobs.run(job)
+            processed += 1
+        self.stdout.write(f"Worker {name} stopped ({processed} job(s) processed)")
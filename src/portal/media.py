@@ -0,0 +1,115 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Media delivery (access control in Django, byte transfer offloaded)
+Path: src/portal/media.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+from .models import Customer, CustomerMembership
+
+# Logos are addressed by content hash, so a URL never changes meaning and can be cached for a year.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# Plain /media/ paths are not fingerprinted, keep browser caching short.
+MEDIA_CACHE_CONTROL = "private, max-age=300"
+
+DIGEST_LENGTH = 16
+
+
+def file_digest(name):
+    """
+    Return a short SHA-256 content digest for a file in MEDIA_ROOT, or None if it is missing.
+    Stored names are unique per upload, so the digest is cached per name.
+    """
+    if not name:
+        return None
+    cache_key = f"media_digest_{name}"
+    digest = cache.get(cache_key)
+    if digest is not None:
+        return digest
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+        hasher = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(64 * 1024), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()[:DIGEST_LENGTH]
+    except (OSError, SuspiciousFileOperation):
+        return None
+    cache.set(cache_key, digest, None)
+    return digest
+
+
+def send_media_file(name, cache_control):
+    """
+    Build a response for a file in MEDIA_ROOT without streaming it through Python when possible.
+
+    With MEDIA_ACCEL_REDIRECT set (e.g. "/protected-media/"), nginx is told via X-Accel-Redirect to
+    send the file from its internal location. Otherwise FileResponse hands the open file to the WSGI
+    server's file_wrapper, which gunicorn serves with sendfile().
+    """
+    try:
+        path = Path(safe_join(settings.MEDIA_ROOT, name))
+    except SuspiciousFileOperation:
+        raise Http404("Invalid media path")
+    if not path.is_file():
+        raise Http404("Media file not found")
+
+    content_type, _encoding = mimetypes.guess_type(str(path))
+    accel_prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT", "")
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type or "application/octet-stream")
+        response["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + quote(name.lstrip("/"))
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    response["Cache-Control"] = cache_control
+    return response
+
+
+def user_can_view_customer(user, customer_id):
+    """Staff and superusers see every customer; others need a membership."""
+    if user.is_superuser or user.is_staff:
+        return True
+    return CustomerMembership.objects.filter(user=user, customer_id=customer_id).exists()
+
+
+@require_safe
+@login_required
+def customer_logo(request, customer_id, digest):
+    """Serve a customer logo under its content-hashed URL."""
+    customer = get_object_or_404(Customer.objects.only("id", "logo"), pk=customer_id)
+    if not user_can_view_customer(request.user, customer.id):
+        raise Http404("Customer not found")
+    if not customer.logo or not customer.logo.name:
+        raise Http404("Customer has no logo")
+
+    current = file_digest(customer.logo.name)
+    if current is None:
+        raise Http404("Logo file not found")
+    if current != digest:
+        # Old URL (logo was replaced): point the browser at the current version.
+        return redirect("customer_logo", customer_id=customer.id, digest=current)
+
+    return send_media_file(customer.logo.name, IMMUTABLE_CACHE_CONTROL)
+
+
+@require_safe
+@login_required
+def media_serve(request, path):
+    """Fallback for plain /media/ URLs when nginx does not serve them (replaces django.views.static.serve)."""
+    return send_media_file(os.path.normpath(path).lstrip("/"), MEDIA_CACHE_CONTROL)
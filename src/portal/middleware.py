@@ -1,14 +1,24 @@
 """
 Copyright (c) 2026 5echo.io
 Project: PMG Portal
-Purpose: Custom middleware for language preference
+Purpose: Custom middleware (language preference, context processor timing, activity log context, query profiler)
 Path: src/portal/middleware.py
 Created: 2026-02-05
 Last Modified: 2026-02-05
 """
+import logging
+import time
+from contextlib import ExitStack
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.utils import translation
 from django.conf import settings
 
+from . import activity, query_profiler
+
+logger = logging.getLogger(__name__)
+
 
 class LanguagePreferenceMiddleware:
     """Middleware to handle user language preference."""
@@ -27,3 +37,84 @@ class LanguagePreferenceMiddleware:
         
         response = self.get_response(request)
         return response
+
+
+class ContextProcessorTimingMiddleware:
+    """
+    Report how much of each request the portal context processors took.
+
+    The lazy processors in portal.context_processors add their evaluation time to
+    request.context_processor_timings. This middleware logs the breakdown (DEBUG level on the
+    "portal" logger) and, for superusers or in DEBUG, adds a Server-Timing header so the numbers show
+    up in the browser's network panel.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.context_processor_timings = {}
+        start = time.perf_counter()
+        response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        timings = request.context_processor_timings
+        if timings:
+            cp_ms = sum(timings.values())
+            if logger.isEnabledFor(logging.DEBUG):
+                parts = ", ".join(f"{name}={ms:.2f}ms" for name, ms in timings.items())
+                logger.debug(
+                    f"Context processors on {request.path}: {parts} "
+                    f"({cp_ms:.2f}ms of {total_ms:.2f}ms, {cp_ms / total_ms * 100 if total_ms else 0:.1f}%)"
+                )
+            user = getattr(request, "user", None)
+            if settings.DEBUG or (user is not None and user.is_authenticated and user.is_superuser):
+                entries = [f"cp-{name};dur={ms:.2f}" for name, ms in timings.items()]
+                entries.append(f"total;dur={total_ms:.2f}")
+                existing = response.get("Server-Timing")
+                response["Server-Timing"] = ", ".join(([existing] if existing else []) + entries)
+        return response
+
+
+class ActivityContextMiddleware:
+    """
+    Make the current request available to portal.activity.record(), so events captured by model
+    signals know the acting user, client IP and path. Must be placed after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = activity.set_current_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            activity.reset_current_request(token)
+
+
+class QueryProfilerMiddleware:
+    """
+    Time every SQL statement of the request (execute_wrapper on each configured database) and hand
+    them to portal.query_profiler, which aggregates them per fingerprint and resolved view.
+    Disabled with QUERY_PROFILER_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_PROFILER_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = query_profiler.QueryRecorder()
+        try:
+            with ExitStack() as stack:
+                for alias in settings.DATABASES:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                return self.get_response(request)
+        finally:
+            match = getattr(request, "resolver_match", None)
+            try:
+                query_profiler.record(recorder.queries, (match.view_name if match else "") or "-")
+            except Exception:
+                logger.exception("Query profiler: recording failed")
@@ -0,0 +1,19 @@
+# Generated migration: content-addressed storage for Customer.logo
+
+from django.db import migrations, models
+import portal.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0003_customer_logo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='logo',
+            field=models.ImageField(blank=True, help_text='Customer logo displayed on dashboard', null=True, storage=portal.storage.ContentAddressedStorage(), upload_to='customer_logos/'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Index for the customer picker's case-insensitive prefix search (name__istartswith).
+# Django emits UPPER("name"::text) LIKE UPPER('q%'); on PostgreSQL that only uses an index built
+# with text_pattern_ops on the same expression. Other databases skip it.
+
+from django.db import migrations
+
+INDEX_NAME = "portal_customer_name_upper_prefix"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON portal_customer (UPPER("name"::text) text_pattern_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0004_customer_logo_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
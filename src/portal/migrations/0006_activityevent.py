@@ -0,0 +1,90 @@
+# Activity/audit log table.
+# On PostgreSQL the table is created by hand as a monthly range-partitioned table (Django cannot
+# express PARTITION BY); the model state is declared separately. Other databases get a plain table.
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+TABLE = "portal_activityevent"
+
+
+def create_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(apps.get_model("portal", "ActivityEvent"))
+        return
+    user_pk = apps.get_model(settings.AUTH_USER_MODEL)._meta.pk
+    actor_type = user_pk.rel_db_type(schema_editor.connection)
+    schema_editor.execute(f"""
+        CREATE TABLE {TABLE} (
+            id bigint GENERATED BY DEFAULT AS IDENTITY,
+            created_at timestamp with time zone NOT NULL,
+            actor_id {actor_type} NULL,
+            actor_repr varchar(150) NOT NULL,
+            action varchar(32) NOT NULL,
+            object_type varchar(64) NOT NULL,
+            object_id varchar(64) NOT NULL,
+            object_repr varchar(200) NOT NULL,
+            customer_id bigint NULL,
+            ip_address inet NULL,
+            path varchar(300) NOT NULL,
+            extra jsonb NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    # Catch-all so inserts never fail if the partition job has not run; normally stays empty
+    schema_editor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+    schema_editor.execute(f"CREATE INDEX portal_activity_actor_idx ON {TABLE} (actor_id, created_at)")
+    schema_editor.execute(f"CREATE INDEX portal_activity_customer_idx ON {TABLE} (customer_id, created_at)")
+
+    from portal.activity import ensure_partitions
+    ensure_partitions(schema_editor.connection)
+
+
+def drop_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.delete_model(apps.get_model("portal", "ActivityEvent"))
+        return
+    # Dropping the parent drops every partition
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0005_customer_name_prefix_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ActivityEvent',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('actor_repr', models.CharField(blank=True, default='', max_length=150)),
+                        ('action', models.CharField(max_length=32)),
+                        ('object_type', models.CharField(blank=True, default='', max_length=64)),
+                        ('object_id', models.CharField(blank=True, default='', max_length=64)),
+                        ('object_repr', models.CharField(blank=True, default='', max_length=200)),
+                        ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                        ('path', models.CharField(blank=True, default='', max_length=300)),
+                        ('extra', models.JSONField(blank=True, default=dict)),
+                        ('actor', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                        ('customer', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='portal.customer')),
+                    ],
+                    options={
+                        'ordering': ['-created_at'],
+                        'indexes': [
+                            models.Index(fields=['actor', 'created_at'], name='portal_activity_actor_idx'),
+                            models.Index(fields=['customer', 'created_at'], name='portal_activity_customer_idx'),
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_table, drop_table),
+    ]
@@ -0,0 +1,18 @@
+# Soft-delete marker for customers: hidden at once, purged in batches by portal.deletion
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='deleting_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
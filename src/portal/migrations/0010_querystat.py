@@ -0,0 +1,36 @@
+# Query profiler (portal.query_profiler): per fingerprint and view aggregates, merged by all workers
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0009_customer_deleting_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=16)),
+                ('view', models.CharField(max_length=200)),
+                ('sql', models.TextField()),
+                ('calls', models.BigIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('buckets', models.JSONField(default=list)),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('plan', models.TextField(blank=True, default='')),
+                ('plan_ms', models.FloatField(blank=True, null=True)),
+                ('plan_captured_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-total_ms'],
+                'constraints': [models.UniqueConstraint(fields=('fingerprint', 'view'), name='portal_querystat_fp_view_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Portal link health checker (portal.link_health): last check result per link
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0010_querystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortalLinkHealth',
+            fields=[
+                ('link', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='health', serialize=False, to='portal.portallink')),
+                ('ok', models.BooleanField(default=False)),
+                ('status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, default='', max_length=200)),
+                ('latency_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('checked_at', models.DateTimeField(db_index=True)),
+                ('last_ok_at', models.DateTimeField(blank=True, null=True)),
+                ('failures', models.PositiveSmallIntegerField(default=0)),
+                ('etag', models.CharField(blank=True, default='', max_length=200)),
+                ('last_modified', models.CharField(blank=True, default='', max_length=64)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Inline switcher thumbnail of the customer logo (portal.logo_thumbnails); fill with manage.py logo_thumbnails
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0011_portallinkhealth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='logo_thumbnail',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
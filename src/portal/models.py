@@ -3,6 +3,16 @@ Customer portal foundation models.
 """
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from .storage import logo_storage, release_logo
+
+
+class CustomerManager(models.Manager):
+    """Default manager: customers that are being deleted (deleting_at set) are hidden from every query."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleting_at__isnull=True)
 
 
 class Customer(models.Model):
@@ -10,7 +20,13 @@ class Customer(models.Model):
     slug = models.SlugField(max_length=80, unique=True)
     org_number = models.CharField(max_length=32, blank=True, default="")
     contact_info = models.TextField(blank=True, default="")
-    logo = models.ImageField(upload_to="customer_logos/", blank=True, null=True, help_text="Customer logo displayed on dashboard")
+    logo = models.ImageField(
+        upload_to="customer_logos/",
+        storage=logo_storage,
+        blank=True,
+        null=True,
+        help_text="Customer logo displayed on dashboard",
+    )
     primary_contact = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -18,61 +34,74 @@ class Customer(models.Model):
         blank=True,
         related_name="primary_contact_for_customers",
     )
+    # Set when deletion starts; the row and its dependents are then purged in batches (portal.deletion)
+    deleting_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Inline WebP data URI of the logo for the customer switcher, rebuilt whenever the logo changes
+    logo_thumbnail = models.TextField(blank=True, default="", editable=False)
+
+    objects = CustomerManager()
+    all_objects = models.Manager()  # Includes customers being deleted
 
     def __str__(self) -> str:
         return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Logo stored when loaded (absent if deferred), so save() rebuilds the thumbnail only on change
+        if "logo" in instance.__dict__:
+            logo = instance.__dict__["logo"]
+            instance._loaded_logo_name = getattr(logo, "name", logo) or ""
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if "logo" not in self.__dict__ or (update_fields is not None and "logo" not in update_fields):
+            return
+        name = self.logo.name if self.logo else ""
+        if name == getattr(self, "_loaded_logo_name", None) or not (name or self.logo_thumbnail):
+            self._loaded_logo_name = name
+            return
+        from .logo_thumbnails import build_thumbnail
+        self.logo_thumbnail = build_thumbnail(name)
+        self._loaded_logo_name = name
+        Customer.all_objects.filter(pk=self.pk).update(logo_thumbnail=self.logo_thumbnail)
+
+    def switcher_logo(self):
+        """
+        Image source for the switcher and selection tiles without an extra request: the inline
+        thumbnail, else the initials placeholder. Falls back to the logo URL only when a logo has
+        no thumbnail yet (see manage.py logo_thumbnails).
+        """
+        from .logo_thumbnails import placeholder
+        if self.logo_thumbnail:
+            return self.logo_thumbnail
+        if self.logo and self.logo.name:
+            return self.logo_url() or placeholder(self.name)
+        return placeholder(self.name)
     
     def logo_url(self):
-        """Return logo URL if logo exists. Always returns URL if logo.name exists, even if file check fails."""
+        """
+        Return the content-hashed logo URL, or None if there is no logo file.
+        The URL changes whenever the file content changes, so it is served with immutable caching.
+        """
         if not self.logo or not self.logo.name:
             return None
-        try:
-            # Try to get URL from Django's storage system
-            url = self.logo.url
-            # Verify file exists if possible
-            try:
-                if hasattr(self.logo, 'storage') and hasattr(self.logo.storage, 'exists'):
-                    if self.logo.storage.exists(self.logo.name):
-                        return url
-                # Fallback: check path directly
-                if hasattr(self.logo, 'path'):
-                    import os
-                    if os.path.exists(self.logo.path):
-                        return url
-            except Exception:
-                # If file check fails, still return URL (file might exist but check failed)
-                pass
-            # Return URL even if file existence check failed
-            return url
-        except Exception:
-            # If URL generation fails, try manual construction
-            try:
-                from django.conf import settings
-                return settings.MEDIA_URL + self.logo.name
-            except Exception:
-                return None
+        from django.urls import reverse
+        from .media import file_digest
+        digest = file_digest(self.logo.name)
+        if digest is None:
+            return None
+        return reverse("customer_logo", kwargs={"customer_id": self.pk, "digest": digest})
     
     def delete(self, *args, **kwargs):
-        """Override delete to remove logo file and all related files when customer is deleted."""
-        # Store logo path before deletion
-        logo_path = None
-        if self.logo:
-            try:
-                logo_path = self.logo.path
-            except Exception:
-                pass
-        
-        # Delete the customer (this will cascade delete CustomerMembership and PortalLink)
-        super().delete(*args, **kwargs)
-        
-        # Delete logo file after model deletion
-        if logo_path:
-            try:
-                import os
-                if os.path.exists(logo_path):
-                    os.remove(logo_path)
-            except Exception:
-                pass  # Silently fail if file deletion fails
+        """Delete the customer and release its logo (the file is removed if no other customer shares it)."""
+        logo_name = self.logo.name if self.logo else None
+        # Cascades to CustomerMembership and PortalLink
+        result = super().delete(*args, **kwargs)
+        release_logo(logo_name)
+        return result
 
 
 class CustomerMembership(models.Model):
@@ -103,12 +132,16 @@ class PortalLink(models.Model):
     """
     Simple links shown inside a customer's portal.
     Later you can extend this to sections/widgets/FDV status blocks, etc.
+    Models referencing a link must also be purged in portal.deletion.purge_customer (bulk deletes
+    do not cascade).
     """
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="links", db_index=True)
     title = models.CharField(max_length=200)
     url = models.URLField()
     description = models.CharField(max_length=300, blank=True, default="")
     sort_order = models.PositiveIntegerField(default=100, db_index=True)
+    # Aggregated clicks via the tracked redirect; written in bulk by portal.link_clicks, never per click
+    click_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["sort_order", "title"]
@@ -118,3 +151,202 @@ class PortalLink(models.Model):
 
     def __str__(self) -> str:
         return f"{self.customer}: {self.title}"
+
+
+
+class PortalLinkUsage(models.Model):
+    """Per-user click count for a portal link (drives the "Most used" ordering)."""
+    link = models.ForeignKey(PortalLink, on_delete=models.CASCADE, related_name="usage")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    clicks = models.PositiveIntegerField(default=0)
+    last_clicked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["link", "user"], name="portal_linkusage_link_user_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} -> {self.link} ({self.clicks})"
+
+
+class PortalLinkHealth(models.Model):
+    """
+    Outcome of the last check of a portal link by portal.link_health (one row per link). ETag and
+    Last-Modified are kept so the next check can be a conditional request.
+    """
+    link = models.OneToOneField(PortalLink, on_delete=models.CASCADE, primary_key=True, related_name="health")
+    ok = models.BooleanField(default=False)
+    status = models.PositiveSmallIntegerField(null=True, blank=True)  # final HTTP status; null when no response
+    error = models.CharField(max_length=200, blank=True, default="")
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    checked_at = models.DateTimeField(db_index=True)
+    last_ok_at = models.DateTimeField(null=True, blank=True)
+    failures = models.PositiveSmallIntegerField(default=0)  # consecutive failed checks
+    etag = models.CharField(max_length=200, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+
+    def __str__(self) -> str:
+        return f"{self.link_id}: {self.status or self.error or '-'}"
+
+class ActivityEvent(models.Model):
+    """
+    Append-only audit/activity record (who changed what, logins, customer switches, logo uploads, link reorders).
+    Rows are queued by portal.activity and written in batches off the request path.
+
+    On PostgreSQL the table is range-partitioned by month on created_at (primary key is
+    (id, created_at)); a daily worker job (or manage.py activity_partitions) creates upcoming partitions
+    and drops expired ones.
+    Actor and customer are kept without FK constraints so history survives deletes.
+    """
+    ACTION_CREATE = "create"
+    ACTION_UPDATE = "update"
+    ACTION_DELETE = "delete"
+    ACTION_LOGIN = "login"
+    ACTION_SWITCH_CUSTOMER = "switch_customer"
+    ACTION_LOGO_UPLOAD = "logo_upload"
+    ACTION_REORDER_LINKS = "reorder_links"
+
+    created_at = models.DateTimeField(default=timezone.now)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    actor_repr = models.CharField(max_length=150, blank=True, default="")
+    action = models.CharField(max_length=32)
+    object_type = models.CharField(max_length=64, blank=True, default="")
+    object_id = models.CharField(max_length=64, blank=True, default="")
+    object_repr = models.CharField(max_length=200, blank=True, default="")
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    path = models.CharField(max_length=300, blank=True, default="")
+    extra = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["actor", "created_at"], name="portal_activity_actor_idx"),  # Per-user timeline
+            models.Index(fields=["customer", "created_at"], name="portal_activity_customer_idx"),  # Per-customer timeline
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} {self.actor_repr or '-'} {self.action} {self.object_type} {self.object_repr}"
+
+
+class Job(models.Model):
+    """
+    Background job stored in the database (portal.jobs). Workers (manage.py worker) claim queued
+    jobs with SELECT ... FOR UPDATE SKIP LOCKED, highest priority first, then oldest run_at.
+    A failed job is retried with exponential backoff until max_attempts is reached.
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    PRIORITY_LOW = -10
+    PRIORITY_NORMAL = 0
+    PRIORITY_HIGH = 10
+
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Jobs with the same key are not queued twice while one is queued or running
+    key = models.CharField(max_length=200, blank=True, default="")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    priority = models.SmallIntegerField(default=PRIORITY_NORMAL)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    created_at = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True, default="")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # The claim query: only queued rows are indexed, so the index stays small
+            models.Index(
+                fields=["-priority", "run_at"],
+                name="portal_job_claim_idx",
+                condition=models.Q(status="queued"),
+            ),
+            models.Index(fields=["status", "finished_at"], name="portal_job_status_idx"),  # Stale/prune sweeps
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                name="portal_job_active_key_uniq",
+                condition=models.Q(status__in=["queued", "running"]) & ~models.Q(key=""),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.task} ({self.status})"
+
+
+class QueryStat(models.Model):
+    """
+    Aggregated timings of one SQL query shape (portal.query_profiler fingerprint) per view, summed
+    over all workers. Latencies are kept as a fixed histogram (query_profiler.BUCKET_BOUNDS_MS) so
+    p95 can be read after merging; plan is the last sampled EXPLAIN (ANALYZE, BUFFERS) of a slow call.
+    """
+    fingerprint = models.CharField(max_length=16)
+    view = models.CharField(max_length=200)
+    sql = models.TextField()
+    calls = models.BigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    buckets = models.JSONField(default=list)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+    plan = models.TextField(blank=True, default="")
+    plan_ms = models.FloatField(null=True, blank=True)
+    plan_captured_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-total_ms"]
+        constraints = [
+            models.UniqueConstraint(fields=["fingerprint", "view"], name="portal_querystat_fp_view_uniq"),
+        ]
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.calls if self.calls else None
+
+    @property
+    def p95_ms(self):
+        from .query_profiler import percentile
+        return percentile(self.buckets or [], self.calls, self.max_ms)
+
+    def __str__(self) -> str:
+        return f"{self.fingerprint} {self.view} ({self.calls} calls)"
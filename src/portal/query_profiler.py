@@ -0,0 +1,222 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Production query profiler (SQL fingerprints, per-view aggregates, sampled EXPLAIN plans)
+Path: src/portal/query_profiler.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .flusher import BackgroundFlusher
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram kept per fingerprint; the last bucket is everything slower.
+# Fixed buckets can be summed across workers, so p95 stays exact to the bucket after merging.
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+SQL_MAX = 2000  # characters of normalized SQL kept per fingerprint
+EXPLAIN_QUEUE_MAX = 20  # slow queries waiting for EXPLAIN per worker; more are dropped
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\$\d+|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+# (fingerprint, view) -> [calls, total_ms, max_ms, buckets, normalized sql]
+_pending = {}
+_explain_queue = []
+_explained_at = {}  # fingerprint -> monotonic time of the last queued EXPLAIN (this worker)
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4096)
+def normalize(sql):
+    """
+    Query shape without values: literals and placeholders become ?, IN lists and multi-row VALUES
+    collapse to (...), comments and whitespace runs are dropped. ORM SQL is already parameterized,
+    so the same statement text repeats and the cache makes this a dict lookup.
+    """
+    sql = _COMMENT.sub(" ", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    sql = _ROWS.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Short stable id of the query shape (see normalize)."""
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def percentile(buckets, calls, max_ms, fraction=0.95):
+    """Upper bound of the histogram bucket holding the given fraction of calls (capped at the maximum seen)."""
+    if not calls:
+        return None
+    target = calls * fraction
+    seen = 0
+    for bound, count in zip(BUCKET_BOUNDS_MS + (None,), buckets):
+        seen += count
+        if seen >= target:
+            return min(bound, max_ms) if bound is not None else max_ms
+    return max_ms
+
+
+class QueryRecorder:
+    """
+    execute_wrapper for one request: times every statement and keeps (alias, sql, ms) for
+    record() at the end of the request. Parameters are only kept for statements slow enough to be
+    EXPLAIN candidates.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.slow_ms = getattr(settings, "QUERY_PROFILER_SLOW_MS", 200)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            slow = ms >= self.slow_ms and not many
+            self.queries.append((context["connection"].alias, sql, params if slow else None, ms))
+
+
+def record(queries, view):
+    """Add one request's queries to this worker's aggregates and queue sampled EXPLAINs."""
+    if not queries:
+        return
+    slow_ms = getattr(settings, "QUERY_PROFILER_SLOW_MS", 200)
+    sample_rate = getattr(settings, "QUERY_PROFILER_EXPLAIN_SAMPLE_RATE", 0.1)
+    interval = getattr(settings, "QUERY_PROFILER_EXPLAIN_INTERVAL", 300)
+    now = time.monotonic()
+    with _lock:
+        for alias, sql, params, ms in queries:
+            fp = fingerprint(sql)
+            entry = _pending.get((fp, view))
+            if entry is None:
+                entry = _pending[(fp, view)] = [0, 0.0, 0.0, [0] * (len(BUCKET_BOUNDS_MS) + 1), normalize(sql)[:SQL_MAX]]
+            entry[0] += 1
+            entry[1] += ms
+            entry[2] = max(entry[2], ms)
+            entry[3][bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+            if (
+                ms >= slow_ms
+                and params is not None
+                and len(_explain_queue) < EXPLAIN_QUEUE_MAX
+                and now - _explained_at.get(fp, float("-inf")) >= interval
+                and random.random() < sample_rate
+                and _explainable(alias, sql)
+            ):
+                _explained_at[fp] = now
+                _explain_queue.append((alias, sql, params, fp, view))
+    _flusher.ensure_started()
+
+
+def _explainable(alias, sql):
+    # EXPLAIN ANALYZE runs the statement: plain reads only, never writes or row locks
+    head = sql.lstrip().upper()
+    return connections[alias].vendor == "postgresql" and head.startswith("SELECT") and " FOR UPDATE" not in head and " FOR NO KEY UPDATE" not in head
+
+
+def _explain(alias, sql, params):
+    """EXPLAIN (ANALYZE, BUFFERS) in a rolled back transaction with a statement timeout."""
+    timeout_ms = int(getattr(settings, "QUERY_PROFILER_EXPLAIN_TIMEOUT", 5.0) * 1000)
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+            start = time.perf_counter()
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            ms = (time.perf_counter() - start) * 1000
+        transaction.set_rollback(True, using=alias)
+    return plan, ms
+
+
+def flush():
+    """
+    Merge this worker's aggregates into QueryStat (rows locked, so workers add up instead of
+    overwriting each other) and store the plans of queued slow queries. Returns the number of
+    (fingerprint, view) rows written.
+    """
+    from .models import QueryStat
+
+    with _lock:
+        pending, explains = dict(_pending), list(_explain_queue)
+        _pending.clear()
+        _explain_queue.clear()
+    if not pending and not explains:
+        return 0
+
+    close_old_connections()
+    now = timezone.now()
+    try:
+        if pending:
+            # Make sure every row exists, then lock and add to it
+            QueryStat.objects.bulk_create(
+                [QueryStat(fingerprint=fp, view=view[:200], sql=entry[4]) for (fp, view), entry in pending.items()],
+                ignore_conflicts=True,
+            )
+            with transaction.atomic():
+                rows = {
+                    (row.fingerprint, row.view): row
+                    for row in QueryStat.objects.select_for_update()
+                    .filter(fingerprint__in={fp for fp, _view in pending})
+                    .defer("plan")
+                    .order_by("pk")
+                }
+                changed = []
+                for (fp, view), (calls, total_ms, max_ms, buckets, _sql) in pending.items():
+                    row = rows.get((fp, view[:200]))
+                    if row is None:
+                        continue
+                    row.calls += calls
+                    row.total_ms += total_ms
+                    row.max_ms = max(row.max_ms, max_ms)
+                    row.buckets = [a + b for a, b in zip(row.buckets or [0] * len(buckets), buckets)]
+                    row.last_seen = now
+                    changed.append(row)
+                QueryStat.objects.bulk_update(changed, ["calls", "total_ms", "max_ms", "buckets", "last_seen"])
+    except Exception:
+        # Merge the aggregates back so the next flush retries them
+        with _lock:
+            for key, (calls, total_ms, max_ms, buckets, sql) in pending.items():
+                entry = _pending.setdefault(key, [0, 0.0, 0.0, [0] * len(buckets), sql])
+                entry[0] += calls
+                entry[1] += total_ms
+                entry[2] = max(entry[2], max_ms)
+                entry[3] = [a + b for a, b in zip(entry[3], buckets)]
+        raise
+
+    for alias, sql, params, fp, view in explains:
+        try:
+            plan, ms = _explain(alias, sql, params)
+        except Exception as e:
+            logger.warning(f"EXPLAIN of query {fp} ({view}) failed: {e}")
+            continue
+        QueryStat.objects.filter(fingerprint=fp, view=view[:200]).update(plan=plan, plan_ms=round(ms, 2), plan_captured_at=now)
+    logger.debug(f"Flushed query stats for {len(pending)} fingerprint(s), {len(explains)} plan(s)")
+    return len(pending)
+
+
+_flusher = BackgroundFlusher(
+    "query-profiler-flusher", flush, lambda: getattr(settings, "QUERY_PROFILER_FLUSH_INTERVAL", 10.0)
+)
@@ -0,0 +1,137 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Content-addressed storage for customer logos
+Path: src/portal/storage.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import hashlib
+import logging
+import os
+import posixpath
+import time
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+# A stored file touched (written or deduplicated) within this window is never deleted by
+# release_logo() or the garbage collector, so a concurrent upload of identical content that is
+# not yet committed cannot lose its file.
+RECENT_FILE_GRACE_SECONDS = 600
+
+# Orphan collection (`manage.py gc_logos`), queued by the worker about once a day; each run scans
+# at most LOGO_GC_LIMIT files and the next one resumes where it stopped
+LOGO_GC_TASK = "gc_logos"
+LOGO_GC_INTERVAL = 86400
+LOGO_GC_LIMIT = 10000
+
+
+def hashed_name(upload_to, digest, ext):
+    """Return the storage name for a digest: <upload_to>/<aa>/<sha256><ext>."""
+    return posixpath.join(upload_to, digest[:2], f"{digest}{ext.lower()}")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files by the SHA-256 of their content.
+    Identical uploads map to the same name and are only written once.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        target = hashed_name(posixpath.dirname(name), hasher.hexdigest(), os.path.splitext(name)[1])
+
+        if self.exists(target):
+            # Deduplicated: refresh mtime so the grace period protects it while the new reference commits.
+            self.touch(target)
+            return target
+        return super().save(target, content, max_length=max_length)
+
+    def import_file(self, temp_path, digest, ext, upload_to):
+        """
+        Move an already-hashed file (on the same filesystem) into place with one atomic rename.
+        If identical content is already stored, the temp file is dropped instead.
+        """
+        target = hashed_name(upload_to, digest, ext)
+        full_path = self.path(target)
+        if os.path.exists(full_path):
+            self.touch(target)
+            os.unlink(temp_path)
+            return target
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.chmod(temp_path, self.file_permissions_mode or 0o644)
+        os.replace(temp_path, full_path)
+        return target
+
+    def touch(self, name):
+        try:
+            os.utime(self.path(name))
+        except OSError as e:
+            logger.warning(f"Could not touch stored file {name}: {e}")
+
+    def is_recent(self, name, now=None):
+        try:
+            mtime = os.path.getmtime(self.path(name))
+        except OSError:
+            return False
+        return (now or time.time()) - mtime < RECENT_FILE_GRACE_SECONDS
+
+
+logo_storage = ContentAddressedStorage()
+
+
+def logo_reference_count(name):
+    """Number of customers pointing at a stored logo file (the file's reference count)."""
+    from .models import Customer
+    if not name:
+        return 0
+    # all_objects: a customer being deleted still holds its logo until its purge releases it
+    return Customer.all_objects.filter(logo=name).count()
+
+
+def delete_logo_if_unreferenced(name):
+    """Delete a stored logo file if no customer references it. Returns True if the file was removed."""
+    if not name or logo_reference_count(name) > 0:
+        return False
+    if logo_storage.is_recent(name):
+        # Possibly being reused by an upload that has not committed yet; leave it to gc_logos.
+        logger.info(f"Keeping recently touched logo {name}; gc_logos will collect it if still orphaned")
+        return False
+    try:
+        logo_storage.delete(name)
+    except OSError as e:
+        logger.warning(f"Failed to delete unreferenced logo {name}: {e}")
+        return False
+    logger.info(f"Deleted unreferenced logo {name}")
+    return True
+
+
+def release_logo(name):
+    """
+    Drop one reference to a stored logo. The file is removed once the surrounding transaction
+    commits and no other customer uses it.
+    """
+    if name:
+        transaction.on_commit(lambda: delete_logo_if_unreferenced(name))
+
+
+def schedule_logo_gc():
+    """Queue the logo garbage collection job about once a day (worker maintenance tick). Returns the Job or None."""
+    from . import jobs
+
+    return jobs.schedule_periodic(LOGO_GC_TASK, LOGO_GC_INTERVAL)
@@ -0,0 +1,63 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Background job tasks of the portal app (run by manage.py worker)
+Path: src/portal/tasks.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import io
+import logging
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+
+from . import activity, deletion, jobs, link_health, storage, updates  # noqa: F401 (deletion registers the purge tasks)
+
+logger = logging.getLogger(__name__)
+
+
+@jobs.task(updates.CHECK_UPDATES_TASK)
+def check_updates():
+    """Fetch the latest version from GitHub; the result is read back by the About modal."""
+    return updates.check_for_updates()
+
+
+@jobs.task(link_health.CHECK_LINKS_TASK)
+def check_links():
+    """
+    Check due portal links for at most LINK_CHECK_TIME_BUDGET seconds (queued by the worker's
+    maintenance tick via link_health.schedule; links left over are due again on the next tick).
+    """
+    return link_health.check_links(
+        time_budget=getattr(settings, "LINK_CHECK_TIME_BUDGET", 600),
+        progress=jobs.report_progress,
+    )
+
+
+@jobs.task(activity.PARTITIONS_TASK)
+def activity_partitions():
+    """
+    Create upcoming activity log partitions and drop those past ACTIVITY_LOG_RETENTION_MONTHS
+    (queued daily by the worker via activity.schedule_partitions). Fails if any partition failed.
+    """
+    created, dropped, failed = activity.ensure_partitions(
+        connection, retention_months=getattr(settings, "ACTIVITY_LOG_RETENTION_MONTHS", 0)
+    )
+    if failed:
+        raise jobs.PermanentFailure(f"Activity partitions failed: {', '.join(failed)} (see log)")
+    return {"created": created, "dropped": dropped}
+
+
+@jobs.task(storage.LOGO_GC_TASK)
+def gc_logos():
+    """
+    Delete unreferenced logo files (one slice of LOGO_GC_LIMIT files, resuming from the last run)
+    and stale upload temp files; queued daily by the worker via storage.schedule_logo_gc.
+    """
+    out, err = io.StringIO(), io.StringIO()
+    call_command("gc_logos", limit=storage.LOGO_GC_LIMIT, stdout=out, stderr=err)
+    if err.getvalue():
+        logger.warning(f"Logo GC: {err.getvalue().strip()}")
+    return {"summary": out.getvalue().strip()}
@@ -0,0 +1,85 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Update check against the GitHub main branch (run as a background job)
+Path: src/portal/updates.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import base64
+import json
+import re
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+
+GITHUB_REPO = "5echo-io/pmg-portal"
+GITHUB_BRANCH = "main"
+GITHUB_PATH = "VERSION"
+
+CHECK_UPDATES_TASK = "portal.check_updates"
+# Results older than this trigger a new background check
+CHECK_INTERVAL_SECONDS = 3600
+
+
+def current_version():
+    """Version of this installation from the VERSION file, or "Unknown"."""
+    version_paths = [
+        Path(settings.BASE_DIR.parent) / "VERSION",
+        Path(settings.BASE_DIR) / ".." / "VERSION",
+        Path("/opt/pmg-portal/VERSION"),
+    ]
+    for vp in version_paths:
+        try:
+            if vp.exists() and vp.is_file():
+                return vp.read_text(encoding='utf-8').strip()
+        except (OSError, IOError, UnicodeDecodeError, PermissionError):
+            continue
+    return "Unknown"
+
+
+def normalize_version(v):
+    """Extract MAJOR.MINOR.PATCH (e.g. "1.17.39-beta.14" -> (1, 17, 39)); build suffixes are ignored."""
+    v_clean = re.sub(r'-[a-z]+\.\d+$', '', v.strip())
+    parts = v_clean.split('.')
+    if len(parts) >= 3:
+        try:
+            return tuple(int(p) for p in parts[:3])
+        except ValueError:
+            pass
+    return (0, 0, 0)
+
+
+def fetch_latest_version(timeout=5):
+    """Read VERSION from the GitHub main branch. Raises on network or API errors."""
+    # GitHub API: GET /repos/{owner}/{repo}/contents/{path}?ref={branch}
+    api_url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_PATH}?ref={GITHUB_BRANCH}"
+    req = urllib.request.Request(api_url, headers={"Accept": "application/vnd.github.v3+json"})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        data = json.loads(response.read().decode())
+    if "content" not in data:
+        raise ValueError("GitHub response has no file content")
+    return base64.b64decode(data["content"]).decode('utf-8').strip()
+
+
+def check_for_updates():
+    """Compare this installation with the latest version. Returns the job result stored for the About modal."""
+    current = current_version()
+    latest = fetch_latest_version()
+    return {
+        "current_version": current,
+        "latest_version": latest,
+        "has_update": normalize_version(latest) > normalize_version(current),
+    }
+
+
+def latest_check():
+    """Most recent successful update check job, or None."""
+    from .models import Job
+    return (
+        Job.objects.filter(task=CHECK_UPDATES_TASK, status=Job.STATUS_SUCCEEDED)
+        .order_by("-finished_at")
+        .only("result", "finished_at")
+        .first()
+    )
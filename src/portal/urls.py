@@ -1,9 +1,15 @@
 from django.urls import path
-from .views import portal_home, switch_customer, check_updates, set_language_custom
+from .views import portal_home, switch_customer, customer_home, customer_picker, portal_link_go, check_updates, job_status, set_language_custom
+from .media import customer_logo
 
 urlpatterns = [
     path("", portal_home, name="portal_home"),
+    path("c/<slug:slug>/", customer_home, name="customer_home"),
     path("switch/<int:customer_id>/", switch_customer, name="switch_customer"),
+    path("customers/picker/", customer_picker, name="customer_picker"),
+    path("go/<int:link_id>/", portal_link_go, name="portal_link_go"),
     path("about/check-updates/", check_updates, name="check_updates"),
+    path("jobs/<int:job_id>/", job_status, name="job_status"),
     path("i18n/setlang/", set_language_custom, name="set_language_custom"),
+    path("logo/<int:customer_id>/<str:digest>/", customer_logo, name="customer_logo"),
 ]
@@ -6,22 +6,33 @@ Path: src/portal/views.py
 Created: 2026-02-05
 Last Modified: 2026-02-05
 """
+import json
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Prefetch
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, QueryDict
+from django.urls import reverse
+from django.views.decorators.http import require_POST, require_safe
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.views.decorators.csrf import csrf_exempt
 from django.core.cache import cache
 from django.conf import settings
 from django.utils import translation
-from pathlib import Path
-import re
-import urllib.request
-import urllib.error
-import json
-from .models import CustomerMembership, Customer
+from .context_processors import ABOUT_INFO_CACHE_KEY
+from .models import ActivityEvent, CustomerMembership, Customer, Job, PortalLink, PortalLinkUsage
+from . import activity, jobs, link_clicks, updates
+from .customers import (
+    PICKER_SEARCH_THRESHOLD,
+    accessible_customers,
+    customer_count,
+    last_used_customer,
+    picker_page,
+    recent_customer_ids,
+    remember_recent_customer,
+)
 
 def _portal_home_context(request, customer, links, active_role=None, memberships=None):
     """Build context for portal home (full page or fragment)."""
@@ -32,100 +43,155 @@ def _portal_home_context(request, customer, links, active_role=None, memberships
         "links": links,
     }
 
+
+def _customer_home_context(request, customer, link_order):
+    """Dashboard context of one customer: its links in the requested order and the user's role."""
+    links = list(_ordered_links(customer, request.user, link_order))
+    active_role = None
+    if not request.user.is_superuser:
+        active_role = (
+            CustomerMembership.objects.filter(user=request.user, customer=customer)
+            .values_list("role", flat=True)
+            .first()
+        )
+    ctx = _portal_home_context(request, customer, links, active_role)
+    ctx["link_order"] = link_order
+    return ctx
+
+
+def _customer_home_fragment(request, customer, ctx):
+    r = render(request, "portal/fragments/customer_home_content.html", ctx)
+    r["HX-Trigger"] = json.dumps({"setTitle": {"title": f"{customer.name} | PMG Portal"}})
+    return r
+
+
+LINK_ORDERS = ("default", "popular")
+LINK_ORDER_SESSION_KEY = "portal_link_order"
+
+
+def _ordered_links(customer, user, link_order):
+    """
+    The customer's links in admin order, or "popular": most clicked by this user first, then most
+    clicked overall. The per-user count is a correlated subquery in the same SELECT, so both orders
+    cost one query.
+    """
+    links = customer.links.all()
+    if link_order != "popular":
+        return links
+    my_clicks = PortalLinkUsage.objects.filter(link=OuterRef("pk"), user=user).values("clicks")[:1]
+    return links.annotate(my_clicks=Coalesce(Subquery(my_clicks), 0)).order_by(
+        "-my_clicks", "-click_count", "sort_order", "title"
+    )
+
+
+@login_required
+@require_safe
+def portal_link_go(request, link_id):
+    """
+    Tracked redirect for portal links: count the click in the in-process buffer (flushed to the
+    database in bulk by portal.link_clicks) and send the browser on to the link URL.
+    """
+    link = get_object_or_404(
+        PortalLink.objects.only("id", "url", "customer_id"),
+        pk=link_id,
+        customer__in=accessible_customers(request.user),
+    )
+    link_clicks.record_click(link.id, request.user.id)
+    response = HttpResponseRedirect(link.url)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _customer_picker_context(request, mode, query="", after=""):
+    """Context for one page of the customer picker (see portal/fragments/customer_picker_items.html)."""
+    recent_ids = recent_customer_ids(request)
+    recent, customers, next_after = picker_page(request.user, query, after, recent_ids)
+    next_url = None
+    if next_after is not None:
+        params = QueryDict(mutable=True)
+        params.update({"mode": mode, "q": query, "after": next_after})
+        next_url = f"{reverse('customer_picker')}?{params.urlencode()}"
+    return {
+        "mode": mode,
+        "query": query,
+        "after": after,
+        "recent": recent,
+        "customers": customers,
+        "next_url": next_url,
+        "active_customer_id": recent_ids[0] if recent_ids else None,
+    }
+
+
+@login_required
+@require_safe
+def customer_picker(request):
+    """
+    htmx endpoint for the customer switch modal and the selection page: one keyset-paginated page
+    of customers, optionally filtered by a search prefix (?q=), continuing after ?after=<name>.
+    """
+    mode = "select" if request.GET.get("mode") == "select" else "switch"
+    ctx = _customer_picker_context(request, mode, request.GET.get("q", ""), request.GET.get("after", ""))
+    return render(request, "portal/fragments/customer_picker_items.html", ctx)
+
+
+def _no_customer_response(request, is_htmx):
+    if is_htmx:
+        r = render(request, "portal/fragments/no_customer_content.html", {})
+        r["HX-Trigger"] = '{"setTitle": {"title": "No customer access | PMG Portal"}}'
+        return r
+    return render(request, "portal/no_customer.html")
+
+
+def _link_order(request):
+    """Link order from ?link_order= (remembered in the session), else the remembered one."""
+    link_order = request.GET.get("link_order")
+    if link_order in LINK_ORDERS:
+        request.session[LINK_ORDER_SESSION_KEY] = link_order
+        return link_order
+    return request.session.get(LINK_ORDER_SESSION_KEY, "default")
+
+
 @login_required
 def portal_home(request):
+    """
+    Redirect to the dashboard of the last used customer (recent_customers cookie) or of the only
+    one; otherwise show the selection page. Nothing is written to the session. An htmx request
+    (the Dashboard tab) gets the dashboard fragment directly, with the customer URL in HX-Push-Url.
+    """
     is_htmx = request.headers.get("HX-Request") == "true"
     try:
-        # Superusers: all customers; others: only memberships
-        if request.user.is_superuser:
-            from types import SimpleNamespace
-            customers = list(Customer.objects.prefetch_related("links").order_by("name"))
-            if not customers:
-                if is_htmx:
-                    r = render(request, "portal/fragments/no_customer_content.html", {})
-                    r["HX-Trigger"] = '{"setTitle": {"title": "No customer access | PMG Portal"}}'
-                    return r
-                return render(request, "portal/no_customer.html")
-            # Resolve active from session
-            active_customer_id = request.session.get("active_customer_id")
-            active_customer = None
-            if active_customer_id:
-                for c in customers:
-                    if c.id == active_customer_id:
-                        active_customer = c
-                        break
-            
+        # Superusers: all customers; others: only memberships. Only the customer to show is loaded;
+        # the selection page fetches the rest a page at a time via customer_picker.
+        customer = last_used_customer(request.user, recent_customer_ids(request))
+        if customer is None:
+            total = customer_count(request.user)
+            if total == 0:
+                return _no_customer_response(request, is_htmx)
             # Auto-select if only one customer available
-            if not active_customer and len(customers) == 1:
-                active_customer = customers[0]
-                request.session["active_customer_id"] = active_customer.id
-            
-            # If no active customer, show selection page
-            if not active_customer:
-                ctx = {
-                    "customers": customers,
-                    "is_superuser": True,
-                }
+            if total == 1:
+                customer = accessible_customers(request.user).only("id", "name", "slug").first()
+                if customer is None:
+                    return _no_customer_response(request, is_htmx)
+            else:
+                # If no customer was used before, show selection page
+                ctx = _customer_picker_context(request, "select")
+                ctx["is_superuser"] = request.user.is_superuser
+                ctx["show_search"] = total > PICKER_SEARCH_THRESHOLD
                 if is_htmx:
                     r = render(request, "portal/fragments/customer_selection_content.html", ctx)
                     r["HX-Trigger"] = '{"setTitle": {"title": "Select Customer | PMG Portal"}}'
                     return r
                 return render(request, "portal/customer_selection.html", ctx)
-            
-            customer = active_customer
-            links = list(customer.links.all())
-            ctx = _portal_home_context(request, customer, links, memberships=[SimpleNamespace(customer=c) for c in customers])
-        else:
-            memberships = (
-                CustomerMembership.objects.filter(user=request.user)
-                .select_related("customer")
-                .prefetch_related("customer__links")
-                .order_by("customer__name")
-            )
-            memberships_list = list(memberships)
-            if not memberships_list:
-                if is_htmx:
-                    r = render(request, "portal/fragments/no_customer_content.html", {})
-                    r["HX-Trigger"] = '{"setTitle": {"title": "No customer access | PMG Portal"}}'
-                    return r
-                return render(request, "portal/no_customer.html")
-
-            active_customer_id = request.session.get("active_customer_id")
-            active = None
-            if active_customer_id:
-                for m in memberships_list:
-                    if m.customer_id == active_customer_id:
-                        active = m
-                        break
-            
-            # Auto-select if only one customer available
-            if not active and len(memberships_list) == 1:
-                active = memberships_list[0]
-                request.session["active_customer_id"] = active.customer_id
-            
-            # If no active customer, show selection page
-            if not active:
-                customers = [m.customer for m in memberships_list]
-                ctx = {
-                    "customers": customers,
-                    "memberships": memberships_list,
-                    "is_superuser": False,
-                }
-                if is_htmx:
-                    r = render(request, "portal/fragments/customer_selection_content.html", ctx)
-                    r["HX-Trigger"] = '{"setTitle": {"title": "Select Customer | PMG Portal"}}'
-                    return r
-                return render(request, "portal/customer_selection.html", ctx)
-            
-            customer = active.customer
-            links = list(customer.links.all())
-            ctx = _portal_home_context(request, customer, links, active.role, memberships_list)
 
+        url = reverse("customer_home", args=[customer.slug])
+        if request.GET.get("link_order") in LINK_ORDERS:
+            url += f"?link_order={request.GET['link_order']}"
         if is_htmx:
-            r = render(request, "portal/fragments/customer_home_content.html", ctx)
-            r["HX-Trigger"] = '{"setTitle": {"title": "' + (customer.name + " | PMG Portal").replace('"', '\\"') + '"}}'
+            request.active_customer = customer
+            r = _customer_home_fragment(request, customer, _customer_home_context(request, customer, _link_order(request)))
+            r["HX-Push-Url"] = url
             return r
-        return render(request, "portal/customer_home.html", ctx)
+        return redirect(url)
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -136,96 +202,104 @@ def portal_home(request):
             return r
         return render(request, "portal/no_customer.html")
 
+
+@login_required
+@require_safe
+def customer_home(request, slug):
+    """
+    Dashboard of one customer at /c/<slug>/ (full page, or the fragment for htmx), so each dashboard
+    has its own bookmarkable, cacheable URL. Opening it makes the customer the last used one (cookie)
+    and logs a switch when that changed. Prefetches by the switcher (X-Prefetch: true) are read-only:
+    no cookie, no activity, and pending flash messages are left for the next real page.
+    """
+    customer = get_object_or_404(accessible_customers(request.user), slug=slug)
+    request.active_customer = customer
+    is_htmx = request.headers.get("HX-Request") == "true"
+    prefetch = request.headers.get("X-Prefetch") == "true"
+    ctx = _customer_home_context(request, customer, _link_order(request))
+    if prefetch:
+        ctx["messages"] = ()
+    if is_htmx:
+        response = _customer_home_fragment(request, customer, ctx)
+    else:
+        response = render(request, "portal/customer_home.html", ctx)
+    if not prefetch and remember_recent_customer(request, response, customer.id):
+        activity.record(ActivityEvent.ACTION_SWITCH_CUSTOMER, customer)
+    patch_vary_headers(response, ("HX-Request",))
+    patch_cache_control(response, private=True)
+    return response
+
+
 @login_required
 def switch_customer(request, customer_id):
-    """Switch active customer; always redirect to portal home (/) after switch."""
+    """
+    Switch customer: make it the last used one (recent_customers cookie, not the session). A regular
+    form post redirects to its dashboard URL. An htmx post (the switcher in static/js/portal.js) gets
+    the new dashboard fragment in the same response, or an empty 204 when it already holds a
+    prefetched one (X-Prefetched: true).
+    """
     if request.method != "POST":
         messages.error(request, "Invalid request method.")
         return redirect("/")
 
-    # Superusers can switch to any customer (no membership required)
     if request.user.is_superuser:
+        # Superusers can switch to any customer (no membership required)
         customer = get_object_or_404(Customer, pk=customer_id)
-        request.session["active_customer_id"] = customer_id
-        messages.success(request, f"Switched to {customer.name}")
-        return redirect("/")
+    else:
+        # Verify user has access to this customer
+        customer = get_object_or_404(
+            CustomerMembership.objects.select_related("customer"),
+            user=request.user,
+            customer_id=customer_id,
+            customer__deleting_at__isnull=True,
+        ).customer
+    activity.record(ActivityEvent.ACTION_SWITCH_CUSTOMER, customer)
 
-    # Verify user has access to this customer
-    membership = get_object_or_404(
-        CustomerMembership,
-        user=request.user,
-        customer_id=customer_id,
-    )
-    request.session["active_customer_id"] = customer_id
-    messages.success(request, f"Switched to {membership.customer.name}")
-    return redirect("/")
+    if request.headers.get("HX-Request") == "true":
+        if request.headers.get("X-Prefetched") == "true":
+            response = HttpResponse(status=204)
+        else:
+            request.active_customer = customer
+            ctx = _customer_home_context(request, customer, request.session.get(LINK_ORDER_SESSION_KEY, "default"))
+            response = _customer_home_fragment(request, customer, ctx)
+    else:
+        messages.success(request, f"Switched to {customer.name}")
+        response = redirect("customer_home", slug=customer.slug)
+    remember_recent_customer(request, response, customer.id)
+    return response
 
 
 @login_required
 @require_POST
 def check_updates(request):
-    """Check for updates from GitHub main branch (admin only)."""
+    """
+    Queue an update check against the GitHub main branch (admin only) and return the job; the
+    About modal polls job_status for the result instead of holding the request open for GitHub.
+    """
     if not request.user.is_superuser:
         return JsonResponse({"error": "Unauthorized"}, status=403)
-    
-    # Clear cache to force fresh check
-    cache_key = "pmg_portal_latest_version"
-    cache.delete(cache_key)
-    
-    # Get current version
-    current_version = "Unknown"
-    version_paths = [
-        Path(settings.BASE_DIR.parent) / "VERSION",
-        Path(settings.BASE_DIR) / ".." / "VERSION",
-        Path("/opt/pmg-portal/VERSION"),
-    ]
-    for vp in version_paths:
-        try:
-            if vp.exists() and vp.is_file():
-                current_version = vp.read_text(encoding='utf-8').strip()
-                break
-        except (OSError, IOError, UnicodeDecodeError, PermissionError):
-            continue
-    
-    has_update = False
-    latest_version = None
-    
-    try:
-        github_repo = "5echo-io/pmg-portal"
-        github_branch = "main"
-        github_path = "VERSION"
-        api_url = f"https://api.github.com/repos/{github_repo}/contents/{github_path}?ref={github_branch}"
-        
-        req = urllib.request.Request(api_url, headers={"Accept": "application/vnd.github.v3+json"})
-        with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode())
-            if "content" in data:
-                import base64
-                latest_version = base64.b64decode(data["content"]).decode('utf-8').strip()
-                
-                def normalize_version(v):
-                    v_clean = re.sub(r'-[a-z]+\.\d+$', '', v.strip())
-                    parts = v_clean.split('.')
-                    if len(parts) >= 3:
-                        return tuple(int(p) for p in parts[:3])
-                    return (0, 0, 0)
-                
-                current_norm = normalize_version(current_version)
-                latest_norm = normalize_version(latest_version)
-                has_update = latest_norm > current_norm
-        
-        # Cache for 1 hour
-        cache.set(cache_key, (latest_version, has_update), 3600)
-    except Exception as e:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.debug(f"Update check failed: {e}")
-    
-    return JsonResponse({
-        "has_update": has_update,
-        "latest_version": latest_version,
-        "current_version": current_version,
-    })
+
+    job = jobs.enqueue(
+        updates.CHECK_UPDATES_TASK, key=updates.CHECK_UPDATES_TASK, max_attempts=1, user=request.user
+    )
+    # The About modal shows the fresh result from now on
+    cache.delete(ABOUT_INFO_CACHE_KEY)
+    return JsonResponse(
+        {"job_id": job.pk, "status_url": reverse("job_status", args=[job.pk])},
+        status=202,
+    )
+
+
+@login_required
+@require_safe
+def job_status(request, job_id):
+    """Job status API: state, attempts, result and error of a background job (own jobs, or any for superusers)."""
+    job = get_object_or_404(Job, pk=job_id)
+    if job.created_by_id != request.user.pk and not request.user.is_superuser:
+        return JsonResponse({"error": "Not found"}, status=404)
+    response = JsonResponse(jobs.job_status(job))
+    response["Cache-Control"] = "no-store"
+    return response
 
 
 @require_POST
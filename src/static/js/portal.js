@@ -0,0 +1,419 @@
+/*
+ * PMG Portal - portal shell behaviour (menus, customer switcher, modals, update check, toasts).
+ * Loaded with defer from portal/base.html; served fingerprinted and precompressed by WhiteNoise.
+ */
+
+// Customer dashboards prefetched by the switcher: dashboard URL -> { promise (fragment HTML), time }
+const customerPreviews = new Map();
+const CUSTOMER_PREVIEW_TTL_MS = 30000;
+const CUSTOMER_PREVIEW_HOVER_DELAY_MS = 80;
+
+/**
+ * Fetch a customer's dashboard fragment (portal.views.customer_home at /c/<slug>/, read-only with
+ * X-Prefetch) ahead of a switch. Results are kept for CUSTOMER_PREVIEW_TTL_MS; failed fetches are
+ * forgotten.
+ */
+function prefetchCustomer(url) {
+  if (!url || !window.fetch) return null;
+  const cached = customerPreviews.get(url);
+  if (cached && Date.now() - cached.time < CUSTOMER_PREVIEW_TTL_MS) return cached.promise;
+  const promise = fetch(url, { credentials: 'same-origin', headers: { 'HX-Request': 'true', 'X-Prefetch': 'true' } })
+    .then(response => response.ok ? response.text() : Promise.reject(new Error('HTTP ' + response.status)));
+  promise.catch(() => customerPreviews.delete(url));
+  customerPreviews.set(url, { promise: promise, time: Date.now() });
+  return promise;
+}
+
+function showCustomerDashboard(html, customerName, url) {
+  const main = document.getElementById('main-content');
+  main.innerHTML = html;
+  if (window.htmx) htmx.process(main);
+  if (customerName) {
+    document.title = customerName + ' | PMG Portal';
+    const topbarName = document.querySelector('.topbar-customer-name');
+    if (topbarName) topbarName.textContent = customerName;
+  }
+  if (url && window.location.pathname !== url) history.pushState({}, '', url);
+  // The switch list marks the active customer; fetch it again on next open
+  const list = document.getElementById('customer-switch-list');
+  if (list) delete list.dataset.loaded;
+}
+
+function selectCustomer(customerId) {
+  const form = document.getElementById('customer-switcher-form');
+  const id = typeof customerId === 'string' ? customerId : String(customerId);
+  if (!form || !id) return;
+  const submitForm = function() {
+    form.action = '/switch/' + id + '/';
+    form.submit();
+  };
+  // In-place switch needs the portal shell of an active customer (topbar name, switch modal);
+  // the selection page keeps the full form post
+  const main = document.getElementById('main-content');
+  const csrf = form.querySelector('[name=csrfmiddlewaretoken]');
+  if (!window.fetch || !main || !csrf || !document.querySelector('.topbar-customer-name')) {
+    submitForm();
+    return;
+  }
+  const card = document.querySelector('[data-customer-id="' + id + '"]');
+  const customerName = card ? card.getAttribute('data-customer-name') : '';
+  const url = card ? card.getAttribute('data-customer-url') : '';
+  const cached = url ? customerPreviews.get(url) : null;
+  const prefetched = !!cached && Date.now() - cached.time < CUSTOMER_PREVIEW_TTL_MS;
+  // One request makes it the last used customer; it also returns the dashboard unless a prefetched one is at hand
+  const switched = fetch('/switch/' + id + '/', {
+    method: 'POST',
+    credentials: 'same-origin',
+    headers: { 'X-CSRFToken': csrf.value, 'HX-Request': 'true', 'X-Prefetched': prefetched ? 'true' : 'false' },
+  }).then(response => response.ok ? response : Promise.reject(new Error('HTTP ' + response.status)));
+  const html = prefetched ? cached.promise : switched.then(response => response.text());
+  html
+    .then(content => showCustomerDashboard(content, customerName, url))
+    .then(() => switched)
+    .catch(() => {
+      // Prefetched fragment unusable or switch refused: let the server decide with a full page load
+      switched.then(() => { window.location.href = url || '/'; }, submitForm);
+    });
+}
+
+// Prefetch a customer's dashboard when the pointer rests on (or keyboard focus reaches) a switch card
+(function() {
+  const saveData = navigator.connection && navigator.connection.saveData;
+  if (saveData) return;
+  let hoverTimer = null;
+  document.addEventListener('mouseover', function(e) {
+    const card = e.target.closest('[data-customer-switch="true"]');
+    if (!card || card.contains(e.relatedTarget)) return;
+    clearTimeout(hoverTimer);
+    hoverTimer = setTimeout(() => prefetchCustomer(card.getAttribute('data-customer-url')), CUSTOMER_PREVIEW_HOVER_DELAY_MS);
+  });
+  document.addEventListener('mouseout', function(e) {
+    const card = e.target.closest('[data-customer-switch="true"]');
+    if (card && !card.contains(e.relatedTarget)) clearTimeout(hoverTimer);
+  });
+  document.addEventListener('focusin', function(e) {
+    const card = e.target.closest('[data-customer-switch="true"]');
+    if (card) prefetchCustomer(card.getAttribute('data-customer-url'));
+  });
+})();
+
+function toggleCustomerMenu(event) {
+  event.stopPropagation();
+  const menu = document.getElementById('customer-menu');
+  if (!menu) return;
+  const isOpen = menu.classList.contains('open');
+  document.querySelectorAll('.customer-menu').forEach(function(m) { m.classList.remove('open'); });
+  document.querySelectorAll('.user-menu').forEach(function(m) { m.classList.remove('open'); });
+  if (!isOpen) {
+    menu.classList.add('open');
+    var searchInput = document.getElementById('customer-search');
+    if (searchInput) { searchInput.value = ''; filterCustomerMenu(''); }
+    setTimeout(function() {
+      var closeHandler = function(e) {
+        if (!menu.contains(e.target) && !e.target.closest('.customer-picker-btn')) {
+          menu.classList.remove('open');
+          document.removeEventListener('click', closeHandler);
+        }
+      };
+      document.addEventListener('click', closeHandler, { once: true });
+    }, 10);
+  }
+}
+
+function filterCustomerMenu(q) {
+  q = (q || '').toLowerCase().trim();
+  document.querySelectorAll('#customer-menu .customer-menu-item').forEach(function(item) {
+    var name = (item.getAttribute('data-customer-name') || item.textContent || '').toLowerCase();
+    item.style.display = q === '' || name.indexOf(q) !== -1 ? '' : 'none';
+  });
+}
+
+function toggleUserMenu(event) {
+  event.stopPropagation();
+  const menu = document.getElementById('user-menu');
+  if (!menu) return;
+
+  const isOpen = menu.classList.contains('open');
+
+  // Close all menus (user and customer)
+  document.querySelectorAll('.user-menu').forEach(m => m.classList.remove('open'));
+  document.querySelectorAll('.customer-menu').forEach(m => m.classList.remove('open'));
+
+  if (!isOpen) {
+    menu.classList.add('open');
+    // Close on outside click
+    setTimeout(() => {
+      const closeHandler = function(e) {
+        if (!menu.contains(e.target) && !e.target.closest('.user-avatar-btn')) {
+          menu.classList.remove('open');
+          document.removeEventListener('click', closeHandler);
+        }
+      };
+      document.addEventListener('click', closeHandler, { once: true });
+    }, 10);
+  }
+}
+
+// Language submenu: open on click, close on mouse leave
+(function() {
+  var wrap = document.getElementById('user-menu-lang-wrap');
+  var trigger = document.getElementById('user-menu-lang-trigger');
+  var sub = document.getElementById('user-menu-lang-submenu');
+  if (!wrap || !trigger || !sub) return;
+  trigger.addEventListener('click', function(e) {
+    e.preventDefault();
+    e.stopPropagation();
+    wrap.classList.toggle('user-menu-submenu-open');
+    trigger.setAttribute('aria-expanded', wrap.classList.contains('user-menu-submenu-open'));
+  });
+  wrap.addEventListener('mouseleave', function() {
+    wrap.classList.remove('user-menu-submenu-open');
+    trigger.setAttribute('aria-expanded', 'false');
+  });
+})();
+
+// Close menu on Escape key
+document.addEventListener('keydown', function(e) {
+  if (e.key === 'Escape') {
+    document.querySelectorAll('.user-menu').forEach(m => m.classList.remove('open'));
+    document.querySelectorAll('.user-menu-item-wrapper--lang').forEach(w => w.classList.remove('user-menu-submenu-open'));
+    document.querySelectorAll('.customer-menu').forEach(m => m.classList.remove('open'));
+  }
+});
+
+// HTMX: update document title when main content is swapped
+document.body.addEventListener('setTitle', function(e) {
+  if (e.detail && e.detail.title) document.title = e.detail.title;
+});
+
+// Customer switch modal
+function openCustomerSwitchModal() {
+  const modal = document.getElementById('customer-switch-modal');
+  if (!modal) return;
+  modal.classList.add('modal-open');
+  document.body.style.overflow = 'hidden';
+  // The customer list is fetched on first open (paginated, searchable) instead of shipping with every page
+  const list = document.getElementById('customer-switch-list');
+  if (list && !list.dataset.loaded && window.htmx) {
+    list.dataset.loaded = 'true';
+    htmx.ajax('GET', list.dataset.pickerUrl, { target: list, swap: 'innerHTML' });
+  }
+  const searchInput = modal.querySelector('#customer-switch-search');
+  if (searchInput) {
+    setTimeout(() => searchInput.focus(), 100);
+  }
+}
+
+function closeCustomerSwitchModal() {
+  const modal = document.getElementById('customer-switch-modal');
+  if (modal) {
+    modal.classList.remove('modal-open');
+    document.body.style.overflow = '';
+  }
+}
+
+// Close modal on Escape key
+document.addEventListener('keydown', function(e) {
+  if (e.key === 'Escape') {
+    closeCustomerSwitchModal();
+  }
+});
+
+// Close modal when clicking backdrop
+document.addEventListener('click', function(e) {
+  const modal = document.getElementById('customer-switch-modal');
+  if (modal && e.target === modal) {
+    closeCustomerSwitchModal();
+  }
+});
+
+// Handle customer switch card clicks
+document.addEventListener('click', function(e) {
+  const card = e.target.closest('[data-customer-switch="true"]');
+  if (card) {
+    const customerId = card.getAttribute('data-customer-id');
+    if (customerId) {
+      selectCustomer(customerId);
+      closeCustomerSwitchModal();
+    }
+  }
+});
+
+// Keyboard: Enter/Space on a focused switch card switches like a click
+document.addEventListener('keydown', function(e) {
+  if (e.key !== 'Enter' && e.key !== ' ') return;
+  const card = e.target.closest && e.target.closest('[data-customer-switch="true"]');
+  if (card) {
+    e.preventDefault();
+    card.click();
+  }
+});
+
+function openChangelogModal() {
+  document.getElementById('changelogModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+function closeChangelogModal(event) {
+  if (!event || event.target.classList.contains('modal') || event.target.classList.contains('modal-close')) {
+    const modal = document.getElementById('changelogModal');
+    modal.style.display = 'none';
+    document.body.style.overflow = 'auto';
+    modal.setAttribute('data-changelog-view', 'short');
+    const fullChangelog = document.getElementById('fullChangelog');
+    const shortWrap = document.getElementById('shortChangelogWrap');
+    const btn = document.getElementById('toggleFullChangelogBtn');
+    if (fullChangelog) { fullChangelog.style.display = 'none'; fullChangelog.classList.remove('changelog-fade-in', 'changelog-fade-out'); fullChangelog.style.opacity = ''; }
+    if (shortWrap) { shortWrap.style.display = ''; shortWrap.classList.remove('changelog-fade-in', 'changelog-fade-out'); shortWrap.style.opacity = ''; }
+    if (btn) btn.textContent = 'View Full Changelog';
+  }
+}
+
+function toggleFullChangelog() {
+  const modal = document.getElementById('changelogModal');
+  const fullChangelog = document.getElementById('fullChangelog');
+  const shortWrap = document.getElementById('shortChangelogWrap');
+  const btn = document.getElementById('toggleFullChangelogBtn');
+  if (!modal || !fullChangelog || !shortWrap || !btn) return;
+  btn.classList.add('changelog-btn-animate');
+  setTimeout(function() { btn.classList.remove('changelog-btn-animate'); }, 400);
+  var showingFull = modal.getAttribute('data-changelog-view') === 'full';
+  var duration = 220;
+  if (showingFull) {
+    fullChangelog.classList.add('changelog-fade-out');
+    setTimeout(function() {
+      fullChangelog.style.display = 'none';
+      fullChangelog.classList.remove('changelog-fade-out');
+      shortWrap.style.display = '';
+      shortWrap.style.opacity = '0';
+      shortWrap.offsetHeight;
+      shortWrap.classList.add('changelog-fade-in');
+      shortWrap.style.opacity = '1';
+      btn.textContent = (btn.getAttribute && btn.getAttribute('data-text-view')) || 'View Full Changelog';
+      modal.setAttribute('data-changelog-view', 'short');
+    }, duration);
+  } else {
+    shortWrap.classList.add('changelog-fade-out');
+    setTimeout(function() {
+      shortWrap.style.display = 'none';
+      shortWrap.classList.remove('changelog-fade-out');
+      fullChangelog.style.display = 'block';
+      fullChangelog.style.opacity = '0';
+      fullChangelog.offsetHeight;
+      fullChangelog.classList.add('changelog-fade-in');
+      fullChangelog.style.opacity = '1';
+      btn.textContent = (btn.getAttribute && btn.getAttribute('data-text-hide')) || 'Hide Full Changelog';
+      modal.setAttribute('data-changelog-view', 'full');
+    }, duration);
+  }
+}
+
+function openAboutModal() {
+  document.getElementById('aboutModal').style.display = 'flex';
+  document.body.style.overflow = 'hidden';
+}
+
+function closeAboutModal(event) {
+  if (!event || event.target.classList.contains('modal') || event.target.classList.contains('modal-close')) {
+    const modal = document.getElementById('aboutModal');
+    modal.style.display = 'none';
+    document.body.style.overflow = 'auto';
+  }
+}
+
+/**
+ * Poll a job status URL (portal.views.job_status) until the background job has finished.
+ * Resolves with the final status ({status, result, error, ...}).
+ */
+function waitForJob(statusUrl, intervalMs) {
+  const interval = intervalMs || 1000;
+  return new Promise(function(resolve, reject) {
+    function poll() {
+      fetch(statusUrl, { headers: { 'Accept': 'application/json' }, credentials: 'same-origin' })
+        .then(response => response.ok ? response.json() : Promise.reject(new Error('HTTP ' + response.status)))
+        .then(job => job.done ? resolve(job) : setTimeout(poll, interval))
+        .catch(reject);
+    }
+    poll();
+  });
+}
+window.pmgWaitForJob = waitForJob;
+
+function checkForUpdates() {
+  const btn = document.getElementById('check-updates-btn');
+  const status = document.getElementById('update-status');
+  if (!btn || !status) return;
+
+  const textCheck = btn.getAttribute('data-text-check') || 'Check for updates';
+  const textChecking = btn.getAttribute('data-text-checking') || 'Checking...';
+  const textCheckingStatus = status.getAttribute('data-text-checking') || 'Checking for updates...';
+  const textLatest = status.getAttribute('data-text-latest') || 'You are running the latest version.';
+  const textError = status.getAttribute('data-text-error') || 'Could not check for updates. Please try again later.';
+  const textUpdate = status.getAttribute('data-text-update') || 'Update available';
+
+  btn.disabled = true;
+  btn.textContent = textChecking;
+  status.style.display = 'block';
+  status.innerHTML = '<p class="muted">' + textCheckingStatus + '</p>';
+
+  fetch('/about/check-updates/', {
+    method: 'POST',
+    headers: {
+      'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]')?.value || '',
+      'Content-Type': 'application/json',
+    },
+  })
+  .then(response => response.json())
+  // The check runs as a background job; wait for its result
+  .then(data => data.status_url ? waitForJob(data.status_url) : Promise.reject(new Error(data.error)))
+  .then(job => {
+    if (job.status !== 'succeeded') throw new Error(job.error);
+    const data = job.result || {};
+    btn.disabled = false;
+    btn.textContent = textCheck;
+    if (data.has_update) {
+      status.innerHTML = '<p style="color: #22c55e;"><strong>' + textUpdate + ':</strong> ' + (data.latest_version || 'Unknown') + '</p>';
+    } else {
+      status.innerHTML = '<p style="color: var(--muted);">' + textLatest + '</p>';
+    }
+  })
+  .catch(error => {
+    btn.disabled = false;
+    btn.textContent = textCheck;
+    status.innerHTML = '<p style="color: var(--error);">' + textError + '</p>';
+  });
+}
+
+// Close on ESC key
+document.addEventListener('keydown', function(event) {
+  if (event.key === 'Escape') {
+    const changelogModal = document.getElementById('changelogModal');
+    const aboutModal = document.getElementById('aboutModal');
+    if (changelogModal && changelogModal.style.display === 'flex') {
+      closeChangelogModal(event);
+    }
+    if (aboutModal && aboutModal.style.display === 'flex') {
+      closeAboutModal(event);
+    }
+    document.querySelectorAll('.user-menu').forEach(m => m.classList.remove('open'));
+  }
+});
+
+// Make toggleUserMenu globally accessible
+window.toggleUserMenu = toggleUserMenu;
+
+// Auto-dismiss toasts after 5 seconds
+document.querySelectorAll('.toast').forEach(function(toast) {
+  setTimeout(function() {
+    dismissToast(toast);
+  }, 5000);
+});
+
+function dismissToast(toast) {
+  if (toast) {
+    toast.style.animation = 'toastSlideOut 0.3s ease-out';
+    setTimeout(function() {
+      toast.remove();
+    }, 300);
+  }
+}
@@ -0,0 +1,35 @@
+/*
+ * PMG Portal - per-visitor state of the login and register pages (CSRF token, flash messages).
+ * The pages themselves are cached per language (accounts.views._public_page); this fetches the
+ * state from accounts.views.page_state and fills it in. Loaded with defer.
+ */
+(function() {
+  const url = document.body.getAttribute('data-page-state-url');
+  if (!url || !window.fetch) return;
+  const state = fetch(url, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+    .then(response => response.ok ? response.json() : Promise.reject(new Error('HTTP ' + response.status)));
+
+  state.then(function(data) {
+    document.querySelectorAll('input[name="csrfmiddlewaretoken"]').forEach(function(input) {
+      input.value = data.csrfToken;
+    });
+    const box = document.getElementById('page-messages');
+    if (box && data.messages && data.messages.length) {
+      data.messages.forEach(function(message) {
+        const line = document.createElement('div');
+        line.textContent = message.text;
+        box.appendChild(line);
+      });
+      box.hidden = false;
+    }
+  }).catch(function() {});
+
+  // A form sent before the token arrived waits for it instead of failing the CSRF check
+  document.addEventListener('submit', function(e) {
+    const input = e.target.querySelector('input[name="csrfmiddlewaretoken"]');
+    if (!input || input.value) return;
+    e.preventDefault();
+    const form = e.target;
+    state.then(function() { form.submit(); }, function() { window.location.reload(); });
+  }, true);
+})();
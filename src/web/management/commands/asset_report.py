@@ -0,0 +1,91 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Report per-page HTML and asset payload sizes
+Path: src/web/management/commands/asset_report.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import gzip
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+ASSET_RE = re.compile(r'<(?:script[^>]*\bsrc|link[^>]*\bhref)="([^"]+)"', re.IGNORECASE)
+
+
+def _gzip_size(data):
+    return len(gzip.compress(data, compresslevel=9))
+
+
+def _brotli_size(data):
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return len(brotli.compress(data))
+
+
+def _static_file(url):
+    """Map a /static/ URL to a file: the collected (hashed) file if present, else the source file."""
+    static_url = "/" + settings.STATIC_URL.strip("/") + "/"
+    if not url.startswith(static_url):
+        return None
+    name = url[len(static_url):].split("?")[0]
+    collected = Path(settings.STATIC_ROOT) / name
+    if collected.is_file():
+        return collected
+    found = finders.find(name)
+    return Path(found) if found else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Render pages and report HTML bytes plus the bytes of every script/stylesheet they reference "
+        "(raw, gzip and Brotli). Run before and after a front-end change to compare payloads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", default=["/account/login/", "/"], help="Paths to render.")
+        parser.add_argument("--user", help="Username to log in as (default: first superuser).")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by("pk").first()
+        if user is None:
+            raise CommandError("No user to log in as; pass --user.")
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h != "*" and not h.startswith(".")), "localhost")
+        anonymous = Client(HTTP_HOST=host)
+        logged_in = Client(HTTP_HOST=host)
+        logged_in.force_login(user)
+
+        for path in options["paths"]:
+            client = anonymous if path.startswith("/account/") else logged_in
+            response = client.get(path)
+            html = response.content
+            self.stdout.write(f"\n{path}  (status {response.status_code})")
+            self.stdout.write(f"  {'HTML':<58} {len(html):>8} B  gzip {_gzip_size(html):>7} B")
+
+            total_raw, total_gzip = len(html), _gzip_size(html)
+            for url in dict.fromkeys(ASSET_RE.findall(html.decode("utf-8", "replace"))):
+                path_on_disk = _static_file(url)
+                if path_on_disk is None:
+                    self.stdout.write(f"  {url[:58]:<58} {'external / not measured':>26}")
+                    continue
+                data = path_on_disk.read_bytes()
+                gz = _gzip_size(data)
+                br = _brotli_size(data)
+                br_text = f"  br {br:>7} B" if br is not None else ""
+                self.stdout.write(f"  {url[:58]:<58} {len(data):>8} B  gzip {gz:>7} B{br_text}")
+                total_raw += len(data)
+                total_gzip += gz
+            self.stdout.write(f"  {'Total (HTML + local assets)':<58} {total_raw:>8} B  gzip {total_gzip:>7} B")
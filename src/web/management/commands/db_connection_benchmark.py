@@ -0,0 +1,69 @@
+"""
+Copyright (c) 2026 5echo.io
+Project: PMG Portal
+Purpose: Benchmark per-request cost of new vs persistent database connections
+Path: src/web/management/commands/db_connection_benchmark.py
+Created: 2026-02-05
+Last Modified: 2026-02-05
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate requests (request_started -> queries -> request_finished) against the configured "
+        "database, first with a new connection per request (CONN_MAX_AGE=0), then with a persistent "
+        "connection, and report the per-request time saved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Simulated requests per mode.")
+        parser.add_argument("--queries", type=int, default=3, help="Queries per simulated request.")
+
+    def _run(self, max_age, requests, queries):
+        settings_dict = connection.settings_dict
+        original = settings_dict["CONN_MAX_AGE"]
+        settings_dict["CONN_MAX_AGE"] = max_age
+        connection.close()
+        timings = []
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                with connection.cursor() as cursor:
+                    for _q in range(queries):
+                        cursor.execute("SELECT 1")
+                        cursor.fetchone()
+                request_finished.send(sender=self.__class__)
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+            settings_dict["CONN_MAX_AGE"] = original
+        return timings
+
+    def _summary(self, label, timings):
+        ordered = sorted(timings)
+        p95 = ordered[int(len(ordered) * 0.95) - 1] if ordered else 0
+        mean = statistics.fmean(timings) if timings else 0
+        self.stdout.write(f"  {label:<34} mean {mean:8.3f} ms   median {statistics.median(timings):8.3f} ms   p95 {p95:8.3f} ms")
+        return mean
+
+    def handle(self, *args, **options):
+        requests, queries = options["requests"], options["queries"]
+        self.stdout.write(
+            f"{connection.vendor} ({connection.settings_dict.get('HOST') or 'local'}), "
+            f"{requests} simulated requests x {queries} queries"
+        )
+        # Warm up imports and the server's caches
+        self._run(None, 5, queries)
+
+        fresh = self._summary("new connection per request", self._run(0, requests, queries))
+        persistent = self._summary("persistent connection", self._run(None, requests, queries))
+        saved = fresh - persistent
+        pct = saved / fresh * 100 if fresh else 0
+        self.stdout.write(f"  Saved per request with persistent connections: {saved:.3f} ms ({pct:.1f}%)")
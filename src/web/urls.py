@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import debug_view
+from .views import debug_view, profile_list, query_report
 
 urlpatterns = [
     path("", debug_view, name="debug"),
+    path("queries/", query_report, name="query_report"),
+    path("profiles/", profile_list, name="profile_list"),
 ]
@@ -1,7 +1,7 @@
 """
 Copyright (c) 2026 5echo.io
 Project: PMG Portal
-Purpose: Web views (landing, debug)
+Purpose: Web views (landing, debug, query profiler report, request profiles)
 Path: src/web/views.py
 Created: 2026-02-05
 Last Modified: 2026-02-05
@@ -12,9 +12,13 @@ from pathlib import Path
 from django.shortcuts import redirect, render
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.db import connection
-from pmg_portal.logging_middleware import DebugLoggingMiddleware
+from django.views.decorators.http import require_http_methods
+from datetime import datetime, timezone as dt_timezone
+from pmg_portal import request_profiler, trace_store
+from portal import query_profiler
+from portal.models import QueryStat
 
 
 def _make_json_serializable(obj):
@@ -46,7 +50,13 @@ def landing(request):
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def debug_view(request):
-    """Debug view for system information and logs."""
+    """Debug view for system information and logs. ?trace=<seq> returns one request trace with its detail (JSON)."""
+    if request.GET.get("trace", "").isdigit():
+        trace = trace_store.get(int(request.GET["trace"]))
+        if trace is None:
+            return JsonResponse({"error": "Trace not found (overwritten)"}, status=404)
+        return JsonResponse(_make_json_serializable(trace))
+    
     debug_data = {
         "system": {},
         "django": {},
@@ -72,6 +82,11 @@ def debug_view(request):
             debug_data["database"]["postgres_version"] = cursor.fetchone()[0] if cursor.rowcount > 0 else "Unknown"
             cursor.execute("SELECT current_database();")
             debug_data["database"]["database_name"] = cursor.fetchone()[0] if cursor.rowcount > 0 else "Unknown"
+        debug_data["database"]["conn_max_age"] = connection.settings_dict.get("CONN_MAX_AGE")
+        if connection.settings_dict["ENGINE"] == "pmg_portal.db_backend":
+            # pmg_portal.db_backend: acquire latency / reuse ratio for this worker
+            from pmg_portal.db_backend.base import connection_metrics
+            debug_data["database"]["connection_metrics"] = connection_metrics()
         
         # File paths
         version_paths = [
@@ -101,8 +116,22 @@ def debug_view(request):
                 debug_data["files"]["changelog_size"] = cp.stat().st_size
                 break
         
-        # Request/Response logs from middleware
-        debug_data["request_logs"] = DebugLoggingMiddleware.get_logs(limit=50)
+        # Request/Response logs from all workers (shared trace store), filtered and paged by seq
+        trace_filters = {
+            "path": request.GET.get("path", "").strip(),
+            "status": request.GET.get("status", "").strip(),
+            "slow": request.GET.get("slow") == "1",
+        }
+        traces, next_before = trace_store.query(before=request.GET.get("before") or None, limit=50, **trace_filters)
+        for trace in traces:
+            trace["time"] = datetime.fromtimestamp(trace["ts"], tz=dt_timezone.utc)
+        debug_data["request_logs"] = traces
+        debug_data["request_log_filters"] = trace_filters
+        debug_data["request_log_slow_ms"] = getattr(settings, "DEBUG_TRACE_SLOW_MS", 500)
+        if next_before is not None:
+            params = request.GET.copy()
+            params["before"] = next_before
+            debug_data["request_logs_next"] = f"?{params.urlencode()}"
         
         # Database queries from current connection
         debug_data["database"]["total_queries"] = len(connection.queries)
@@ -112,6 +141,8 @@ def debug_view(request):
         debug_data["django"]["context_processors"] = [
             "portal.context_processors.user_customers",
             "portal.context_processors.footer_info",
+            "portal.context_processors.language_menu",
+            "portal.context_processors.about_info",
         ]
         debug_data["django"]["installed_apps"] = list(getattr(settings, "INSTALLED_APPS", []))
         debug_data["django"]["middleware"] = list(getattr(settings, "MIDDLEWARE", []))
@@ -138,3 +169,114 @@ def debug_view(request):
     return render(request, "web/debug.html", {
         "debug_data": debug_data,
     })
+
+
+QUERY_REPORT_SORTS = {
+    "total": "-total_ms",
+    "calls": "-calls",
+    "max": "-max_ms",
+    "p95": None,  # from the histogram, sorted in Python
+}
+
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+@require_http_methods(["GET", "POST"])
+def query_report(request):
+    """
+    Query profiler report: SQL query shapes per view with calls, total, average, p95 and max time
+    and the last sampled EXPLAIN plan. ?format=json returns the same rows; POST action=reset clears them.
+    """
+    if request.method == "POST":
+        if request.POST.get("action") == "reset":
+            QueryStat.objects.all().delete()
+        return redirect("query_report")
+
+    # Include this worker's not yet written aggregates
+    try:
+        query_profiler.flush()
+    except Exception:
+        logging.getLogger(__name__).exception("Query profiler flush failed")
+
+    sort = request.GET.get("sort", "total")
+    if sort not in QUERY_REPORT_SORTS:
+        sort = "total"
+    view_filter = request.GET.get("view", "").strip()
+    limit = 200
+    stats = QueryStat.objects.all()
+    if view_filter:
+        stats = stats.filter(view__icontains=view_filter)
+    if QUERY_REPORT_SORTS[sort]:
+        stats = list(stats.order_by(QUERY_REPORT_SORTS[sort])[:limit])
+    else:
+        stats = sorted(stats, key=lambda s: s.p95_ms or 0, reverse=True)[:limit]
+
+    rows = [
+        {
+            "fingerprint": s.fingerprint,
+            "view": s.view,
+            "sql": s.sql,
+            "calls": s.calls,
+            "total_ms": round(s.total_ms, 2),
+            "avg_ms": round(s.avg_ms, 2) if s.avg_ms is not None else None,
+            "p95_ms": round(s.p95_ms, 2) if s.p95_ms is not None else None,
+            "max_ms": round(s.max_ms, 2),
+            "first_seen": s.first_seen,
+            "last_seen": s.last_seen,
+            "plan": s.plan,
+            "plan_ms": s.plan_ms,
+            "plan_captured_at": s.plan_captured_at,
+        }
+        for s in stats
+    ]
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "sort": sort,
+            "view": view_filter,
+            "slow_ms": getattr(settings, "QUERY_PROFILER_SLOW_MS", 200),
+            "queries": rows,
+        })
+    return render(request, "web/query_report.html", {
+        "rows": rows,
+        "sort": sort,
+        "sorts": list(QUERY_REPORT_SORTS),
+        "view_filter": view_filter,
+        "enabled": getattr(settings, "QUERY_PROFILER_ENABLED", True),
+        "slow_ms": getattr(settings, "QUERY_PROFILER_SLOW_MS", 200),
+    })
+
+
+PROFILE_REPORT_SORTS = ("cumulative", "tottime", "calls")
+
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def profile_list(request):
+    """
+    Stored request profiles (pmg_portal.request_profiler), newest first. ?name=<profile> shows the
+    top functions of one profile (?sort=cumulative|tottime|calls); ?download=<profile> sends the
+    .pstats file for snakeviz or `python -m pstats`.
+    """
+    if request.GET.get("download"):
+        path = request_profiler.profile_path(request.GET["download"])
+        if path is None:
+            raise Http404("Profile not found")
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=path.name)
+
+    selected = request.GET.get("name", "")
+    sort = request.GET.get("sort", "cumulative")
+    if sort not in PROFILE_REPORT_SORTS:
+        sort = "cumulative"
+    report = request_profiler.report(selected, sort) if selected else None
+    if selected and report is None:
+        raise Http404("Profile not found")
+    return render(request, "web/profiles.html", {
+        "profiles": request_profiler.list_profiles(),
+        "selected": selected,
+        "report": report,
+        "sort": sort,
+        "sorts": PROFILE_REPORT_SORTS,
+        "enabled": getattr(settings, "REQUEST_PROFILER_ENABLED", True),
+        "sample_percent": getattr(settings, "REQUEST_PROFILER_SAMPLE_RATE", 0.01) * 100,
+        "sample_interval": getattr(settings, "REQUEST_PROFILER_SAMPLE_INTERVAL", 600),
+    })